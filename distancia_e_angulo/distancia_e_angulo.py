@@ -6,16 +6,25 @@ Avalia distâncias e ângulos dos átomos presentes em arquivo '.gro' (gromacs).
 
 """
 # pylint: disable=import-error
+import mmap
 import sys
 from pathlib import Path
-import time
 import numpy as np
 import pandas as pd
 
+from geometria import distancias_condensadas, imagem_minima, pares_dentro_do_corte
+from topologia import IndiceTopologia
+
 
 TAM_TEXTO = 50
 TAM_TEXTO_PROC = 35
 
+# Formatos de arquivo aceitos por salvar_dataframe
+FORMATOS = ("csv", "npz", "npy", "parquet")
+
+# Linhas de átomos convertidas por vez na leitura do '.gro'
+LINHAS_POR_BLOCO = 250_000
+
 
 def cabecalho():
     """
@@ -63,18 +72,133 @@ def existe_arquivo(arquivo_gro):
     return retorno
 
 
-def salvar_dataframe(df_dados, nome_arquivo, cols=[]):
+def _formato_arquivo(nome_arquivo, formato=None):
+    """
+    Define o formato e o nome final do arquivo de dados.
+
+    Parameters
+    ----------
+    nome_arquivo : string
+        Nome do arquivo, com ou sem extensão.
+    formato : string, opcional
+        'csv', 'npz', 'npy' ou 'parquet'. Padrão é None (usa a extensão do
+        nome; sem extensão conhecida, 'csv').
+
+    Returns
+    -------
+    formato : string
+        Formato escolhido.
+    nome_arquivo : string
+        Nome do arquivo com a extensão do formato ('npy' é um diretório).
+
+    """
+    extensao = Path(nome_arquivo).suffix.lower().lstrip(".")
+    if extensao in FORMATOS:
+        nome_arquivo = str(Path(nome_arquivo).with_suffix(""))
+        formato = formato or extensao
+
+    formato = (formato or "csv").lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato {formato} desconhecido. Use: {', '.join(FORMATOS)}.")
+
+    return formato, f"{nome_arquivo}.{formato}"
+
+
+def _colunas_binarias(df_dados):
+    """
+    Converte as colunas do dataframe em vetores NumPy para formatos binários.
+
+    Colunas de texto (ou categóricas) viram códigos inteiros ('<coluna>') e
+    uma tabela de nomes ('<coluna>.categorias'); colunas em que cada linha é
+    um vetor (por exemplo, vetor_1 de molecules_angles) viram uma matriz.
+
+    Parameters
+    ----------
+    df_dados : Pandas dataframe
+        Dados.
+
+    Returns
+    -------
+    dados : dict
+        Nome -> vetor NumPy.
+
+    """
+    dados = {}
+    for coluna in df_dados.columns:
+        serie = df_dados[coluna]
+
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object or \
+                pd.api.types.is_string_dtype(serie.dtype):
+            valores = serie.to_numpy()
+            if len(valores) and isinstance(valores[0], np.ndarray):
+                dados[coluna] = np.stack(valores)
+                continue
+
+            categorias = pd.Categorical(serie)
+            codigos = categorias.codes
+            tipo = np.int32 if len(categorias.categories) > np.iinfo(np.int16).max else np.int16
+            dados[coluna] = codigos.astype(tipo)
+            dados[coluna + ".categorias"] = np.asarray(categorias.categories, dtype=str)
+        else:
+            dados[coluna] = serie.to_numpy()
+
+    return dados
+
+
+def _df_de_colunas(dados, colunas):
+    """
+    Monta o dataframe a partir dos vetores de _colunas_binarias.
+
+    Parameters
+    ----------
+    dados : dict
+        Nome -> vetor NumPy (pode ser um np.memmap).
+    colunas : list
+        Ordem das colunas.
+
+    Returns
+    -------
+    df_dados : Pandas dataframe
+        Dados (colunas de texto como pandas.Categorical).
+
+    """
+    colunas_df = {}
+    for coluna in colunas:
+        valores = dados[coluna]
+        if coluna + ".categorias" in dados:
+            colunas_df[coluna] = pd.Categorical.from_codes(valores, dados[coluna + ".categorias"])
+        elif valores.ndim > 1:
+            colunas_df[coluna] = list(valores)
+        else:
+            colunas_df[coluna] = valores
+
+    return pd.DataFrame(colunas_df, copy=False)
+
+
+def salvar_dataframe(df_dados, nome_arquivo, cols=[], formato=None):
     """
-    Salva os dados do dataframe em um arquivo csv.
+    Salva os dados do dataframe em um arquivo csv ou em formato binário.
+
+    Formatos:
+        - csv: texto (padrão);
+        - npz: um arquivo NumPy com um vetor por coluna;
+        - npy: um diretório com um '.npy' por coluna (leitura com mmap);
+        - parquet: colunar (precisa do pyarrow).
+    Nos formatos binários, textos repetidos (como 'OW_1') são guardados como
+    índices inteiros mais uma tabela de nomes.
 
     Parameters
     ----------
     df_dados : Pandas dataframe
         Dataframe do Pandas contendo os dados a serem salvos.
     nome_arquivo : string
-        Nome do arquivo.
+        Nome do arquivo. A extensão (.csv, .npz, .npy, .parquet), se houver,
+        define o formato.
     cols : array, opcional
         Colunas dos dados. Padrão é [].
+    formato : string, opcional
+        Formato do arquivo, quando o nome não tiver extensão. Padrão é None
+        (csv).
 
     Returns
     -------
@@ -83,13 +207,35 @@ def salvar_dataframe(df_dados, nome_arquivo, cols=[]):
 
     """
     status = True
-    nome_arquivo = nome_arquivo + ".csv"
+    if len(cols) >= 1:
+        df_dados = df_dados[list(cols)]
 
     try:
-        if len(cols) >= 1:
-            df_dados.to_csv(nome_arquivo, columns=cols, index=False)
-        else:
+        formato, nome_arquivo = _formato_arquivo(nome_arquivo, formato)
+        if formato == "csv":
             df_dados.to_csv(nome_arquivo, index=False)
+        elif formato == "parquet":
+            # textos repetidos como colunas de dicionário (índices + nomes)
+            df_parquet = df_dados.copy(deep=False)
+            df_parquet.attrs = {}  # caixa (numpy) não é serializável nos metadados
+            for coluna in df_parquet.columns:
+                if df_parquet[coluna].dtype == object and len(df_parquet) and \
+                        isinstance(df_parquet[coluna].iloc[0], str):
+                    df_parquet[coluna] = df_parquet[coluna].astype("category")
+            df_parquet.to_parquet(nome_arquivo, index=False)
+        else:
+            dados = _colunas_binarias(df_dados)
+            dados["__colunas__"] = np.asarray(df_dados.columns, dtype=str)
+            if formato == "npz":
+                np.savez(nome_arquivo, **dados)
+            else:
+                Path(nome_arquivo).mkdir(parents=True, exist_ok=True)
+                for nome, valores in dados.items():
+                    np.save(Path(nome_arquivo) / f"{nome}.npy", valores)
+    except ImportError as msg_erro:
+        print(f"Erro ao salvar {nome_arquivo}! O formato parquet precisa do "
+              f"pyarrow. Erro: {msg_erro}")
+        status = False
     except OSError as msg_erro:
         print(f"Erro ao salvar {nome_arquivo}! Erro: {msg_erro}")
         status = False
@@ -100,88 +246,403 @@ def salvar_dataframe(df_dados, nome_arquivo, cols=[]):
     return status
 
 
-def criar_df_atomos(arquivo_gro):
+def carregar_dataframe(nome_arquivo, formato=None):
     """
-    Cria um dataframe (Pandas) contendo todos os átomo do arquivo.
+    Carrega um arquivo salvo por salvar_dataframe.
+
+    Os formatos 'npy' (mmap) e 'parquet' (arquivo mapeado em memória) evitam
+    cópias na leitura sempre que possível.
 
     Parameters
     ----------
-    arquivo_gro : string
-        Nome/local do arquivo '.gro'.
+    nome_arquivo : string
+        Nome do arquivo (a extensão define o formato).
+    formato : string, opcional
+        Formato do arquivo, quando o nome não tiver extensão. Padrão é None.
+
+    Returns
+    -------
+    df_dados : Pandas dataframe
+        Dados.
+
+    """
+    formato, nome_arquivo = _formato_arquivo(nome_arquivo, formato)
+
+    if formato == "csv":
+        return pd.read_csv(nome_arquivo)
+
+    if formato == "parquet":
+        return pd.read_parquet(nome_arquivo, memory_map=True)
+
+    if formato == "npz":
+        with np.load(nome_arquivo) as arquivo_npz:
+            dados = dict(arquivo_npz)
+    else:
+        dados = {caminho.stem: np.load(caminho, mmap_mode="r")
+                 for caminho in Path(nome_arquivo).glob("*.npy")}
+        dados["__colunas__"] = np.asarray(dados["__colunas__"])
+
+    return _df_de_colunas(dados, list(dados["__colunas__"]))
+
+
+def ler_caixa(linha):
+    """
+    Converte a linha do vetor da caixa (última linha do '.gro') em matriz.
+
+    O '.gro' traz 3 valores para caixas ortorrômbicas (v1(x) v2(y) v3(z)) ou
+    9 valores para caixas triclínicas, na ordem
+    v1(x) v2(y) v3(z) v1(y) v1(z) v2(x) v2(z) v3(x) v3(y).
+
+    Parameters
+    ----------
+    linha : string
+        Linha do vetor da caixa.
+
+    Returns
+    -------
+    caixa : numpy.ndarray
+        Matriz 3 x 3 com os vetores da caixa (nm) nas linhas, ou None se a
+        linha não contiver uma caixa válida.
+
+    """
+    try:
+        valores = [float(valor) for valor in linha.split()]
+    except ValueError:
+        return None
+
+    if len(valores) not in (3, 9):
+        return None
+
+    valores = valores + [0.0] * (9 - len(valores))
+    caixa = np.array([[valores[0], valores[3], valores[4]],
+                      [valores[5], valores[1], valores[6]],
+                      [valores[7], valores[8], valores[2]]])
+
+    return caixa
+
+
+def matriz_linhas(bloco, qtde_linhas):
+    """
+    Converte um bloco de linhas de largura fixa em uma matriz de bytes.
+
+    Parameters
+    ----------
+    bloco : bytes
+        Bloco contendo exatamente qtde_linhas linhas (com o '\\n' final).
+    qtde_linhas : int
+        Número de linhas do bloco.
+
+    Returns
+    -------
+    numpy.ndarray
+        Matriz (qtde_linhas, largura) de uint8, sem os finais de linha.
+        Linhas mais curtas são completadas com bytes nulos.
+
+    """
+    dados = np.frombuffer(bloco, dtype=np.uint8)
+
+    # Caso comum: todas as linhas com a mesma largura (sem cópia)
+    if qtde_linhas and len(dados) % qtde_linhas == 0:
+        matriz = dados.reshape(qtde_linhas, -1)
+        if np.all(matriz[:, -1] == ord("\n")):
+            fim = -2 if np.all(matriz[:, -2] == ord("\r")) else -1
+            return matriz[:, :fim]
+
+    # Linhas com larguras diferentes
+    linhas = bytes(bloco).replace(b"\r", b"").split(b"\n")[:qtde_linhas]
+    return np.array(linhas).view(np.uint8).reshape(qtde_linhas, -1)
+
+
+def fim_das_linhas(buffer, inicio, qtde_linhas, tam_leitura=1 << 23):
+    """
+    Encontra a posição logo após qtde_linhas linhas a partir de inicio.
+
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    inicio : int
+        Posição (byte) de início.
+    qtde_linhas : int
+        Número de linhas.
+    tam_leitura : int, opcional
+        Quantidade de bytes examinada por vez. Padrão é 8 MiB.
+
+    Returns
+    -------
+    int
+        Posição (byte) logo após o '\\n' da última linha.
+
+    """
+    if qtde_linhas == 0:
+        return inicio
+
+    # Palpite: linhas de largura fixa iguais à primeira
+    fim_primeira = buffer.find(b"\n", inicio)
+    if fim_primeira < 0:
+        raise ValueError("Arquivo '.gro' incompleto.")
+    fim = inicio + (fim_primeira + 1 - inicio) * qtde_linhas
+    if fim <= len(buffer) and buffer[fim - 1:fim] == b"\n":
+        bloco = np.frombuffer(buffer[inicio:fim], dtype=np.uint8)
+        if np.count_nonzero(bloco == ord("\n")) == qtde_linhas:
+            return fim
+
+    # Caso geral: conta as quebras de linha por partes
+    faltam = qtde_linhas
+    pos = inicio
+    while pos < len(buffer):
+        parte = np.frombuffer(buffer[pos:pos + tam_leitura], dtype=np.uint8)
+        quebras = np.flatnonzero(parte == ord("\n"))
+        if len(quebras) >= faltam:
+            return pos + int(quebras[faltam - 1]) + 1
+        faltam -= len(quebras)
+        pos += len(parte)
+
+    raise ValueError("Arquivo '.gro' incompleto.")
+
+
+def _campo(matriz, inicio, fim):
+    """Extrai uma coluna fixa da matriz de linhas como vetor de bytes."""
+    return np.ascontiguousarray(matriz[:, inicio:fim]).view(f"S{fim - inicio}").ravel()
+
+
+def _campo_categorico(matriz, inicio, fim):
+    """Extrai uma coluna de texto como pandas.Categorical (sem espaços)."""
+    unicos, codigos = np.unique(_campo(matriz, inicio, fim), return_inverse=True)
+    nomes = np.array([nome.decode("utf-8", "replace").strip() for nome in unicos],
+                     dtype=object)
+    categorias, remapeia = np.unique(nomes.astype(str), return_inverse=True)
+    return pd.Categorical.from_codes(remapeia[codigos].astype(np.int32), categorias)
+
+
+def ler_atomos(matriz, precisao=np.float64):
+    """
+    Converte as linhas de átomos (colunas fixas do '.gro') em dataframe.
+
+    Formato de cada linha: número do resíduo (5), nome do resíduo (5), nome
+    do átomo (5), número do átomo (5), posição x, y, z (3 x 8, nm) e,
+    opcionalmente, velocidade vx, vy, vz (3 x 8, nm/ps).
+
+    Parameters
+    ----------
+    matriz : numpy.ndarray
+        Matriz (qtde_atomos, largura) de uint8 (ver matriz_linhas).
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas (np.float32 ou np.float64). Padrão é np.float64.
 
     Returns
     -------
     df_atomos : dataframe Pandas
-        Dataframe do Pandas contendo a lista de átomos do arquivo.
+        Colunas numero_residuo, nome_residuo, nome_atomo, numero_atomo, x, y,
+        z e, se existirem em todas as linhas, vx, vy, vz.
+
+    """
+    dados = {
+        "numero_residuo": _campo(matriz, 0, 5).astype(np.int32),
+        "nome_residuo": _campo_categorico(matriz, 5, 10),
+        "nome_atomo": _campo_categorico(matriz, 10, 15),
+        "numero_atomo": _campo(matriz, 15, 20).astype(np.int32),
+        "x": _campo(matriz, 20, 28).astype(precisao),
+        "y": _campo(matriz, 28, 36).astype(precisao),
+        "z": _campo(matriz, 36, 44).astype(precisao),
+    }
+
+    # velocidades (opcionais)
+    if matriz.shape[1] >= 68 and len(matriz) and \
+            np.all(matriz[:, 60:68] != 0) and np.all(matriz[:, 67] != ord(" ")):
+        dados["vx"] = _campo(matriz, 44, 52).astype(precisao)
+        dados["vy"] = _campo(matriz, 52, 60).astype(precisao)
+        dados["vz"] = _campo(matriz, 60, 68).astype(precisao)
+
+    return pd.DataFrame(dados)
+
+
+def cabecalho_frame(buffer, inicio=0):
+    """
+    Lê as duas linhas de cabeçalho de um frame '.gro'.
+
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    inicio : int, opcional
+        Posição (byte) da linha de descrição do frame. Padrão é 0.
+
+    Returns
+    -------
+    descricao : string
+        Linha de descrição (título) do frame.
+    qtde_atomos : int
+        Número de átomos do frame.
+    pos : int
+        Posição (byte) da primeira linha de átomo.
 
     """
-    atomos = []
-    colunas = ["numero_residuo", "nome_residuo", "nome_atomo",
-               "numero_atomo", "x", "y", "z"]
-    indicador = "/"
+    fim_descricao = buffer.find(b"\n", inicio)
+    fim_qtde = buffer.find(b"\n", fim_descricao + 1)
+    if fim_descricao < 0 or fim_qtde < 0:
+        raise ValueError("Arquivo '.gro' incompleto.")
+    descricao = bytes(buffer[inicio:fim_descricao]).decode("utf-8", "replace").strip()
+    qtde_atomos = int(buffer[fim_descricao + 1:fim_qtde])
 
-    # Listando átomos
-    with open(arquivo_gro, "r") as f_arquivo:
-        descricao = f_arquivo.readline().strip()
-        print(" + Descrição".ljust(TAM_TEXTO_PROC, ".") + ": " + f"{descricao}")
-        qtde_atomos = int(f_arquivo.readline().strip())
-        print(" + Total de átomos".ljust(TAM_TEXTO_PROC, ".") + ": " + f"{qtde_atomos}")
+    return descricao, qtde_atomos, fim_qtde + 1
 
-        num_linhas = 0
 
-        for linha in f_arquivo:
-            # Sensação de tempo passando
-            if indicador == "/":
-                indicador = "\\"
-            else:
-                indicador = "/"
-            print(" + Carregando átomos".ljust(TAM_TEXTO_PROC, ".") + f": {indicador}", end="\r")
-            time.sleep(0.0005)
+def linha_caixa(buffer, pos):
+    """
+    Lê a linha do vetor da caixa, que fecha o frame.
+
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    pos : int
+        Posição (byte) da linha do vetor da caixa.
+
+    Returns
+    -------
+    caixa : numpy.ndarray
+        Matriz 3 x 3 da caixa (ver ler_caixa).
+    fim : int
+        Posição (byte) logo após o frame (início do próximo frame).
+
+    """
+    fim = buffer.find(b"\n", pos)
+    fim = len(buffer) if fim < 0 else fim + 1
+
+    return ler_caixa(bytes(buffer[pos:fim]).decode("utf-8", "replace")), fim
+
+
+def ler_coordenadas(matriz, precisao=np.float64):
+    """
+    Converte as colunas de posição das linhas de átomos em matriz (N, 3).
+
+    Parameters
+    ----------
+    matriz : numpy.ndarray
+        Matriz (qtde_atomos, largura) de uint8 (ver matriz_linhas).
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas. Padrão é np.float64.
+
+    Returns
+    -------
+    numpy.ndarray
+        Coordenadas x, y, z (nm).
+
+    """
+    coords = np.empty((len(matriz), 3), dtype=precisao)
+    for eixo, inicio in enumerate((20, 28, 36)):
+        coords[:, eixo] = _campo(matriz, inicio, inicio + 8).astype(precisao)
 
-            num_linhas += 1
-            if num_linhas <= qtde_atomos:
-                dados_linha = []
+    return coords
 
-                # número do resíduo (5 posições, integer)
-                dados_linha.append(linha[0:5].strip())
 
-                # nome do resíduo (5 caracteres)
-                dados_linha.append(linha[5:10].strip())
+def ler_frame(buffer, inicio=0, precisao=np.float64, progresso=False,
+              linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê um frame (estrutura) '.gro' a partir de uma posição do buffer.
 
-                # atom name (5 characters)
-                dados_linha.append(linha[10:15].strip())
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    inicio : int, opcional
+        Posição (byte) da linha de descrição do frame. Padrão é 0.
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas. Padrão é np.float64.
+    progresso : bool, opcional
+        Imprime o andamento da leitura (uma vez por bloco). Padrão é False.
+    linhas_por_bloco : int, opcional
+        Número de linhas convertidas por vez. Padrão é LINHAS_POR_BLOCO.
 
-                # atom number (5 positions, integer)
-                dados_linha.append(linha[15:20].strip())
+    Returns
+    -------
+    df_atomos : dataframe Pandas
+        Átomos do frame; attrs["descricao"] e attrs["caixa"] guardam a
+        descrição e a caixa de simulação.
+    fim : int
+        Posição (byte) logo após o frame (início do próximo frame).
 
-                # position (in nm, x y z in 3 columns, each 8 positions
-                # with 3 decimal places)
-                dados_linha.append(float(linha[20:28].strip()))
-                dados_linha.append(float(linha[28:36].strip()))
-                dados_linha.append(float(linha[36:44].strip()))
+    """
+    descricao, qtde_atomos, pos = cabecalho_frame(buffer, inicio)
+
+    # Linhas dos átomos, convertidas em blocos
+    partes = []
+    for primeira in range(0, qtde_atomos, linhas_por_bloco):
+        qtde = min(linhas_por_bloco, qtde_atomos - primeira)
+        fim_bloco = fim_das_linhas(buffer, pos, qtde)
+        partes.append(ler_atomos(matriz_linhas(buffer[pos:fim_bloco], qtde), precisao))
+        pos = fim_bloco
+
+        if progresso:
+            print(" + Carregando átomos".ljust(TAM_TEXTO_PROC, ".") +
+                  f": {100 * (primeira + qtde) / qtde_atomos:5.1f}%", end="\r")
+
+    if len(partes) == 1:
+        df_atomos = partes[0]
+    elif partes:
+        df_atomos = pd.concat(partes, ignore_index=True)
+        for coluna in ("nome_residuo", "nome_atomo"):
+            df_atomos[coluna] = df_atomos[coluna].astype("category")
+    else:
+        df_atomos = ler_atomos(np.zeros((0, 44), dtype=np.uint8), precisao)
+
+    # Vetor da caixa
+    caixa, fim = linha_caixa(buffer, pos)
+    df_atomos.attrs["descricao"] = descricao
+    df_atomos.attrs["caixa"] = caixa
+
+    return df_atomos, fim
+
+
+def criar_df_atomos(arquivo_gro, precisao=np.float64, progresso=True, salvar=True,
+                    formato=None):
+    """
+    Cria um dataframe (Pandas) contendo todos os átomo do arquivo.
+
+    O arquivo é mapeado em memória (mmap) e as colunas fixas são convertidas
+    de uma vez, em blocos, sem laços por linha.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas (np.float32 ou np.float64). Padrão é np.float64.
+    progresso : bool, opcional
+        Imprime o andamento da leitura. Padrão é True.
+    salvar : bool, opcional
+        Salva a lista de átomos em 'lista_atomos.csv'. Padrão é True.
+    formato : string, opcional
+        Formato do arquivo salvo (ver salvar_dataframe). Padrão é None (csv).
 
-                # velocity (in nm/ps (or km/s), x y z in 3 columns,
-                # each 8
-                # positions with 4 decimal places)
-                # considering that the file don't have it
+    Returns
+    -------
+    df_atomos : dataframe Pandas
+        Dataframe do Pandas contendo a lista de átomos do arquivo. A caixa de
+        simulação (matriz 3 x 3, ver ler_caixa) fica em df_atomos.attrs["caixa"].
 
-                atomos.append(dados_linha)
-        f_arquivo.close()
+    """
+    with open(arquivo_gro, "rb") as f_arquivo, \
+            mmap.mmap(f_arquivo.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        df_atomos, _ = ler_frame(buffer, 0, precisao, progresso)
 
-    # Criando o dataframe
-    df_atomos = pd.DataFrame(
-        atomos,
-        columns=colunas)
+    if progresso:
+        print("")
+        print(" + Descrição".ljust(TAM_TEXTO_PROC, ".") + ": " +
+              f"{df_atomos.attrs['descricao']}")
+        print(" + Total de átomos".ljust(TAM_TEXTO_PROC, ".") + ": " + f"{len(df_atomos)}")
 
     # Salva dados
-    print("")
-    salvar_dataframe(df_atomos, "lista_atomos", colunas)
-    print(" + Lista de átomos salva!")
+    if salvar:
+        salvar_dataframe(df_atomos, "lista_atomos", list(df_atomos.columns), formato)
+        print(" + Lista de átomos salva!")
 
     return df_atomos
 
 
-def dist_oxi_oxi(df_from_gro):
+def dist_oxi_oxi(df_from_gro, cutoff=None, periodico=True, salvar=True, topologia=None,
+                 formato=None):
     """
     Calcula distância entre os átomos de oxigênio.
 
@@ -189,6 +650,20 @@ def dist_oxi_oxi(df_from_gro):
     ----------
     df_from_gro : Pandas dataframe
         Dataframe contendo todos os átomos do sistema.
+    cutoff : float, opcional
+        Raio de corte (nm). Se informado, apenas os pares com distância até
+        o raio de corte são calculados (lista de células, O(N)). Padrão é
+        None (todos os pares).
+    periodico : bool, opcional
+        Se True e o dataframe tiver a caixa (attrs["caixa"]), usa a imagem
+        mínima. Padrão é True.
+    salvar : bool, opcional
+        Salva o resultado em arquivo. Padrão é True.
+    topologia : IndiceTopologia, opcional
+        Índice de topologia do sistema (reaproveitado entre frames). Padrão
+        é None (o índice é construído a partir do dataframe).
+    formato : string, opcional
+        Formato do arquivo salvo (ver salvar_dataframe). Padrão é None (csv).
 
     Returns
     -------
@@ -199,155 +674,157 @@ def dist_oxi_oxi(df_from_gro):
     # colunas
     cols = ["oxigenio_A", "oxigenio_B", "distancia"]
 
+    # caixa de simulação (condições periódicas)
+    caixa = df_from_gro.attrs.get("caixa") if periodico else None
+
     # filtro (lista todos os átomos de oxigênio)
-    df_oxigens = df_from_gro[df_from_gro['nome_atomo'] == "OW"]
+    if topologia is None:
+        topologia = IndiceTopologia(df_from_gro)
+    ind_oxigens = topologia.atomos("OW")
 
-    # data
-    data = []
-    indicador = "/"
+    # rótulos (OW_<número do resíduo>)
+    rotulos = pd.Series(topologia.numero_residuo[ind_oxigens]).astype(str).radd("OW_")
+    coords = df_from_gro[["x", "y", "z"]].to_numpy(dtype=np.float64)[ind_oxigens]
 
     # calculando distâncias
-    for ind1 in df_oxigens.index:
-        for ind2 in df_oxigens.index[ind1+1:]:
-            # Sensação de tempo passando
-            if indicador == "/":
-                indicador = "\\"
-            else:
-                indicador = "/"
-            print(" + Distância entre oxigênios".ljust(TAM_TEXTO_PROC, ".") + f": {indicador}", end="\r")
-            time.sleep(0.0005)
-
-            vlr_x2 = (df_oxigens['x'][ind1] - df_oxigens['x'][ind2]) ** 2
-            vlr_y2 = (df_oxigens['y'][ind1] - df_oxigens['y'][ind2]) ** 2
-            vlr_z2 = (df_oxigens['z'][ind1] - df_oxigens['z'][ind2]) ** 2
-
-            distance = np.sqrt((vlr_x2 + vlr_y2 + vlr_z2))
+    print(" + Distância entre oxigênios".ljust(TAM_TEXTO_PROC, ".") + ": ", end="\r")
+    if cutoff is None:
+        # todos os pares (blocos da matriz N x N)
+        ind_a, ind_b, distancias = distancias_condensadas(coords, caixa)
+    else:
+        # apenas os pares dentro do raio de corte (lista de células)
+        ind_a, ind_b, distancias = pares_dentro_do_corte(coords, cutoff, caixa)
 
-            data.append([df_oxigens["nome_atomo"][ind1] + "_" +
-                         df_oxigens["numero_residuo"][ind1],
-                         df_oxigens["nome_atomo"][ind2] + "_" +
-                         df_oxigens["numero_residuo"][ind2],
-                         np.round(distance, 2)])
+    # rótulos como categorias (índice inteiro + tabela de nomes)
+    if rotulos.is_unique:
+        oxigenio_a = pd.Categorical.from_codes(ind_a, categories=rotulos)
+        oxigenio_b = pd.Categorical.from_codes(ind_b, categories=rotulos)
+    else:
+        oxigenio_a = rotulos.to_numpy()[ind_a]
+        oxigenio_b = rotulos.to_numpy()[ind_b]
 
     # Criando dataframe
-    df_dist_oxi_oxi = pd.DataFrame(
-        data,
-        columns=cols)
+    df_dist_oxi_oxi = pd.DataFrame({cols[0]: oxigenio_a,
+                                    cols[1]: oxigenio_b,
+                                    cols[2]: np.round(distancias, 2)})
 
     # Salva dados
     print("")
-    salvar_dataframe(df_dist_oxi_oxi, "dist_oxi_oxi", cols)
-    print(" + Distâncias entre oxigênios salva!")
+    if salvar:
+        salvar_dataframe(df_dist_oxi_oxi, "dist_oxi_oxi", cols, formato)
+        print(" + Distâncias entre oxigênios salva!")
 
     return df_dist_oxi_oxi
 
 
-def calc_angle(ponto1, ponto2, ponto3):
+def calc_angle(ponto1, ponto2, ponto3, caixa=None):
     """
-    Calcula o ângulo entre três pontos.
+    Calcula o ângulo entre três pontos (vértice em ponto1).
+
+    Aceita um ponto por argumento, formato (3,), ou vários de uma vez,
+    formato (M, 3); nesse caso todos os M ângulos são calculados juntos.
 
     Parameters
     ----------
-    ponto1 : TYPE
-        DESCRIPTION.
-    ponto2 : TYPE
-        DESCRIPTION.
-    ponto3 : TYPE
-        DESCRIPTION.
+    ponto1 : array
+        Vértice do ângulo (por exemplo, o oxigênio da água).
+    ponto2 : array
+        Primeira extremidade (por exemplo, o primeiro hidrogênio).
+    ponto3 : array
+        Segunda extremidade (por exemplo, o segundo hidrogênio).
+    caixa : numpy.ndarray, opcional
+        Matriz 3 x 3 da caixa (imagem mínima). Padrão é None.
 
     Returns
     -------
-    vetor1 : TYPE
-        DESCRIPTION.
-    vetor2 : TYPE
-        DESCRIPTION.
-    angle : TYPE
-        DESCRIPTION.
+    vetor1 : numpy.ndarray
+        Vetor ponto1 -> ponto2.
+    vetor2 : numpy.ndarray
+        Vetor ponto1 -> ponto3.
+    angle : numpy.ndarray ou float
+        Ângulo (graus) entre vetor1 e vetor2.
 
     """
-    ponto1 = np.array(ponto1)
-    ponto2 = np.array(ponto2)
-    ponto3 = np.array(ponto3)
+    ponto1 = np.asarray(ponto1, dtype=np.float64)
+    ponto2 = np.asarray(ponto2, dtype=np.float64)
+    ponto3 = np.asarray(ponto3, dtype=np.float64)
 
-    vetor1 = ponto2 - ponto1
+    vetor1 = imagem_minima(ponto2 - ponto1, caixa)
     vetor1 = np.around(vetor1, 4)
-    vetor2 = ponto2 - ponto1
+    vetor2 = imagem_minima(ponto3 - ponto1, caixa)
     vetor2 = np.around(vetor2, 4)
 
-    norma_vetor1 = np.sqrt(vetor1[0]**2 + vetor1[1]**2 + vetor1[2]**2)
-    norma_vetor1 = np.around(norma_vetor1, 4)
-    norma_vetor2 = np.sqrt(vetor2[0]**2 + vetor2[1]**2 + vetor2[2]**2)
-    norma_vetor1 = np.around(norma_vetor1, 4)
+    norma_vetor1 = np.sqrt(np.einsum("...k,...k->...", vetor1, vetor1))
+    norma_vetor2 = np.sqrt(np.einsum("...k,...k->...", vetor2, vetor2))
 
-    produto_vetorial = vetor1.dot(vetor2)
+    produto_escalar = np.einsum("...k,...k->...", vetor1, vetor2)
 
-    cos_angle_rad = produto_vetorial / (norma_vetor1 + norma_vetor2)
+    cos_angle_rad = np.clip(produto_escalar / (norma_vetor1 * norma_vetor2), -1.0, 1.0)
     angle = np.degrees(np.arccos(cos_angle_rad))
     angle = np.around(angle, 4)
 
     return vetor1, vetor2, angle
 
 
-def molecules_angles(df_from_gro):
+def molecules_angles(df_from_gro, periodico=True, salvar=True, topologia=None,
+                     formato=None):
     """
     Calcula angulo entre as moléculas de água.
 
     Parameters
     ----------
-    df_from_gro : TYPE
-        DESCRIPTION.
+    df_from_gro : Pandas dataframe
+        Dataframe contendo todos os átomos do sistema.
+    periodico : bool, opcional
+        Se True e o dataframe tiver a caixa (attrs["caixa"]), usa a imagem
+        mínima. Padrão é True.
+    salvar : bool, opcional
+        Salva o resultado em arquivo. Padrão é True.
+    topologia : IndiceTopologia, opcional
+        Índice de topologia do sistema (reaproveitado entre frames). Padrão
+        é None (o índice é construído a partir do dataframe).
+    formato : string, opcional
+        Formato do arquivo salvo (ver salvar_dataframe). Padrão é None (csv).
 
     Returns
     -------
-    df_molecules_angles : TYPE
-        DESCRIPTION.
+    df_molecules_angles : Pandas dataframe
+        Número do resíduo, vetores O-H1 e O-H2 e ângulo H-O-H (graus) de
+        cada molécula de água.
 
     """
     cols = ["numero_residuo", "vetor_1", "vetor_2", "angulo"]
 
-    # filtro (pega todos os átomos de oxigênio [OW])
-    df_all_ow = df_from_gro[df_from_gro['nome_atomo'] == "OW"]
+    # caixa de simulação (condições periódicas)
+    caixa = df_from_gro.attrs.get("caixa") if periodico else None
 
-    # filtro (pega todos os átomos de hidrogêncio [HW] )
-    df_all_hw = df_from_gro[df_from_gro['nome_atomo'].str.startswith("HW")]
+    # O, H1 e H2 de cada molécula (índice de topologia)
+    print(" + Ângulos das moléculas de água".ljust(TAM_TEXTO_PROC, ".") + ": ", end="\r")
+    if topologia is None:
+        topologia = IndiceTopologia(df_from_gro)
+    ind_o, ind_h1, ind_h2 = topologia.agua()
+    coords = df_from_gro[["x", "y", "z"]].to_numpy(dtype=np.float64)
 
-    # data
-    data = []
-    indicador = "/"
-
-    for ind1 in df_all_ow.index:
-        # Sensação de tempo passando
-        if indicador == "/":
-            indicador = "\\"
-        else:
-            indicador = "/"
-        print(" + Ângulos das moléculas de água".ljust(TAM_TEXTO_PROC, ".") + f": {indicador}", end="\r")
-        time.sleep(0.0005)
-
-        residue_number = df_all_ow["numero_residuo"][ind1]
-        ponto_origem = [df_all_ow["x"][ind1], df_all_ow["y"][ind1], df_all_ow["z"][ind1]]
-
-        pontos_destino = []
-        for ind2 in df_all_hw[df_all_hw["numero_residuo"] == residue_number].index:
-            pontos_destino.append([df_all_hw["x"][ind2], df_all_hw["y"][ind2], df_all_hw["z"][ind2]])
-
-        angle = calc_angle(ponto_origem, pontos_destino[0], pontos_destino[1])
-        data.append([residue_number, angle[0], angle[1], angle[2]])
+    # todos os ângulos de uma vez
+    vetor1, vetor2, angulos = calc_angle(coords[ind_o], coords[ind_h1], coords[ind_h2], caixa)
 
     # Criando dataframe
-    df_molecules_angles = pd.DataFrame(
-        data,
-        columns=cols)
+    df_molecules_angles = pd.DataFrame({
+        cols[0]: df_from_gro["numero_residuo"].to_numpy()[ind_o],
+        cols[1]: list(vetor1),
+        cols[2]: list(vetor2),
+        cols[3]: angulos})
 
     # Salva dados
     print("")
-    salvar_dataframe(df_molecules_angles, "molecules_angles", cols)
-    print(" + Ângulos das moléculas salva!")
+    if salvar:
+        salvar_dataframe(df_molecules_angles, "molecules_angles", cols, formato)
+        print(" + Ângulos das moléculas salva!")
 
     return df_molecules_angles
 
 
-def main(arquivo_gro):
+def main(arquivo_gro, formato=None):
     """
     Procedimento principal.
 
@@ -355,20 +832,29 @@ def main(arquivo_gro):
     ----------
     arquivo_gro : string
         Local do arquivo .gro.
+    formato : string, opcional
+        Formato dos arquivos salvos (csv, npz, npy ou parquet). Padrão é
+        None (csv).
 
     Returns
     -------
     None.
 
     """
-    df_atomos = criar_df_atomos(arquivo_gro)
+    # formato verificado antes da leitura do '.gro' (que pode ser demorada)
+    if formato is not None and formato.lower() not in FORMATOS:
+        print(f" + Formato ({formato}) desconhecido!")
+        print(f" + Uso: python distancia_e_angulo.py arquivo.gro [{'|'.join(FORMATOS)}]")
+        sys.exit()
+
+    df_atomos = criar_df_atomos(arquivo_gro, formato=formato)
 
     # Calculando a distância entre os átomos de oxigênio
-    df_dist_oxi_oxi = dist_oxi_oxi(df_atomos)
+    df_dist_oxi_oxi = dist_oxi_oxi(df_atomos, formato=formato)
     oxi_oxi_mean = df_dist_oxi_oxi["distancia"].mean()
 
     # calculando ângulos (água)
-    df_molecules_angles = molecules_angles(df_atomos)
+    df_molecules_angles = molecules_angles(df_atomos, formato=formato)
     angle_mean = df_molecules_angles["angulo"].mean()
     angle_max = df_molecules_angles["angulo"].max()
     angle_min = df_molecules_angles["angulo"].min()
@@ -388,9 +874,9 @@ def main(arquivo_gro):
 if __name__ == '__main__':
     cabecalho()
 
-    if len(sys.argv) == 2:
+    if len(sys.argv) in (2, 3):
         if existe_arquivo(sys.argv[1]):
-            main(sys.argv[1])
+            main(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
         else:
             print(f" + Arquivo ({sys.argv[1]}) não existe!")
             sys.exit()
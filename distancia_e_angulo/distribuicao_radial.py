@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Função de distribuição radial g(r) entre grupos de átomos de arquivos '.gro'.
+
+Para cada frame, os pares com distância até o raio de corte são obtidos pela
+lista de células e contados em um histograma (np.bincount). Os histogramas
+são somados frame a frame, sem guardar a tabela de pares, e normalizados no
+fim pela densidade do grupo B e pelo volume das cascas esféricas.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import sys
+
+import numpy as np
+import pandas as pd
+
+from distancia_e_angulo import (TAM_TEXTO, TAM_TEXTO_PROC, cabecalho,
+                                existe_arquivo, salvar_dataframe)
+from geometria import ListaCelulas
+from topologia import IndiceTopologia
+from trajetoria import iterar_frames, ler_topologia
+
+
+class DistribuicaoRadial:
+    """Histograma acumulado de distâncias A-B para o cálculo de g(r)."""
+
+    def __init__(self, topologia, nomes_a=("OW",), nomes_b=None, raio_corte=1.0,
+                 largura_bin=0.002):
+        """
+        Inicializa o histograma.
+
+        Parameters
+        ----------
+        topologia : IndiceTopologia
+            Índice de topologia do sistema.
+        nomes_a : tuple, opcional
+            Nomes de átomo (coluna nome_atomo) do grupo A. Padrão é ("OW",).
+        nomes_b : tuple, opcional
+            Nomes de átomo do grupo B. Padrão é None (igual ao grupo A).
+        raio_corte : float, opcional
+            Maior distância do histograma (nm). Padrão é 1.0.
+        largura_bin : float, opcional
+            Largura de cada intervalo do histograma (nm). Padrão é 0.002.
+
+        """
+        self.ind_a = topologia.atomos(*nomes_a)
+        self.mesmo_grupo = nomes_b is None or set(nomes_b) == set(nomes_a)
+        self.ind_b = self.ind_a if self.mesmo_grupo else topologia.atomos(*nomes_b)
+        if len(self.ind_a) == 0 or len(self.ind_b) == 0:
+            raise ValueError("Grupo de átomos vazio.")
+
+        self.raio_corte = float(raio_corte)
+        self.largura_bin = float(largura_bin)
+        self.qtde_bins = int(np.ceil(self.raio_corte / self.largura_bin))
+        self.bordas = np.linspace(0.0, self.qtde_bins * self.largura_bin, self.qtde_bins + 1)
+        # os pares só são contados até raio_corte: o último intervalo termina nele
+        self.bordas[-1] = self.raio_corte
+        self.contagem = np.zeros(self.qtde_bins, dtype=np.int64)
+        self.qtde_frames = 0
+        self.soma_densidade_b = 0.0  # soma de N_B / V de cada frame
+
+    def adicionar_frame(self, coords, caixa):
+        """
+        Conta os pares A-B do frame dentro do raio de corte.
+
+        Parameters
+        ----------
+        coords : numpy.ndarray
+            Coordenadas (N, 3) de todos os átomos do frame.
+        caixa : numpy.ndarray
+            Matriz 3 x 3 da caixa do frame.
+
+        Returns
+        -------
+        None.
+
+        """
+        if caixa is None:
+            raise ValueError("O cálculo de g(r) precisa da caixa de simulação.")
+
+        if self.mesmo_grupo:
+            _, _, distancias = ListaCelulas(coords[self.ind_a], self.raio_corte, caixa).pares()
+            pesos = 2  # cada par i < j conta para i e para j
+        else:
+            distancias = self._distancias_ab(coords, caixa)
+            pesos = 1
+
+        bins = (distancias / self.largura_bin).astype(np.int64)
+        bins = bins[bins < self.qtde_bins]
+        self.contagem += pesos * np.bincount(bins, minlength=self.qtde_bins)
+
+        self.qtde_frames += 1
+        self.soma_densidade_b += len(self.ind_b) / abs(np.linalg.det(caixa))
+
+    def _distancias_ab(self, coords, caixa):
+        """Distâncias entre grupos diferentes (lista de células de A e B juntos)."""
+        qtde_a = len(self.ind_a)
+        pontos = np.concatenate((coords[self.ind_a], coords[self.ind_b]))
+        ind_i, ind_j, distancias = ListaCelulas(pontos, self.raio_corte, caixa).pares()
+
+        # apenas pares com um ponto de A e outro de B (i < j => i em A, j em B)
+        cruzado = (ind_i < qtde_a) & (ind_j >= qtde_a)
+        ind_i, ind_j, distancias = ind_i[cruzado], ind_j[cruzado], distancias[cruzado]
+
+        # átomos presentes nos dois grupos não formam par consigo mesmos
+        return distancias[self.ind_a[ind_i] != self.ind_b[ind_j - qtde_a]]
+
+    def resultado(self):
+        """
+        Normaliza o histograma acumulado.
+
+        Returns
+        -------
+        df_rdf : Pandas dataframe
+            Colunas r (centro do intervalo, nm), g_r e contagem (pares
+            acumulados).
+
+        """
+        if self.qtde_frames == 0:
+            raise ValueError("Nenhum frame foi adicionado.")
+
+        densidade_b = self.soma_densidade_b / self.qtde_frames
+        volume_cascas = 4.0 / 3.0 * np.pi * (self.bordas[1:] ** 3 - self.bordas[:-1] ** 3)
+        ideal = self.qtde_frames * len(self.ind_a) * densidade_b * volume_cascas
+
+        return pd.DataFrame({"r": (self.bordas[1:] + self.bordas[:-1]) / 2,
+                             "g_r": self.contagem / ideal,
+                             "contagem": self.contagem})
+
+
+def salvar_rdf(df_rdf, nome_arquivo):
+    """
+    Salva g(r) no formato indicado pela extensão do nome (ver salvar_dataframe).
+
+    Parameters
+    ----------
+    df_rdf : Pandas dataframe
+        Resultado de DistribuicaoRadial.resultado.
+    nome_arquivo : string
+        Nome do arquivo, com extensão '.csv', '.npz', '.npy' ou '.parquet'.
+
+    Returns
+    -------
+    status : bool
+        True, nenhum erro ocorreu; False, erro ao salvar.
+
+    """
+    return salvar_dataframe(df_rdf, nome_arquivo)
+
+
+def calcular_rdf(arquivo_gro, nomes_a=("OW",), nomes_b=None, raio_corte=1.0,
+                 largura_bin=0.002, primeiro=0, ultimo=None, passo=1):
+    """
+    Calcula g(r) ao longo de uma trajetória (ou estrutura) '.gro'.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+    nomes_a, nomes_b, raio_corte, largura_bin
+        Ver DistribuicaoRadial.
+    primeiro, ultimo, passo : int, opcional
+        Seleção de frames (ver iterar_frames).
+
+    Returns
+    -------
+    df_rdf : Pandas dataframe
+        Colunas r, g_r e contagem.
+
+    """
+    topologia = IndiceTopologia(ler_topologia(arquivo_gro))
+    rdf = DistribuicaoRadial(topologia, nomes_a, nomes_b, raio_corte, largura_bin)
+
+    for numero, coords, caixa, _ in iterar_frames(arquivo_gro, primeiro=primeiro,
+                                                  ultimo=ultimo, passo=passo):
+        print(" + g(r), frame".ljust(TAM_TEXTO_PROC, ".") + f": {numero}", end="\r")
+        rdf.adicionar_frame(coords, caixa)
+    print("")
+
+    return rdf.resultado()
+
+
+def main(arquivo_gro):
+    """
+    Procedimento principal: g(r) O-O salvo em 'rdf_oxi_oxi.csv'.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Local do arquivo .gro.
+
+    Returns
+    -------
+    None.
+
+    """
+    df_rdf = calcular_rdf(arquivo_gro)
+    if salvar_rdf(df_rdf, "rdf_oxi_oxi.csv"):
+        print(" + g(r) entre oxigênios salvo!")
+
+    # primeiro pico
+    pico = df_rdf["g_r"].idxmax()
+    print("Primeiro pico de g(r)".ljust(40, ".") + ": " +
+          f" r = {df_rdf['r'][pico]:1.4} nm, g(r) = {df_rdf['g_r'][pico]:1.4}")
+
+
+if __name__ == '__main__':
+    cabecalho()
+
+    if len(sys.argv) == 2:
+        arquivo = sys.argv[1]
+    else:
+        arquivo = input("Local e nome do arquivo de estrutura "
+                        "(.gro)".ljust(TAM_TEXTO, ".") + ": ").strip()
+
+    if existe_arquivo(arquivo):
+        main(arquivo)
+    else:
+        print(f" + Arquivo ({arquivo}) não existe!")
+        sys.exit()
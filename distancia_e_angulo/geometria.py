@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo numérico (NumPy) para distâncias entre átomos.
+
+As distâncias entre todos os pares são calculadas em blocos de linhas da
+matriz N x N, de modo que a memória usada fica limitada pelo tamanho do
+bloco e não pelo número total de pares.
+
+Quando a caixa de simulação (vetor da última linha do '.gro') é informada,
+as distâncias seguem a convenção da imagem mínima (condições periódicas de
+contorno), tanto para caixas ortorrômbicas quanto triclínicas.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import numpy as np
+
+
+# Número máximo de elementos (linhas x colunas) de um bloco da matriz N x N
+MAX_ELEMENTOS_BLOCO = 2_000_000
+
+
+def caixa_ortorrombica(caixa):
+    """
+    Verifica se a caixa é ortorrômbica (apenas a diagonal é não nula).
+
+    Parameters
+    ----------
+    caixa : numpy.ndarray
+        Matriz 3 x 3 com os vetores da caixa nas linhas.
+
+    Returns
+    -------
+    bool
+        True, se a caixa é ortorrômbica.
+
+    """
+    return not np.any(caixa[~np.eye(3, dtype=bool)])
+
+
+def larguras_caixa(caixa):
+    """
+    Calcula a largura da caixa perpendicular a cada par de faces.
+
+    Parameters
+    ----------
+    caixa : numpy.ndarray
+        Matriz 3 x 3 com os vetores da caixa nas linhas.
+
+    Returns
+    -------
+    numpy.ndarray
+        Larguras nas direções dos vetores a, b e c.
+
+    """
+    volume = abs(np.linalg.det(caixa))
+    normais = np.cross(caixa[[1, 2, 0]], caixa[[2, 0, 1]])
+    return volume / np.linalg.norm(normais, axis=1)
+
+
+def imagem_minima(diff, caixa=None):
+    """
+    Aplica a convenção da imagem mínima aos vetores de diferença.
+
+    Para caixas triclínicas a correção é feita em coordenadas fracionárias
+    e, em seguida, as 26 imagens vizinhas são testadas, pois o arredondamento
+    fracionário sozinho só é exato para distâncias menores que metade da
+    menor largura da caixa.
+
+    Parameters
+    ----------
+    diff : numpy.ndarray
+        Vetores de diferença, formato (..., 3).
+    caixa : numpy.ndarray, opcional
+        Matriz 3 x 3 com os vetores da caixa nas linhas. Padrão é None
+        (sem condições periódicas).
+
+    Returns
+    -------
+    numpy.ndarray
+        Vetores de diferença corrigidos.
+
+    """
+    if caixa is None:
+        return diff
+
+    if caixa_ortorrombica(caixa):
+        lados = np.diag(caixa)
+        return diff - lados * np.round(diff / lados)
+
+    frac = diff @ np.linalg.inv(caixa)
+    frac -= np.round(frac)
+    base = frac @ caixa
+    melhor = base
+    melhor_d2 = np.einsum("...k,...k->...", base, base)
+
+    for desloc in np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1],
+                                       indexing="ij")).reshape(3, -1).T:
+        if not desloc.any():
+            continue
+        candidato = base + desloc @ caixa
+        cand_d2 = np.einsum("...k,...k->...", candidato, candidato)
+        menor = cand_d2 < melhor_d2
+        melhor = np.where(menor[..., None], candidato, melhor)
+        melhor_d2 = np.where(menor, cand_d2, melhor_d2)
+
+    return melhor
+
+
+def tamanho_bloco(qtde_pontos, max_elementos=MAX_ELEMENTOS_BLOCO):
+    """
+    Define quantas linhas da matriz N x N cabem em um bloco.
+
+    Parameters
+    ----------
+    qtde_pontos : int
+        Número de pontos (N).
+    max_elementos : int, opcional
+        Número máximo de elementos do bloco. Padrão é MAX_ELEMENTOS_BLOCO.
+
+    Returns
+    -------
+    int
+        Número de linhas por bloco (no mínimo 1).
+
+    """
+    return max(1, min(qtde_pontos, max_elementos // max(qtde_pontos, 1)))
+
+
+def distancias_em_blocos(coords, caixa=None, max_elementos=MAX_ELEMENTOS_BLOCO):
+    """
+    Gera as distâncias de todos os pares (i < j) em blocos.
+
+    Os pares saem na mesma ordem do vetor condensado (linha a linha da
+    triangular superior), então concatenar os blocos resulta no vetor
+    condensado completo.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        Coordenadas dos pontos, formato (N, 3).
+    caixa : numpy.ndarray, opcional
+        Matriz 3 x 3 da caixa (imagem mínima). Padrão é None.
+    max_elementos : int, opcional
+        Número máximo de elementos de cada bloco da matriz N x N.
+
+    Yields
+    ------
+    ind_i : numpy.ndarray
+        Índice do primeiro ponto de cada par.
+    ind_j : numpy.ndarray
+        Índice do segundo ponto de cada par.
+    distancias : numpy.ndarray
+        Distância entre os pontos de cada par.
+
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    qtde = len(coords)
+    linhas = tamanho_bloco(qtde, max_elementos)
+
+    for inicio in range(0, qtde - 1, linhas):
+        fim = min(inicio + linhas, qtde)
+
+        # bloco de linhas [inicio, fim) contra as colunas [inicio, qtde)
+        diff = imagem_minima(coords[inicio:fim, None, :] - coords[None, inicio:, :], caixa)
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+        # apenas a triangular superior (j > i)
+        ind_i, ind_j = np.nonzero(
+            np.arange(inicio, qtde)[None, :] > np.arange(inicio, fim)[:, None])
+
+        yield ind_i + inicio, ind_j + inicio, dist[ind_i, ind_j]
+
+
+def distancias_condensadas(coords, caixa=None, max_elementos=MAX_ELEMENTOS_BLOCO):
+    """
+    Calcula o vetor condensado de distâncias entre todos os pares.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        Coordenadas dos pontos, formato (N, 3).
+    caixa : numpy.ndarray, opcional
+        Matriz 3 x 3 da caixa (imagem mínima). Padrão é None.
+    max_elementos : int, opcional
+        Número máximo de elementos de cada bloco da matriz N x N.
+
+    Returns
+    -------
+    ind_i, ind_j, distancias : numpy.ndarray
+        Índices dos pares e suas distâncias, na ordem condensada.
+
+    """
+    blocos = list(distancias_em_blocos(coords, caixa, max_elementos))
+    if not blocos:
+        vazio = np.empty(0, dtype=np.intp)
+        return vazio, vazio.copy(), np.empty(0, dtype=np.float64)
+
+    ind_i, ind_j, dist = zip(*blocos)
+    return np.concatenate(ind_i), np.concatenate(ind_j), np.concatenate(dist)
+
+
+class ListaCelulas:
+    """
+    Lista de células (grade de vizinhança) para buscas com raio de corte.
+
+    O espaço ocupado pelos pontos (ou a caixa periódica) é dividido em
+    células com largura maior ou igual ao raio de corte. Assim, os vizinhos
+    de um ponto estão sempre na própria célula ou nas 26 células ao redor,
+    e a busca de pares custa O(N) em vez de O(N²).
+    """
+
+    def __init__(self, coords, raio_corte, caixa=None):
+        """
+        Constrói a grade.
+
+        Parameters
+        ----------
+        coords : numpy.ndarray
+            Coordenadas dos pontos, formato (N, 3), por exemplo as colunas
+            'x', 'y' e 'z' do dataframe de átomos.
+        raio_corte : float
+            Raio de corte (mesma unidade das coordenadas).
+        caixa : numpy.ndarray, opcional
+            Matriz 3 x 3 da caixa. Se informada, a grade cobre a caixa e é
+            periódica (imagem mínima). Padrão é None.
+
+        """
+        if raio_corte <= 0:
+            raise ValueError("O raio de corte deve ser positivo.")
+
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.raio_corte = float(raio_corte)
+        self.caixa = None if caixa is None else np.asarray(caixa, dtype=np.float64)
+        qtde = len(self.coords)
+
+        # Coordenadas fracionárias [0, 1) e larguras da região coberta
+        if self.caixa is not None:
+            larguras = larguras_caixa(self.caixa)
+            if self.raio_corte > larguras.min() / 2:
+                raise ValueError("O raio de corte deve ser menor que metade "
+                                 "da menor largura da caixa.")
+            frac = self.coords @ np.linalg.inv(self.caixa)
+            frac -= np.floor(frac)
+        elif qtde > 0:
+            origem = self.coords.min(axis=0)
+            larguras = self.coords.max(axis=0) - origem
+            frac = (self.coords - origem) / np.where(larguras > 0, larguras, 1.0)
+        else:
+            larguras = np.zeros(3)
+            frac = np.empty((0, 3))
+
+        # Dimensões da grade (limitando o total de células a ~N)
+        n_celulas = np.maximum(np.floor(larguras / self.raio_corte), 1).astype(np.int64)
+        while np.prod(n_celulas) > max(qtde, 1) and n_celulas.max() > 1:
+            n_celulas = np.maximum(n_celulas // 2, 1)
+        self.n_celulas = n_celulas
+
+        # Célula de cada ponto
+        ind_celula = np.clip(np.floor(frac * n_celulas).astype(np.int64), 0, n_celulas - 1)
+        self.celula = np.ravel_multi_index(ind_celula.T, n_celulas) if qtde else \
+            np.empty(0, dtype=np.int64)
+
+        # Pontos ordenados por célula (início e contagem de cada célula)
+        self.ordem = np.argsort(self.celula, kind="stable")
+        self.contagem = np.bincount(self.celula, minlength=np.prod(n_celulas))
+        self.inicio = np.concatenate(([0], np.cumsum(self.contagem)[:-1]))
+
+    def _celulas_vizinhas(self):
+        """
+        Lista as células vizinhas (incluindo a própria) de cada célula.
+
+        Returns
+        -------
+        numpy.ndarray
+            Matriz (n_celulas, 27) com o índice das células vizinhas; -1 para
+            vizinhas fora da grade (sem caixa) ou repetidas.
+
+        """
+        grade = np.array(np.unravel_index(np.arange(np.prod(self.n_celulas)),
+                                          self.n_celulas)).T
+        deslocamentos = np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1],
+                                             indexing="ij")).reshape(3, -1).T
+
+        vizinhas = grade[:, None, :] + deslocamentos[None, :, :]
+        if self.caixa is not None:
+            # grade periódica
+            fora = np.zeros(vizinhas.shape[:2], dtype=bool)
+            vizinhas = vizinhas % self.n_celulas
+        else:
+            fora = np.any((vizinhas < 0) | (vizinhas >= self.n_celulas), axis=2)
+            vizinhas = np.clip(vizinhas, 0, self.n_celulas - 1)
+        ids = np.ravel_multi_index(vizinhas.reshape(-1, 3).T,
+                                   self.n_celulas).reshape(len(grade), -1)
+        ids[fora] = -1
+
+        # remove vizinhas repetidas (grades com menos de 3 células por eixo)
+        ids.sort(axis=1)
+        ids[:, 1:][ids[:, 1:] == ids[:, :-1]] = -1
+        return ids
+
+    def pares(self):
+        """
+        Encontra todos os pares (i < j) com distância até o raio de corte.
+
+        Returns
+        -------
+        ind_i, ind_j, distancias : numpy.ndarray
+            Índices dos pares (ordenados por i e depois por j) e distâncias.
+
+        """
+        vizinhas = self._celulas_vizinhas()
+        lista_i, lista_j, lista_d = [], [], []
+
+        # trabalha na ordem das células (acesso contíguo à memória)
+        coords = self.coords[self.ordem]
+        celula = self.celula[self.ordem]
+        posicoes = np.arange(len(coords))
+
+        for coluna in range(vizinhas.shape[1]):
+            # célula vizinha de cada ponto nesta coluna
+            viz = vizinhas[celula, coluna]
+            qtde_viz = np.where(viz >= 0, self.contagem[viz], 0)
+            total = int(qtde_viz.sum())
+            if total == 0:
+                continue
+
+            # todos os candidatos (ponto, ponto da célula vizinha)
+            pos_i = np.repeat(posicoes, qtde_viz)
+            pos_j = np.arange(total) + np.repeat(
+                self.inicio[np.maximum(viz, 0)] - (np.cumsum(qtde_viz) - qtde_viz), qtde_viz)
+
+            manter = pos_j > pos_i
+            pos_i, pos_j = pos_i[manter], pos_j[manter]
+            diff = imagem_minima(coords[pos_i] - coords[pos_j], self.caixa)
+            dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+            dentro = dist <= self.raio_corte
+            lista_i.append(pos_i[dentro])
+            lista_j.append(pos_j[dentro])
+            lista_d.append(dist[dentro])
+
+        if not lista_i:
+            vazio = np.empty(0, dtype=np.intp)
+            return vazio, vazio.copy(), np.empty(0, dtype=np.float64)
+
+        # volta aos índices originais, com i < j
+        ind_a = self.ordem[np.concatenate(lista_i)]
+        ind_b = self.ordem[np.concatenate(lista_j)]
+        ind_i = np.minimum(ind_a, ind_b)
+        ind_j = np.maximum(ind_a, ind_b)
+        dist = np.concatenate(lista_d)
+        ordem = np.lexsort((ind_j, ind_i))
+        return ind_i[ordem], ind_j[ordem], dist[ordem]
+
+
+def pares_dentro_do_corte(coords, raio_corte, caixa=None):
+    """
+    Calcula os pares (i < j) com distância até o raio de corte.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        Coordenadas dos pontos, formato (N, 3).
+    raio_corte : float
+        Raio de corte.
+    caixa : numpy.ndarray, opcional
+        Matriz 3 x 3 da caixa (imagem mínima). Padrão é None.
+
+    Returns
+    -------
+    ind_i, ind_j, distancias : numpy.ndarray
+        Índices dos pares e suas distâncias.
+
+    """
+    return ListaCelulas(coords, raio_corte, caixa).pares()
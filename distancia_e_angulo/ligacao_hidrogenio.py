@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Ligações de hidrogênio entre moléculas de água de arquivos '.gro'.
+
+Critério geométrico (Luzar e Chandler): há ligação O_d-H...O_a quando a
+distância O_d...O_a é menor ou igual a 0,35 nm e o ângulo entre O_d-H e
+O_d...O_a é menor ou igual a 30 graus.
+
+Para cada frame, os pares de oxigênios dentro do raio são obtidos pela lista
+de células. Cada par gera quatro triplas candidatas (dois sentidos, dois
+hidrogênios) e todos os ângulos são avaliados de uma vez, em blocos de pares
+(limite de memória). Apenas as contagens ficam na memória; as listas de
+ligações de cada frame podem ser gravadas em disco, um arquivo por frame.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from distancia_e_angulo import (TAM_TEXTO, TAM_TEXTO_PROC, cabecalho,
+                                existe_arquivo, salvar_dataframe)
+from geometria import ListaCelulas, imagem_minima
+from topologia import IndiceTopologia
+from trajetoria import iterar_frames, ler_topologia
+
+# Critério geométrico padrão
+RAIO_OO = 0.35  # nm
+ANGULO_MAXIMO = 30.0  # graus
+
+# Pares de oxigênios avaliados por vez (cada par gera 4 triplas)
+MAX_PARES_BLOCO = 250_000
+
+# Maior número de ligações por molécula no histograma
+MAX_LIGACOES_MOLECULA = 10
+
+
+class LigacoesHidrogenio:
+    """Detecta ligações de hidrogênio água-água, frame a frame."""
+
+    def __init__(self, topologia, raio_oo=RAIO_OO, angulo_maximo=ANGULO_MAXIMO,
+                 max_pares=MAX_PARES_BLOCO):
+        """
+        Inicializa o detector.
+
+        Parameters
+        ----------
+        topologia : IndiceTopologia
+            Índice de topologia do sistema.
+        raio_oo : float, opcional
+            Maior distância O_d...O_a (nm). Padrão é RAIO_OO.
+        angulo_maximo : float, opcional
+            Maior ângulo H-O_d...O_a (graus). Padrão é ANGULO_MAXIMO.
+        max_pares : int, opcional
+            Pares de oxigênios avaliados por bloco. Padrão é MAX_PARES_BLOCO.
+
+        """
+        self.ind_o, self.ind_h1, self.ind_h2 = topologia.agua()
+        if len(self.ind_o) == 0:
+            raise ValueError("Nenhuma molécula de água encontrada.")
+
+        self.qtde_moleculas = len(self.ind_o)
+        self.raio_oo = float(raio_oo)
+        self.cos_minimo = np.cos(np.radians(angulo_maximo))
+        self.max_pares = int(max_pares)
+
+        # acumulados ao longo dos frames
+        self.qtde_frames = 0
+        self.soma_molecula = np.zeros(self.qtde_moleculas, dtype=np.int64)
+        self.histograma = np.zeros(MAX_LIGACOES_MOLECULA + 1, dtype=np.int64)
+
+    def ligacoes(self, coords, caixa=None):
+        """
+        Encontra as ligações de hidrogênio de um frame.
+
+        Parameters
+        ----------
+        coords : numpy.ndarray
+            Coordenadas (N, 3) de todos os átomos do frame.
+        caixa : numpy.ndarray, opcional
+            Matriz 3 x 3 da caixa (imagem mínima). Padrão é None.
+
+        Returns
+        -------
+        doador, hidrogenio, aceitador : numpy.ndarray
+            Índice (0 a qtde_moleculas - 1) da molécula doadora, número do
+            hidrogênio (1 ou 2) e índice da molécula aceitadora.
+        distancia : numpy.ndarray
+            Distância O_d...O_a (nm).
+        angulo : numpy.ndarray
+            Ângulo H-O_d...O_a (graus).
+
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        oxigenios = coords[self.ind_o]
+
+        # vetores O-H de cada molécula, formato (M, 2, 3), e seus módulos
+        vetores_oh = imagem_minima(np.stack((coords[self.ind_h1], coords[self.ind_h2]), axis=1) -
+                                   oxigenios[:, None, :], caixa)
+        modulos_oh = np.linalg.norm(vetores_oh, axis=2)
+
+        ind_i, ind_j, dist = ListaCelulas(oxigenios, self.raio_oo, caixa).pares()
+
+        partes = []
+        for inicio in range(0, len(ind_i), self.max_pares):
+            bloco = slice(inicio, inicio + self.max_pares)
+            partes.append(self._avaliar_bloco(oxigenios, vetores_oh, modulos_oh, caixa,
+                                              ind_i[bloco], ind_j[bloco], dist[bloco]))
+
+        if not partes:
+            vazio = np.empty(0, dtype=np.int32)
+            return vazio, vazio.copy(), vazio.copy(), np.empty(0), np.empty(0)
+
+        return tuple(np.concatenate(parte) for parte in zip(*partes))
+
+    def _avaliar_bloco(self, oxigenios, vetores_oh, modulos_oh, caixa, ind_i, ind_j, dist):
+        """Avalia as 4 triplas (sentido x hidrogênio) de um bloco de pares."""
+        vetores_oo = imagem_minima(oxigenios[ind_j] - oxigenios[ind_i], caixa)
+
+        # cossenos, formato (P, 2, 2): [sentido (i -> j, j -> i), hidrogênio]
+        cossenos = np.stack((np.einsum("pk,phk->ph", vetores_oo, vetores_oh[ind_i]) /
+                             modulos_oh[ind_i],
+                             -np.einsum("pk,phk->ph", vetores_oo, vetores_oh[ind_j]) /
+                             modulos_oh[ind_j]), axis=1) / dist[:, None, None]
+
+        par, sentido, hidrogenio = np.nonzero(cossenos >= self.cos_minimo)
+        doador = np.where(sentido == 0, ind_i[par], ind_j[par]).astype(np.int32)
+        aceitador = np.where(sentido == 0, ind_j[par], ind_i[par]).astype(np.int32)
+        angulo = np.degrees(np.arccos(np.clip(cossenos[par, sentido, hidrogenio], -1.0, 1.0)))
+
+        return doador, (hidrogenio + 1).astype(np.int32), aceitador, dist[par], angulo
+
+    def adicionar_frame(self, coords, caixa=None):
+        """
+        Acumula as contagens de um frame.
+
+        Parameters
+        ----------
+        coords : numpy.ndarray
+            Coordenadas (N, 3) de todos os átomos do frame.
+        caixa : numpy.ndarray, opcional
+            Matriz 3 x 3 da caixa do frame. Padrão é None.
+
+        Returns
+        -------
+        ligacoes : tuple
+            Resultado de LigacoesHidrogenio.ligacoes para o frame.
+        por_molecula : numpy.ndarray
+            Ligações (doadas + aceitas) de cada molécula no frame.
+
+        """
+        ligacoes = self.ligacoes(coords, caixa)
+        doador, _, aceitador = ligacoes[:3]
+
+        por_molecula = (np.bincount(doador, minlength=self.qtde_moleculas) +
+                        np.bincount(aceitador, minlength=self.qtde_moleculas))
+        self.soma_molecula += por_molecula
+        self.histograma += np.bincount(np.minimum(por_molecula, MAX_LIGACOES_MOLECULA),
+                                       minlength=MAX_LIGACOES_MOLECULA + 1)
+        self.qtde_frames += 1
+
+        return ligacoes, por_molecula
+
+    def media_por_molecula(self):
+        """
+        Média de ligações de cada molécula ao longo dos frames.
+
+        Returns
+        -------
+        numpy.ndarray
+            Média (doadas + aceitas) de cada molécula de água.
+
+        """
+        if self.qtde_frames == 0:
+            raise ValueError("Nenhum frame foi adicionado.")
+        return self.soma_molecula / self.qtde_frames
+
+    def distribuicao(self):
+        """
+        Fração de moléculas com 0, 1, 2, ... ligações (todos os frames).
+
+        Returns
+        -------
+        df_distribuicao : Pandas dataframe
+            Colunas ligacoes e fracao (a última linha soma as moléculas com
+            MAX_LIGACOES_MOLECULA ligações ou mais).
+
+        """
+        if self.qtde_frames == 0:
+            raise ValueError("Nenhum frame foi adicionado.")
+        return pd.DataFrame({"ligacoes": np.arange(MAX_LIGACOES_MOLECULA + 1),
+                             "fracao": self.histograma / self.histograma.sum()})
+
+
+def salvar_ligacoes(diretorio, numero, ligacoes, topologia_hb):
+    """
+    Grava a lista de ligações de um frame ('<diretorio>/frame_<numero>.npz').
+
+    Os índices gravados são as linhas dos átomos no '.gro' (O doador, H e O
+    aceitador), em int32.
+
+    Parameters
+    ----------
+    diretorio : string
+        Diretório de saída (criado se não existir).
+    numero : int
+        Número do frame.
+    ligacoes : tuple
+        Resultado de LigacoesHidrogenio.ligacoes.
+    topologia_hb : LigacoesHidrogenio
+        Detector usado (para converter moléculas em linhas de átomos).
+
+    Returns
+    -------
+    status : bool
+        True, nenhum erro ocorreu; False, erro ao salvar.
+
+    """
+    doador, hidrogenio, aceitador, distancia, angulo = ligacoes
+    atomo_h = np.where(hidrogenio == 1, topologia_hb.ind_h1[doador],
+                       topologia_hb.ind_h2[doador])
+    try:
+        Path(diretorio).mkdir(parents=True, exist_ok=True)
+        np.savez(Path(diretorio) / f"frame_{numero:06d}.npz",
+                 doador=topologia_hb.ind_o[doador].astype(np.int32),
+                 hidrogenio=atomo_h.astype(np.int32),
+                 aceitador=topologia_hb.ind_o[aceitador].astype(np.int32),
+                 distancia=distancia.astype(np.float32),
+                 angulo=angulo.astype(np.float32))
+    except OSError as msg_erro:
+        print(f"Erro ao salvar ligações do frame {numero}! Erro: {msg_erro}")
+        return False
+
+    return True
+
+
+def analisar_ligacoes(arquivo_gro, raio_oo=RAIO_OO, angulo_maximo=ANGULO_MAXIMO,
+                      primeiro=0, ultimo=None, passo=1, diretorio_ligacoes=None):
+    """
+    Conta as ligações de hidrogênio frame a frame.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+    raio_oo, angulo_maximo : float, opcional
+        Critério geométrico (ver LigacoesHidrogenio).
+    primeiro, ultimo, passo : int, opcional
+        Seleção de frames (ver iterar_frames).
+    diretorio_ligacoes : string, opcional
+        Se informado, grava a lista de ligações de cada frame nesse
+        diretório (ver salvar_ligacoes). Padrão é None.
+
+    Returns
+    -------
+    df_frames : Pandas dataframe
+        Colunas frame, descricao, ligacoes (total do frame) e
+        media_por_molecula.
+    detector : LigacoesHidrogenio
+        Detector com as contagens acumuladas (por molécula e distribuição).
+
+    """
+    topologia = IndiceTopologia(ler_topologia(arquivo_gro))
+    detector = LigacoesHidrogenio(topologia, raio_oo, angulo_maximo)
+    dados = []
+
+    for numero, coords, caixa, descricao in iterar_frames(arquivo_gro, primeiro=primeiro,
+                                                          ultimo=ultimo, passo=passo):
+        print(" + Ligações de H, frame".ljust(TAM_TEXTO_PROC, ".") + f": {numero}", end="\r")
+        ligacoes, por_molecula = detector.adicionar_frame(coords, caixa)
+        if diretorio_ligacoes is not None:
+            salvar_ligacoes(diretorio_ligacoes, numero, ligacoes, detector)
+
+        dados.append([numero, descricao, len(ligacoes[0]), por_molecula.mean()])
+    print("")
+
+    df_frames = pd.DataFrame(dados, columns=["frame", "descricao", "ligacoes",
+                                             "media_por_molecula"])
+
+    return df_frames, detector
+
+
+def main(arquivo_gro):
+    """
+    Procedimento principal: resumo por frame salvo em 'ligacoes_hidrogenio.csv'.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Local do arquivo .gro (estrutura ou trajetória).
+
+    Returns
+    -------
+    None.
+
+    """
+    df_frames, detector = analisar_ligacoes(arquivo_gro)
+    if salvar_dataframe(df_frames, "ligacoes_hidrogenio"):
+        print(" + Ligações de hidrogênio por frame salvas!")
+
+    # Imprimindo o resumo
+    print("")
+    print("-".center(80, "-"))
+    print(f'{"|":<1} {"Ligações de hidrogênio":<76} '
+          f'{"|":>1}')
+    print("-".center(80, "-"))
+    print("Número de frames".ljust(40, ".") + ": " + f" {len(df_frames)}")
+    print("Moléculas de água".ljust(40, ".") + ": " + f" {detector.qtde_moleculas}")
+    print("Ligações por frame (média)".ljust(40, ".") + ": " +
+          f" {df_frames['ligacoes'].mean():1.6}")
+    print("Ligações por molécula (média)".ljust(40, ".") + ": " +
+          f" {df_frames['media_por_molecula'].mean():1.6}")
+    for _, linha in detector.distribuicao().iterrows():
+        if linha["fracao"] > 0:
+            print(f"Moléculas com {int(linha['ligacoes'])} ligações".ljust(40, ".") + ": " +
+                  f" {100 * linha['fracao']:1.4} %")
+
+
+if __name__ == '__main__':
+    cabecalho()
+
+    if len(sys.argv) == 2:
+        arquivo = sys.argv[1]
+    else:
+        arquivo = input("Local e nome do arquivo de estrutura "
+                        "(.gro)".ljust(TAM_TEXTO, ".") + ": ").strip()
+
+    if existe_arquivo(arquivo):
+        main(arquivo)
+    else:
+        print(f" + Arquivo ({arquivo}) não existe!")
+        sys.exit()
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Análise de vários arquivos '.gro' (ou frames) em paralelo.
+
+Cada processo do ProcessPoolExecutor recebe um intervalo de frames de um
+arquivo (as posições, em bytes, vêm do IndiceTrajetoria) e lê os seus
+frames direto do arquivo mapeado em memória (mmap): a leitura do '.gro',
+que é a etapa mais cara, também é dividida entre os processos, e o
+processo principal não lê nem copia coordenadas. Os índices de topologia
+(O, H1 e H2 de cada água) ficam em memória compartilhada
+(multiprocessing.shared_memory), um bloco por topologia distinta.
+
+Cada processo devolve os acumuladores (distância O-O e ângulo H-O-H) de
+cada frame do seu intervalo, que são somados no processo principal em um
+único relatório.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import hashlib
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from distancia_e_angulo import (TAM_TEXTO, TAM_TEXTO_PROC, cabecalho, calc_angle,
+                                existe_arquivo, salvar_dataframe)
+from geometria import distancias_em_blocos, pares_dentro_do_corte
+from topologia import IndiceTopologia
+from trajetoria import Acumulador, IndiceTrajetoria, ler_frame_coordenadas, ler_topologia
+
+# Intervalos de frames por processo (divisão do trabalho entre os processos)
+INTERVALOS_POR_PROCESSO = 4
+
+# Topologia em uso no processo de trabalho: (nome do bloco, bloco, índices)
+_TOPOLOGIA = None
+
+# Arquivo aberto no processo de trabalho: (nome, arquivo, mmap)
+_ARQUIVO = None
+
+
+def _anexar_topologia(nome, qtde_moleculas):
+    """
+    Anexa (uma vez por processo) os índices de topologia compartilhados.
+
+    Parameters
+    ----------
+    nome : string
+        Nome do bloco de memória compartilhada.
+    qtde_moleculas : int
+        Número de moléculas de água.
+
+    Returns
+    -------
+    numpy.ndarray
+        Matriz (3, qtde_moleculas): linhas de O, H1 e H2.
+
+    """
+    global _TOPOLOGIA  # pylint: disable=global-statement
+
+    if _TOPOLOGIA is None or _TOPOLOGIA[0] != nome:
+        if _TOPOLOGIA is not None:
+            _TOPOLOGIA[1].close()
+        bloco = shared_memory.SharedMemory(name=nome)
+        indices = np.ndarray((3, qtde_moleculas), dtype=np.int64, buffer=bloco.buf)
+        _TOPOLOGIA = (nome, bloco, indices)
+
+    return _TOPOLOGIA[2]
+
+
+def _abrir_arquivo(arquivo_gro):
+    """
+    Abre (uma vez por processo) o arquivo '.gro' mapeado em memória.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+
+    Returns
+    -------
+    mmap.mmap
+        Conteúdo do arquivo.
+
+    """
+    global _ARQUIVO  # pylint: disable=global-statement
+
+    if _ARQUIVO is None or _ARQUIVO[0] != arquivo_gro:
+        if _ARQUIVO is not None:
+            _ARQUIVO[2].close()
+            _ARQUIVO[1].close()
+        f_arquivo = open(arquivo_gro, "rb")
+        buffer = mmap.mmap(f_arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        _ARQUIVO = (arquivo_gro, f_arquivo, buffer)
+
+    return _ARQUIVO[2]
+
+
+def resumo_frame(coords, caixa, indices, cutoff=None):
+    """
+    Calcula os acumuladores de distância O-O e ângulo H-O-H de um frame.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        Coordenadas (N, 3) do frame.
+    caixa : numpy.ndarray
+        Matriz 3 x 3 da caixa (None: sem condições periódicas).
+    indices : numpy.ndarray
+        Matriz (3, M) com os índices de O, H1 e H2 de cada água.
+    cutoff : float, opcional
+        Raio de corte (nm) das distâncias O-O. Padrão é None (todos os pares).
+
+    Returns
+    -------
+    distancia, angulo : Acumulador
+        Acumuladores do frame.
+
+    """
+    ind_o, ind_h1, ind_h2 = indices
+    oxigenios = coords[ind_o]
+    _, _, angulos = calc_angle(oxigenios, coords[ind_h1], coords[ind_h2], caixa)
+
+    distancia = Acumulador()
+    if cutoff is None:
+        for _, _, dist in distancias_em_blocos(oxigenios, caixa):
+            distancia.adicionar(np.round(dist, 2))
+    else:
+        distancia.adicionar(np.round(pares_dentro_do_corte(oxigenios, cutoff, caixa)[2], 2))
+
+    angulo = Acumulador()
+    angulo.adicionar(angulos)
+
+    return distancia, angulo
+
+
+def resumo_intervalo(arquivo_gro, numeros, posicoes, nome_topologia, qtde_moleculas,
+                     periodico=True, cutoff=None):
+    """
+    Lê e analisa um intervalo de frames (executado nos processos de trabalho).
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+    numeros : numpy.ndarray
+        Números dos frames.
+    posicoes : numpy.ndarray
+        Posição (byte) do início de cada frame (ver IndiceTrajetoria).
+    nome_topologia : string
+        Nome do bloco com os índices de topologia.
+    qtde_moleculas : int
+        Número de moléculas de água.
+    periodico : bool, opcional
+        Usa a imagem mínima (caixa do frame). Padrão é True.
+    cutoff : float, opcional
+        Raio de corte (nm) das distâncias O-O. Padrão é None (todos os pares).
+
+    Returns
+    -------
+    list
+        (numero, descricao, distancia, angulo) de cada frame.
+
+    """
+    indices = _anexar_topologia(nome_topologia, qtde_moleculas)
+    buffer = _abrir_arquivo(arquivo_gro)
+
+    resultados = []
+    for numero, posicao in zip(numeros, posicoes):
+        descricao, coords, caixa, _ = ler_frame_coordenadas(buffer, int(posicao))
+        distancia, angulo = resumo_frame(coords, caixa if periodico else None, indices, cutoff)
+        resultados.append((int(numero), descricao, distancia, angulo))
+
+    return resultados
+
+
+class _Topologias:
+    """Blocos de memória compartilhada com os índices de topologia."""
+
+    def __init__(self):
+        """Inicializa propriedades."""
+        self.blocos = {}  # assinatura dos índices -> bloco
+
+    def bloco(self, indices):
+        """Bloco com os índices (3, M) de topologia (um por topologia distinta)."""
+        assinatura = hashlib.sha1(indices.tobytes()).hexdigest()
+        if assinatura not in self.blocos:
+            bloco = shared_memory.SharedMemory(create=True, size=max(indices.nbytes, 1))
+            np.ndarray(indices.shape, dtype=np.int64, buffer=bloco.buf)[:] = indices
+            self.blocos[assinatura] = bloco
+        return self.blocos[assinatura]
+
+    def fechar(self):
+        """Libera todos os blocos."""
+        for bloco in self.blocos.values():
+            bloco.close()
+            bloco.unlink()
+        self.blocos = {}
+
+
+def intervalos(arquivos, trabalhadores, primeiro=0, ultimo=None, passo=1):
+    """
+    Divide os frames selecionados de cada arquivo em intervalos.
+
+    Parameters
+    ----------
+    arquivos : list
+        Arquivos '.gro'.
+    trabalhadores : int
+        Número de processos.
+    primeiro, ultimo, passo : int, opcional
+        Seleção de frames de cada arquivo (ver iterar_frames).
+
+    Yields
+    ------
+    arquivo : string
+        Arquivo '.gro'.
+    indices : numpy.ndarray
+        Matriz (3, M) com os índices de O, H1 e H2 de cada água.
+    numeros, posicoes : numpy.ndarray
+        Números e posições (bytes) dos frames do intervalo.
+
+    """
+    for arquivo in arquivos:
+        ind_o, ind_h1, ind_h2 = IndiceTopologia(ler_topologia(arquivo)).agua()
+        indices = np.stack((ind_o, ind_h1, ind_h2)).astype(np.int64)
+
+        with IndiceTrajetoria(arquivo) as indice:
+            numeros = np.arange(len(indice))[primeiro:ultimo:passo]
+            posicoes = indice.posicoes[numeros]
+
+        qtde = max(1, int(np.ceil(len(numeros) / (INTERVALOS_POR_PROCESSO * trabalhadores))))
+        for inicio in range(0, len(numeros), qtde):
+            yield arquivo, indices, numeros[inicio:inicio + qtde], posicoes[inicio:inicio + qtde]
+
+
+def analisar_em_paralelo(arquivos, trabalhadores=None, cutoff=None, periodico=True,
+                         primeiro=0, ultimo=None, passo=1):
+    """
+    Calcula distâncias O-O e ângulos H-O-H de vários arquivos/frames.
+
+    Parameters
+    ----------
+    arquivos : list
+        Arquivos '.gro' (estruturas ou trajetórias).
+    trabalhadores : int, opcional
+        Número de processos. Padrão é None (os.cpu_count()).
+    cutoff : float, opcional
+        Raio de corte (nm) das distâncias O-O. Padrão é None.
+    periodico : bool, opcional
+        Usa a imagem mínima (caixa do frame). Padrão é True.
+    primeiro, ultimo, passo : int, opcional
+        Seleção de frames de cada arquivo (ver iterar_frames).
+
+    Returns
+    -------
+    df_frames : dataframe Pandas
+        Resumo de cada frame (arquivo, frame, descricao, distancia_media,
+        angulo_medio, angulo_min e angulo_max).
+    acumuladores : dict
+        Acumulador de 'distancia' e de 'angulo' de todos os frames.
+
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    acumuladores = {"distancia": Acumulador(), "angulo": Acumulador()}
+    dados = {}
+    topologias = _Topologias()
+
+    try:
+        with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+            futuros = {}  # future -> (ordem do intervalo, arquivo)
+            for ordem, (arquivo, indices, numeros, posicoes) in enumerate(
+                    intervalos(arquivos, trabalhadores, primeiro, ultimo, passo)):
+                topologia = topologias.bloco(indices)
+                futuro = executor.submit(resumo_intervalo, arquivo, numeros, posicoes,
+                                         topologia.name, indices.shape[1], periodico, cutoff)
+                futuros[futuro] = (ordem, arquivo)
+
+            for futuro in as_completed(futuros):
+                ordem, arquivo = futuros[futuro]
+                for numero, descricao, distancia, angulo in futuro.result():
+                    acumuladores["distancia"].juntar(distancia)
+                    acumuladores["angulo"].juntar(angulo)
+                    dados[(ordem, numero)] = [arquivo, numero, descricao, distancia.media,
+                                              angulo.media, angulo.minimo, angulo.maximo]
+                print(" + Frames analisados".ljust(TAM_TEXTO_PROC, ".") + f": {len(dados)}",
+                      end="\r")
+    finally:
+        topologias.fechar()
+    print("")
+
+    df_frames = pd.DataFrame([dados[chave] for chave in sorted(dados)],
+                             columns=["arquivo", "frame", "descricao", "distancia_media",
+                                      "angulo_medio", "angulo_min", "angulo_max"])
+
+    return df_frames, acumuladores
+
+
+def main(arquivos, trabalhadores=None):
+    """
+    Procedimento principal.
+
+    Parameters
+    ----------
+    arquivos : list
+        Arquivos '.gro'.
+    trabalhadores : int, opcional
+        Número de processos. Padrão é None (os.cpu_count()).
+
+    Returns
+    -------
+    None.
+
+    """
+    df_frames, acumuladores = analisar_em_paralelo(arquivos, trabalhadores)
+    salvar_dataframe(df_frames, "resumo_paralelo")
+
+    # Imprimindo o resumo
+    distancia = acumuladores["distancia"]
+    angulo = acumuladores["angulo"]
+    print("")
+    print("-".center(80, "-"))
+    print(f'{"|":<1} {"Resumo (análise em paralelo)":<76} '
+          f'{"|":>1}')
+    print("-".center(80, "-"))
+    print("Número de arquivos".ljust(40, ".") + ": " + f" {len(arquivos)}")
+    print("Número de frames".ljust(40, ".") + ": " + f" {len(df_frames)}")
+    print("Média de distância entre os oxigênios".ljust(40, ".") + ": " + f" {distancia.media:1.6} nm")
+    print("Mean value of angles".ljust(40, ".") + ": " + f" {angulo.media:1.6} degrees")
+    print("Max value of angles".ljust(40, ".") + ": " + f" {angulo.maximo:1.6} degrees")
+    print("Min value of angles".ljust(40, ".") + ": " + f" {angulo.minimo:1.6} degrees")
+
+
+if __name__ == '__main__':
+    cabecalho()
+
+    # uso: python paralelo.py [-j PROCESSOS] arquivo1.gro [arquivo2.gro ...]
+    argumentos = sys.argv[1:]
+    processos = None
+    if len(argumentos) >= 2 and argumentos[0] == "-j":
+        processos = int(argumentos[1])
+        argumentos = argumentos[2:]
+
+    if not argumentos:
+        argumentos = input("Arquivos de estrutura (.gro), separados por "
+                           "espaço".ljust(TAM_TEXTO, ".") + ": ").split()
+
+    faltando = [arquivo for arquivo in argumentos if not existe_arquivo(arquivo)]
+    if faltando or not argumentos:
+        for arquivo in faltando:
+            print(f" + Arquivo ({arquivo}) não existe!")
+        sys.exit()
+
+    main(argumentos, processos)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de topologia (nomes e números de átomos/resíduos) do dataframe '.gro'.
+
+O índice é construído uma única vez a partir do dataframe de criar_df_atomos.
+Os nomes ficam como códigos inteiros (categorias) e cada nome de átomo, nome
+de resíduo e número de resíduo aponta para um vetor de posições (linhas).
+Assim as análises selecionam grupos de átomos por vetores de inteiros, sem
+comparar textos a cada consulta.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import numpy as np
+import pandas as pd
+
+
+def _agrupar(codigos, qtde_grupos):
+    """
+    Agrupa as posições (linhas) por código inteiro.
+
+    Parameters
+    ----------
+    codigos : numpy.ndarray
+        Código de cada linha (0 a qtde_grupos - 1; negativos são ignorados).
+    qtde_grupos : int
+        Número de códigos possíveis.
+
+    Returns
+    -------
+    list
+        Vetor de posições de cada código, em ordem crescente.
+
+    """
+    ordem = np.argsort(codigos, kind="stable")
+    limites = np.searchsorted(codigos[ordem], np.arange(qtde_grupos + 1))
+    return [ordem[limites[k]:limites[k + 1]] for k in range(qtde_grupos)]
+
+
+class IndiceTopologia:
+    """Índice de grupos de átomos (nome, resíduo) de uma estrutura '.gro'."""
+
+    def __init__(self, df_atomos):
+        """
+        Constrói o índice em uma passada pelo dataframe.
+
+        Parameters
+        ----------
+        df_atomos : Pandas dataframe
+            Dataframe de criar_df_atomos (colunas numero_residuo,
+            nome_residuo e nome_atomo).
+
+        """
+        self.qtde_atomos = len(df_atomos)
+
+        # Nomes como categorias (códigos inteiros)
+        nome_atomo = pd.Categorical(df_atomos["nome_atomo"])
+        nome_residuo = pd.Categorical(df_atomos["nome_residuo"])
+        self.nomes_atomo = np.asarray(nome_atomo.categories, dtype=str)
+        self.nomes_residuo = np.asarray(nome_residuo.categories, dtype=str)
+        self.codigo_atomo = np.asarray(nome_atomo.codes)
+        self.codigo_residuo = np.asarray(nome_residuo.codes)
+        self.numero_residuo = df_atomos["numero_residuo"].to_numpy()
+
+        # Resíduo (bloco de linhas consecutivas) de cada linha
+        mudou = self.numero_residuo[1:] != self.numero_residuo[:-1]
+        self.grupo = np.concatenate(([0], np.cumsum(mudou))) if self.qtde_atomos else \
+            np.empty(0, dtype=np.int64)
+        self.qtde_grupos = int(self.grupo[-1]) + 1 if self.qtde_atomos else 0
+
+        # Nome -> posições
+        self._por_nome_atomo = dict(zip(self.nomes_atomo,
+                                        _agrupar(self.codigo_atomo, len(self.nomes_atomo))))
+        self._por_nome_residuo = dict(zip(self.nomes_residuo,
+                                          _agrupar(self.codigo_residuo, len(self.nomes_residuo))))
+        self._por_numero_residuo = None
+
+    def atomos(self, *nomes):
+        """
+        Posições dos átomos com os nomes informados (por exemplo, "OW").
+
+        Parameters
+        ----------
+        *nomes : string
+            Nomes de átomo.
+
+        Returns
+        -------
+        numpy.ndarray
+            Posições (linhas), em ordem crescente.
+
+        """
+        vazio = np.empty(0, dtype=np.intp)
+        partes = [self._por_nome_atomo.get(nome, vazio) for nome in nomes]
+        return np.sort(np.concatenate(partes)) if len(partes) > 1 else partes[0]
+
+    def atomos_prefixo(self, prefixo):
+        """
+        Posições dos átomos cujo nome começa com prefixo (por exemplo, "HW").
+
+        Parameters
+        ----------
+        prefixo : string
+            Início do nome do átomo.
+
+        Returns
+        -------
+        numpy.ndarray
+            Posições (linhas), em ordem crescente.
+
+        """
+        nomes = [nome for nome in self.nomes_atomo if nome.startswith(prefixo)]
+        if not nomes:
+            return np.empty(0, dtype=np.intp)
+        return self.atomos(*nomes)
+
+    def residuos_nome(self, nome):
+        """
+        Posições dos átomos dos resíduos com o nome informado (ex.: "SOL").
+
+        Parameters
+        ----------
+        nome : string
+            Nome do resíduo.
+
+        Returns
+        -------
+        numpy.ndarray
+            Posições (linhas), em ordem crescente.
+
+        """
+        return self._por_nome_residuo.get(nome, np.empty(0, dtype=np.intp))
+
+    def residuo(self, numero):
+        """
+        Posições dos átomos com o número de resíduo informado.
+
+        Parameters
+        ----------
+        numero : int
+            Número do resíduo (coluna numero_residuo).
+
+        Returns
+        -------
+        numpy.ndarray
+            Posições (linhas), em ordem crescente.
+
+        """
+        if self._por_numero_residuo is None:
+            numeros, codigos = np.unique(self.numero_residuo, return_inverse=True)
+            self._por_numero_residuo = dict(zip(numeros.tolist(),
+                                                _agrupar(codigos, len(numeros))))
+
+        return self._por_numero_residuo.get(int(numero), np.empty(0, dtype=np.intp))
+
+    def agua(self, oxigenio="OW", prefixo_hidrogenio="HW"):
+        """
+        Localiza as linhas de O, H1 e H2 de cada molécula de água.
+
+        Os resíduos são os blocos de linhas consecutivas com o mesmo
+        'numero_residuo' (funciona mesmo quando a numeração reinicia após
+        99999).
+
+        Parameters
+        ----------
+        oxigenio : string, opcional
+            Nome do átomo de oxigênio. Padrão é "OW".
+        prefixo_hidrogenio : string, opcional
+            Início do nome dos hidrogênios. Padrão é "HW".
+
+        Returns
+        -------
+        ind_o, ind_h1, ind_h2 : numpy.ndarray
+            Posições do oxigênio e dos dois primeiros hidrogênios de cada
+            molécula completa.
+
+        """
+        ind_o = self.atomos(oxigenio)
+        ind_h = self.atomos_prefixo(prefixo_hidrogenio)
+
+        # ordem do hidrogênio dentro do resíduo (0, 1, ...)
+        grupo_h = self.grupo[ind_h]
+        novo = np.ones(len(ind_h), dtype=bool)
+        novo[1:] = grupo_h[1:] != grupo_h[:-1]
+        ordem_no_grupo = np.arange(len(ind_h)) - np.maximum.accumulate(
+            np.where(novo, np.arange(len(ind_h)), 0))
+
+        h1_por_grupo = np.full(self.qtde_grupos, -1)
+        h2_por_grupo = np.full(self.qtde_grupos, -1)
+        h1_por_grupo[grupo_h[ordem_no_grupo == 0]] = ind_h[ordem_no_grupo == 0]
+        h2_por_grupo[grupo_h[ordem_no_grupo == 1]] = ind_h[ordem_no_grupo == 1]
+
+        ind_h1 = h1_por_grupo[self.grupo[ind_o]]
+        ind_h2 = h2_por_grupo[self.grupo[ind_o]]
+        completa = (ind_h1 >= 0) & (ind_h2 >= 0)
+
+        return ind_o[completa], ind_h1[completa], ind_h2[completa]
@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura de trajetórias '.gro' (vários frames concatenados) frame a frame.
+
+Os frames são lidos de um arquivo mapeado em memória (mmap), um de cada vez,
+e as páginas já processadas são devolvidas ao sistema operacional. Assim a
+memória usada não depende do tamanho da trajetória.
+
+Para acesso aleatório, IndiceTrajetoria guarda a posição (byte) do início de
+cada frame em um arquivo auxiliar ('<arquivo>.gro.idx.npz'), criado uma única
+vez e refeito sempre que o tamanho ou a data de modificação do '.gro' mudar.
+
+@author: Rogério Ribeiro Macêdo
+
+"""
+# pylint: disable=import-error
+import mmap
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from distancia_e_angulo import (LINHAS_POR_BLOCO, TAM_TEXTO, TAM_TEXTO_PROC,
+                                cabecalho, cabecalho_frame, dist_oxi_oxi,
+                                existe_arquivo, fim_das_linhas, ler_coordenadas,
+                                ler_frame, linha_caixa, matriz_linhas,
+                                molecules_angles, salvar_dataframe)
+from topologia import IndiceTopologia
+
+
+def _liberar_paginas(buffer, inicio, fim):
+    """
+    Devolve ao sistema as páginas do mmap entre inicio e fim (já lidas).
+
+    Parameters
+    ----------
+    buffer : mmap.mmap
+        Arquivo mapeado em memória.
+    inicio : int
+        Posição (byte) inicial.
+    fim : int
+        Posição (byte) final.
+
+    Returns
+    -------
+    None.
+
+    """
+    if not hasattr(buffer, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+        return
+
+    inicio = (inicio // mmap.PAGESIZE) * mmap.PAGESIZE
+    tamanho = ((fim - inicio) // mmap.PAGESIZE) * mmap.PAGESIZE
+    if tamanho > 0:
+        buffer.madvise(mmap.MADV_DONTNEED, inicio, tamanho)
+
+
+def ler_frame_coordenadas(buffer, inicio=0, precisao=np.float64,
+                          linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê apenas as coordenadas e a caixa de um frame '.gro'.
+
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    inicio : int, opcional
+        Posição (byte) da linha de descrição do frame. Padrão é 0.
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas. Padrão é np.float64.
+    linhas_por_bloco : int, opcional
+        Número de linhas convertidas por vez. Padrão é LINHAS_POR_BLOCO.
+
+    Returns
+    -------
+    descricao : string
+        Linha de descrição do frame.
+    coords : numpy.ndarray
+        Coordenadas (N, 3) em nm.
+    caixa : numpy.ndarray
+        Matriz 3 x 3 da caixa.
+    fim : int
+        Posição (byte) logo após o frame.
+
+    """
+    descricao, qtde_atomos, pos = cabecalho_frame(buffer, inicio)
+
+    coords = np.empty((qtde_atomos, 3), dtype=precisao)
+    for primeira in range(0, qtde_atomos, linhas_por_bloco):
+        qtde = min(linhas_por_bloco, qtde_atomos - primeira)
+        fim_bloco = fim_das_linhas(buffer, pos, qtde)
+        coords[primeira:primeira + qtde] = ler_coordenadas(
+            matriz_linhas(buffer[pos:fim_bloco], qtde), precisao)
+        pos = fim_bloco
+
+    caixa, fim = linha_caixa(buffer, pos)
+
+    return descricao, coords, caixa, fim
+
+
+def pular_frame(buffer, inicio=0):
+    """
+    Encontra o fim de um frame sem converter as linhas de átomos.
+
+    Parameters
+    ----------
+    buffer : bytes ou mmap.mmap
+        Conteúdo do arquivo.
+    inicio : int, opcional
+        Posição (byte) da linha de descrição do frame. Padrão é 0.
+
+    Returns
+    -------
+    int
+        Posição (byte) logo após o frame.
+
+    """
+    _, qtde_atomos, pos = cabecalho_frame(buffer, inicio)
+    _, fim = linha_caixa(buffer, fim_das_linhas(buffer, pos, qtde_atomos))
+
+    return fim
+
+
+def iterar_frames(arquivo_gro, precisao=np.float64, primeiro=0, ultimo=None, passo=1):
+    """
+    Percorre os frames de uma trajetória '.gro', um de cada vez.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro' (um ou mais frames).
+    precisao : numpy.dtype, opcional
+        Tipo das coordenadas. Padrão é np.float64.
+    primeiro : int, opcional
+        Primeiro frame (contando a partir de 0). Padrão é 0.
+    ultimo : int, opcional
+        Último frame (exclusive). Padrão é None (até o fim do arquivo).
+    passo : int, opcional
+        Intervalo entre os frames lidos. Padrão é 1.
+
+    Yields
+    ------
+    numero : int
+        Número do frame.
+    coords : numpy.ndarray
+        Coordenadas (N, 3) do frame, na ordem das linhas do '.gro' (mesma
+        ordem do dataframe de criar_df_atomos).
+    caixa : numpy.ndarray
+        Matriz 3 x 3 da caixa do frame.
+    descricao : string
+        Linha de descrição do frame.
+
+    """
+    with open(arquivo_gro, "rb") as f_arquivo, \
+            mmap.mmap(f_arquivo.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        numero = 0
+        pos = 0
+        while pos < len(buffer) and buffer[pos:pos + 4096].strip():
+            if ultimo is not None and numero >= ultimo:
+                break
+
+            if numero >= primeiro and (numero - primeiro) % passo == 0:
+                descricao, coords, caixa, fim = ler_frame_coordenadas(buffer, pos, precisao)
+                yield numero, coords, caixa, descricao
+            else:
+                fim = pular_frame(buffer, pos)
+
+            _liberar_paginas(buffer, pos, fim)
+            pos = fim
+            numero += 1
+
+
+class IndiceTrajetoria:
+    """Índice de frames de uma trajetória '.gro' para acesso aleatório (mmap)."""
+
+    def __init__(self, arquivo_gro, recriar=False):
+        """
+        Carrega o índice do arquivo auxiliar ou o cria (uma passada no '.gro').
+
+        Parameters
+        ----------
+        arquivo_gro : string
+            Nome/local do arquivo '.gro'.
+        recriar : bool, opcional
+            Ignora o índice salvo e refaz a indexação. Padrão é False.
+
+        """
+        self.arquivo_gro = str(arquivo_gro)
+        self.arquivo_indice = self.arquivo_gro + ".idx.npz"
+        self._f_arquivo = None
+        self._buffer = None
+        self.posicoes = None  # posição (byte) do início de cada frame
+        self.assinatura = None  # (tamanho, data de modificação) do '.gro'
+
+        if recriar or not self._carregar():
+            self._indexar()
+
+    def _assinatura_atual(self):
+        """Tamanho (bytes) e data de modificação (ns) do arquivo '.gro'."""
+        info = os.stat(self.arquivo_gro)
+        return info.st_size, info.st_mtime_ns
+
+    def _carregar(self):
+        """
+        Carrega o índice salvo, se ainda for válido.
+
+        Returns
+        -------
+        bool
+            True, se o índice foi carregado; False, se não existe ou expirou.
+
+        """
+        try:
+            with np.load(self.arquivo_indice) as dados:
+                assinatura = (int(dados["tamanho"]), int(dados["mtime_ns"]))
+                posicoes = dados["posicoes"]
+        except (OSError, KeyError, ValueError):
+            return False
+
+        if assinatura != self._assinatura_atual():
+            return False
+
+        self.posicoes = posicoes
+        self.assinatura = assinatura
+        return True
+
+    def _indexar(self):
+        """
+        Percorre o '.gro' uma vez e salva a posição de cada frame.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.fechar()
+        posicoes = []
+        assinatura = self._assinatura_atual()
+
+        with open(self.arquivo_gro, "rb") as f_arquivo, \
+                mmap.mmap(f_arquivo.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            pos = 0
+            while pos < len(buffer) and buffer[pos:pos + 4096].strip():
+                posicoes.append(pos)
+                fim = pular_frame(buffer, pos)
+                _liberar_paginas(buffer, pos, fim)
+                pos = fim
+
+                if len(posicoes) % 1000 == 0:
+                    print(" + Indexando frames".ljust(TAM_TEXTO_PROC, ".") +
+                          f": {len(posicoes)}", end="\r")
+        print(" + Indexando frames".ljust(TAM_TEXTO_PROC, ".") + f": {len(posicoes)}")
+
+        self.posicoes = np.array(posicoes, dtype=np.int64)
+        self.assinatura = assinatura
+
+        try:
+            np.savez(self.arquivo_indice, posicoes=self.posicoes,
+                     tamanho=assinatura[0], mtime_ns=assinatura[1])
+        except OSError as msg_erro:
+            print(f"Erro ao salvar {self.arquivo_indice}! Erro: {msg_erro}")
+
+    def _mmap(self):
+        """Abre (ou reabre, se o '.gro' mudou) o arquivo mapeado em memória."""
+        if self._assinatura_atual() != self.assinatura:
+            self._indexar()
+
+        if self._buffer is None:
+            self._f_arquivo = open(self.arquivo_gro, "rb")
+            self._buffer = mmap.mmap(self._f_arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self._buffer
+
+    def _numero(self, numero):
+        """Converte o número do frame (aceita negativos) e valida."""
+        if not -len(self) <= numero < len(self):
+            raise IndexError(f"Frame {numero} fora da trajetória ({len(self)} frames).")
+        return numero % len(self)
+
+    def __len__(self):
+        """Número de frames."""
+        return len(self.posicoes)
+
+    def frame(self, numero, precisao=np.float64):
+        """
+        Lê um frame completo (mesmas colunas de criar_df_atomos).
+
+        Parameters
+        ----------
+        numero : int
+            Número do frame (contando a partir de 0; negativos contam do fim).
+        precisao : numpy.dtype, opcional
+            Tipo das coordenadas. Padrão é np.float64.
+
+        Returns
+        -------
+        df_atomos : dataframe Pandas
+            Átomos do frame, com attrs["descricao"] e attrs["caixa"].
+
+        """
+        buffer = self._mmap()
+        df_atomos, _ = ler_frame(buffer, int(self.posicoes[self._numero(numero)]), precisao)
+
+        return df_atomos
+
+    def coordenadas(self, numero, precisao=np.float64):
+        """
+        Lê apenas as coordenadas e a caixa de um frame.
+
+        Parameters
+        ----------
+        numero : int
+            Número do frame (contando a partir de 0; negativos contam do fim).
+        precisao : numpy.dtype, opcional
+            Tipo das coordenadas. Padrão é np.float64.
+
+        Returns
+        -------
+        coords : numpy.ndarray
+            Coordenadas (N, 3) do frame.
+        caixa : numpy.ndarray
+            Matriz 3 x 3 da caixa.
+        descricao : string
+            Linha de descrição do frame.
+
+        """
+        buffer = self._mmap()
+        descricao, coords, caixa, _ = ler_frame_coordenadas(
+            buffer, int(self.posicoes[self._numero(numero)]), precisao)
+
+        return coords, caixa, descricao
+
+    def frames(self, fatia=slice(None), precisao=np.float64):
+        """
+        Percorre uma fatia de frames, lendo direto de cada posição.
+
+        Parameters
+        ----------
+        fatia : slice, opcional
+            Frames desejados, por exemplo slice(1000, 2000, 10). Padrão é
+            slice(None) (todos).
+        precisao : numpy.dtype, opcional
+            Tipo das coordenadas. Padrão é np.float64.
+
+        Yields
+        ------
+        numero, coords, caixa, descricao
+            Mesmo formato de iterar_frames.
+
+        """
+        for numero in range(*fatia.indices(len(self))):
+            coords, caixa, descricao = self.coordenadas(numero, precisao)
+            yield numero, coords, caixa, descricao
+
+    def fechar(self):
+        """Fecha o arquivo mapeado em memória."""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._f_arquivo.close()
+        self._buffer = None
+        self._f_arquivo = None
+
+    def __enter__(self):
+        """Uso com 'with'."""
+        return self
+
+    def __exit__(self, *args):
+        """Fecha o arquivo ao sair do 'with'."""
+        self.fechar()
+
+
+def ler_topologia(arquivo_gro):
+    """
+    Lê o primeiro frame da trajetória (mesmas colunas de criar_df_atomos).
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+
+    Returns
+    -------
+    df_atomos : dataframe Pandas
+        Átomos do primeiro frame.
+
+    """
+    with open(arquivo_gro, "rb") as f_arquivo, \
+            mmap.mmap(f_arquivo.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        df_atomos, _ = ler_frame(buffer, 0)
+
+    return df_atomos
+
+
+def frame_para_df(df_topologia, coords, caixa):
+    """
+    Monta o dataframe de átomos de um frame a partir da topologia.
+
+    Parameters
+    ----------
+    df_topologia : dataframe Pandas
+        Dataframe do primeiro frame (ver ler_topologia).
+    coords : numpy.ndarray
+        Coordenadas (N, 3) do frame.
+    caixa : numpy.ndarray
+        Matriz 3 x 3 da caixa do frame.
+
+    Returns
+    -------
+    df_frame : dataframe Pandas
+        Cópia da topologia com as coordenadas e a caixa do frame.
+
+    """
+    df_frame = df_topologia.copy(deep=False)
+    df_frame["x"] = coords[:, 0]
+    df_frame["y"] = coords[:, 1]
+    df_frame["z"] = coords[:, 2]
+    df_frame.attrs["caixa"] = caixa
+
+    return df_frame
+
+
+class Acumulador:
+    """Acumula contagem, soma, mínimo e máximo de valores, frame a frame."""
+
+    def __init__(self):
+        """Inicializa propriedades."""
+        self.qtde = 0  # número de valores
+        self.soma = 0.0  # soma dos valores
+        self.soma_quad = 0.0  # soma dos quadrados dos valores
+        self.minimo = np.inf  # menor valor
+        self.maximo = -np.inf  # maior valor
+
+    def adicionar(self, valores):
+        """
+        Adiciona os valores de um frame.
+
+        Parameters
+        ----------
+        valores : array
+            Valores do frame (valores NaN são ignorados).
+
+        Returns
+        -------
+        None.
+
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return
+
+        self.qtde += len(valores)
+        self.soma += valores.sum()
+        self.soma_quad += np.square(valores).sum()
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+
+    def juntar(self, outro):
+        """
+        Soma ao acumulador os valores de outro acumulador.
+
+        Parameters
+        ----------
+        outro : Acumulador
+            Acumulador (por exemplo, de outro processo).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.qtde += outro.qtde
+        self.soma += outro.soma
+        self.soma_quad += outro.soma_quad
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+
+    @property
+    def media(self):
+        """Média dos valores acumulados."""
+        return self.soma / self.qtde if self.qtde else np.nan
+
+    @property
+    def desvio(self):
+        """Desvio padrão dos valores acumulados."""
+        if not self.qtde:
+            return np.nan
+        return np.sqrt(max(self.soma_quad / self.qtde - self.media ** 2, 0.0))
+
+
+def analisar_trajetoria(arquivo_gro, cutoff=None, primeiro=0, ultimo=None, passo=1):
+    """
+    Calcula distâncias O-O e ângulos H-O-H frame a frame.
+
+    Apenas os resumos de cada frame são guardados; as tabelas de pares e de
+    ângulos de um frame são descartadas antes da leitura do próximo.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Nome/local do arquivo '.gro'.
+    cutoff : float, opcional
+        Raio de corte (nm) para as distâncias O-O. Padrão é None.
+    primeiro, ultimo, passo : int, opcional
+        Seleção de frames (ver iterar_frames).
+
+    Returns
+    -------
+    df_frames : dataframe Pandas
+        Resumo de cada frame.
+    acumuladores : dict
+        Acumulador de 'distancia' e de 'angulo' para toda a trajetória.
+
+    """
+    df_topologia = ler_topologia(arquivo_gro)
+    topologia = IndiceTopologia(df_topologia)
+    acumuladores = {"distancia": Acumulador(), "angulo": Acumulador()}
+    dados = []
+
+    for numero, coords, caixa, descricao in iterar_frames(arquivo_gro, primeiro=primeiro,
+                                                          ultimo=ultimo, passo=passo):
+        print(" + Frame".ljust(TAM_TEXTO_PROC, ".") + f": {numero}")
+        df_frame = frame_para_df(df_topologia, coords, caixa)
+
+        distancias = dist_oxi_oxi(df_frame, cutoff, salvar=False,
+                                  topologia=topologia)["distancia"]
+        angulos = molecules_angles(df_frame, salvar=False, topologia=topologia)["angulo"]
+        acumuladores["distancia"].adicionar(distancias)
+        acumuladores["angulo"].adicionar(angulos)
+
+        dados.append([numero, descricao, distancias.mean(), angulos.mean(),
+                      angulos.min(), angulos.max()])
+
+    df_frames = pd.DataFrame(dados, columns=["frame", "descricao", "distancia_media",
+                                             "angulo_medio", "angulo_min", "angulo_max"])
+
+    return df_frames, acumuladores
+
+
+def main(arquivo_gro):
+    """
+    Procedimento principal.
+
+    Parameters
+    ----------
+    arquivo_gro : string
+        Local do arquivo .gro (trajetória).
+
+    Returns
+    -------
+    None.
+
+    """
+    df_frames, acumuladores = analisar_trajetoria(arquivo_gro)
+    salvar_dataframe(df_frames, "resumo_frames")
+
+    # Imprimindo o resumo
+    distancia = acumuladores["distancia"]
+    angulo = acumuladores["angulo"]
+    print("")
+    print("-".center(80, "-"))
+    print(f'{"|":<1} {"Resumo da trajetória":<76} '
+          f'{"|":>1}')
+    print("-".center(80, "-"))
+    print("Número de frames".ljust(40, ".") + ": " + f" {len(df_frames)}")
+    print("Média de distância entre os oxigênios".ljust(40, ".") + ": " + f" {distancia.media:1.6} nm")
+    print("Mean value of angles".ljust(40, ".") + ": " + f" {angulo.media:1.6} degrees")
+    print("Max value of angles".ljust(40, ".") + ": " + f" {angulo.maximo:1.6} degrees")
+    print("Min value of angles".ljust(40, ".") + ": " + f" {angulo.minimo:1.6} degrees")
+
+
+if __name__ == '__main__':
+    cabecalho()
+
+    if len(sys.argv) == 2:
+        arquivo = sys.argv[1]
+    else:
+        arquivo = input("Local e nome do arquivo de trajetória "
+                        "(.gro)".ljust(TAM_TEXTO, ".") + ": ").strip()
+
+    if existe_arquivo(arquivo):
+        main(arquivo)
+    else:
+        print(f" + Arquivo ({arquivo}) não existe!")
+        sys.exit()
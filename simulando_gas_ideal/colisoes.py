@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Colisões entre partículas (discos de mesmo raio) e com as paredes da caixa.
+
+Fase ampla, dois métodos:
+    1) 'celulas' (lista de células): a caixa é dividida em uma grade uniforme
+       de células com largura maior ou igual a 2*raio. Duas partículas só
+       podem colidir se estiverem na mesma célula ou em células vizinhas
+       (9 células em 2D), então o custo é O(N).
+    2) 'blocos': matriz de distâncias ao quadrado de todos os pares, em
+       blocos (limite de memória), usando apenas a triangular superior
+       (np.triu_indices). Custo O(N²), mas sem laços em Python; mais rápido
+       para poucas partículas.
+
+Fase estreita:
+    1) A distância de todos os pares candidatos é calculada de uma vez.
+
+Resolução (mesma física do laço duplo original):
+    1) Os pares em colisão são ordenados (i, j), como no laço original.
+    2) Os pares são separados em rodadas: em cada rodada nenhuma partícula
+       aparece duas vezes e cada par fica depois de todos os pares
+       anteriores que têm alguma partícula em comum.
+    3) Cada rodada é resolvida de uma vez (np.add.at), com a mesma fórmula
+       da colisão elástica. O resultado é o mesmo do laço sequencial e não
+       depende do método da fase ampla.
+
+O motor (verificar_colisoes) é usado por GasIdeal e por IdealGas.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import numpy as np
+
+# Elementos por bloco da matriz de distâncias (método 'blocos')
+MAX_ELEMENTOS_BLOCO = 1_000_000
+
+# Até este número de partículas, o método 'blocos' é o padrão
+LIMITE_BLOCOS = 150
+
+
+def colisoes_parede(pos_nova, velocidades, raio, largura):
+    """
+    Inverte a componente da velocidade perpendicular à parede atingida.
+
+    Parameters
+    ----------
+    pos_nova : numpy.ndarray
+        Posições (N, 2) no próximo passo.
+    velocidades : numpy.ndarray
+        Velocidades (N, 2), alteradas no próprio vetor.
+    raio : float
+        Raio das partículas.
+    largura : float
+        Largura da caixa.
+
+    Returns
+    -------
+    None.
+
+    """
+    velocidades[pos_nova < raio] *= -1  # paredes da esquerda (x) e inferior (y)
+    velocidades[pos_nova > largura - raio] *= -1  # paredes da direita (x) e superior (y)
+
+
+def celulas(posicoes, tam_celula, largura):
+    """
+    Distribui as partículas em uma grade uniforme de células.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d).
+    tam_celula : float
+        Menor largura aceita para as células (por exemplo, 2*raio).
+    largura : float
+        Largura da caixa.
+
+    Returns
+    -------
+    n_celulas : int
+        Número de células por eixo.
+    celula : numpy.ndarray
+        Índice (linear) da célula de cada partícula.
+
+    """
+    qtde, dim = posicoes.shape
+
+    # células de largura >= tam_celula, com no máximo ~N células no total
+    n_celulas = int(max(1, min(np.floor(largura / tam_celula),
+                               np.ceil(max(qtde, 1) ** (1 / dim)))))
+
+    ind_celula = np.clip(np.floor(posicoes * (n_celulas / largura)).astype(np.int64),
+                         0, n_celulas - 1)
+    celula = np.ravel_multi_index(ind_celula.T, (n_celulas,) * dim) if qtde else \
+        np.empty(0, dtype=np.int64)
+
+    return n_celulas, celula
+
+
+def pares_candidatos(posicoes, tam_celula, largura):
+    """
+    Lista os pares (i < j) de partículas em células vizinhas.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d).
+    tam_celula : float
+        Distância máxima de interesse (2*raio para colisões).
+    largura : float
+        Largura da caixa.
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pares candidatos.
+
+    """
+    dim = posicoes.shape[1]
+    n_celulas, celula = celulas(posicoes, tam_celula, largura)
+    forma = (n_celulas,) * dim
+
+    # partículas ordenadas por célula (início e contagem de cada célula)
+    ordem = np.argsort(celula, kind="stable")
+    celula = celula[ordem]
+    contagem = np.bincount(celula, minlength=n_celulas ** dim)
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    posicao = np.arange(len(ordem))
+
+    # células vizinhas (incluindo a própria); -1 fora da grade
+    grade = np.array(np.unravel_index(celula, forma)).T
+    lista_i, lista_j = [], []
+    for desloc in np.array(np.meshgrid(*[[-1, 0, 1]] * dim, indexing="ij")).reshape(dim, -1).T:
+        vizinha = grade + desloc
+        dentro = np.all((vizinha >= 0) & (vizinha < n_celulas), axis=1)
+        viz = np.where(dentro, np.ravel_multi_index(np.clip(vizinha, 0, n_celulas - 1).T,
+                                                    forma), -1)
+        qtde_viz = np.where(viz >= 0, contagem[np.maximum(viz, 0)], 0)
+        total = int(qtde_viz.sum())
+        if total == 0:
+            continue
+
+        # todos os pares (partícula, partícula da célula vizinha)
+        pos_i = np.repeat(posicao, qtde_viz)
+        pos_j = np.arange(total) + np.repeat(
+            inicio[np.maximum(viz, 0)] - (np.cumsum(qtde_viz) - qtde_viz), qtde_viz)
+
+        manter = pos_j > pos_i
+        lista_i.append(pos_i[manter])
+        lista_j.append(pos_j[manter])
+
+    if not lista_i:
+        vazio = np.empty(0, dtype=np.intp)
+        return vazio, vazio.copy()
+
+    ind_a = ordem[np.concatenate(lista_i)]
+    ind_b = ordem[np.concatenate(lista_j)]
+    return np.minimum(ind_a, ind_b), np.maximum(ind_a, ind_b)
+
+
+def pares_em_blocos(posicoes, distancia, max_elementos=MAX_ELEMENTOS_BLOCO):
+    """
+    Lista os pares (i < j) com distância menor que 'distancia' (todos os pares).
+
+    A matriz de distâncias ao quadrado é calculada em blocos quadrados da
+    triangular superior; nos blocos da diagonal apenas os elementos de
+    np.triu_indices(k=1) são usados.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d).
+    distancia : float
+        Distância de contato (2*raio para colisões).
+    max_elementos : int, opcional
+        Número máximo de elementos de cada bloco. Padrão é MAX_ELEMENTOS_BLOCO.
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pares (sem ordem definida).
+
+    """
+    qtde = len(posicoes)
+    lado = max(1, min(qtde, int(np.sqrt(max_elementos))))
+    lista_i, lista_j = [], []
+
+    for inicio_i in range(0, qtde, lado):
+        bloco_i = posicoes[inicio_i:inicio_i + lado]
+        for inicio_j in range(inicio_i, qtde, lado):
+            diff = bloco_i[:, None, :] - posicoes[None, inicio_j:inicio_j + lado, :]
+            dist2 = np.einsum("ijk,ijk->ij", diff, diff)
+
+            if inicio_j == inicio_i:
+                ind_i, ind_j = np.triu_indices(len(bloco_i), k=1)
+                colide = np.sqrt(dist2[ind_i, ind_j]) < distancia
+                ind_i, ind_j = ind_i[colide], ind_j[colide]
+            else:
+                ind_i, ind_j = np.nonzero(np.sqrt(dist2) < distancia)
+
+            lista_i.append(ind_i + inicio_i)
+            lista_j.append(ind_j + inicio_j)
+
+    if not lista_i:
+        vazio = np.empty(0, dtype=np.intp)
+        return vazio, vazio.copy()
+
+    return np.concatenate(lista_i), np.concatenate(lista_j)
+
+
+def pares_em_colisao(posicoes, raio, largura, metodo=None):
+    """
+    Encontra os pares (i < j) com distância menor que 2*raio.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d).
+    raio : float
+        Raio das partículas.
+    largura : float
+        Largura da caixa.
+    metodo : string, opcional
+        'celulas' ou 'blocos'. Padrão é None ('blocos' até LIMITE_BLOCOS
+        partículas, 'celulas' acima).
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pares em colisão, ordenados por i e depois por j (mesma ordem do
+        laço duplo).
+
+    """
+    if metodo is None:
+        metodo = "blocos" if len(posicoes) <= LIMITE_BLOCOS else "celulas"
+
+    if metodo == "blocos":
+        ind_i, ind_j = pares_em_blocos(posicoes, 2 * raio)
+    elif metodo == "celulas":
+        ind_i, ind_j = pares_candidatos(posicoes, 2 * raio, largura)
+        diff = posicoes[ind_i] - posicoes[ind_j]
+        colide = np.sqrt(np.einsum("ij,ij->i", diff, diff)) < 2 * raio
+        ind_i, ind_j = ind_i[colide], ind_j[colide]
+    else:
+        raise ValueError(f"Método de colisão desconhecido: {metodo}.")
+
+    ordem = np.lexsort((ind_j, ind_i))
+    return ind_i[ordem], ind_j[ordem]
+
+
+def rodadas(ind_i, ind_j, n_particulas):
+    """
+    Separa os pares ordenados em rodadas sem partículas repetidas.
+
+    Um par entra na rodada quando é o primeiro par ainda não resolvido de
+    suas duas partículas. Assim os pares com partículas em comum são
+    resolvidos na ordem original.
+
+    Parameters
+    ----------
+    ind_i, ind_j : numpy.ndarray
+        Pares ordenados (ver pares_em_colisao).
+    n_particulas : int
+        Número de partículas.
+
+    Returns
+    -------
+    numpy.ndarray
+        Rodada (0, 1, ...) de cada par.
+
+    """
+    rodada = np.full(len(ind_i), -1, dtype=np.int64)
+    pendentes = np.arange(len(ind_i))
+    numero = 0
+
+    while len(pendentes):
+        # primeiro par pendente de cada partícula
+        primeiro = np.full(n_particulas, len(ind_i), dtype=np.int64)
+        np.minimum.at(primeiro, ind_i[pendentes], pendentes)
+        np.minimum.at(primeiro, ind_j[pendentes], pendentes)
+
+        pronto = (primeiro[ind_i[pendentes]] == pendentes) & \
+            (primeiro[ind_j[pendentes]] == pendentes)
+        rodada[pendentes[pronto]] = numero
+        pendentes = pendentes[~pronto]
+        numero += 1
+
+    return rodada
+
+
+def resolver_colisoes(posicoes, velocidades, ind_i, ind_j):
+    """
+    Atualiza as velocidades dos pares em colisão (colisão elástica).
+
+        v_i' = v_i - (r_ij . v_ij) / (r_ij . r_ij) r_ij
+        v_j' = v_j + (r_ij . v_ij) / (r_ij . r_ij) r_ij
+
+    com r_ij = r_i - r_j (posições atuais) e v_ij = v_i - v_j.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d) atuais.
+    velocidades : numpy.ndarray
+        Velocidades (N, d), alteradas no próprio vetor.
+    ind_i, ind_j : numpy.ndarray
+        Pares em colisão, ordenados (ver pares_em_colisao).
+
+    Returns
+    -------
+    None.
+
+    """
+    if len(ind_i) == 0:
+        return
+
+    rodada = rodadas(ind_i, ind_j, len(posicoes))
+    for numero in range(rodada.max() + 1):
+        i, j = ind_i[rodada == numero], ind_j[rodada == numero]
+
+        rdiff = posicoes[i] - posicoes[j]
+        vdiff = velocidades[i] - velocidades[j]
+        impulso = (np.einsum("ij,ij->i", rdiff, vdiff) /
+                   np.einsum("ij,ij->i", rdiff, rdiff))[:, None] * rdiff
+
+        np.add.at(velocidades, i, -impulso)
+        np.add.at(velocidades, j, impulso)
+
+
+def verificar_colisoes(posicoes, velocidades, dt, raio, largura, metodo=None):
+    """
+    Atualiza as velocidades pelas colisões do próximo passo (motor comum).
+
+    Mesma regra de GasIdeal.verifica_colisao e IdealGas.check_collisions:
+    as colisões são detectadas nas posições do próximo passo,
+    r(t) + v(t)dt; as paredes invertem a componente perpendicular e os
+    pares usam as posições atuais na fórmula da colisão elástica.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, d) atuais.
+    velocidades : numpy.ndarray
+        Velocidades (N, d), alteradas no próprio vetor.
+    dt : float
+        Passo de tempo.
+    raio : float
+        Raio das partículas.
+    largura : float
+        Largura da caixa.
+    metodo : string, opcional
+        Fase ampla ('celulas' ou 'blocos'; ver pares_em_colisao). Padrão é
+        None (automático).
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pares que colidiram.
+
+    """
+    pos_nova = posicoes + velocidades * dt
+
+    colisoes_parede(pos_nova, velocidades, raio, largura)
+
+    ind_i, ind_j = pares_em_colisao(pos_nova, raio, largura, metodo)
+    resolver_colisoes(posicoes, velocidades, ind_i, ind_j)
+
+    return ind_i, ind_j
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Estado inicial (posições e velocidades) dos modelos de partículas.
+
+Usado pelo GasIdeal e pelo IdealGas (a simulação de Lennard-Jones,
+simulando_particulas/src/kiti.py, tem a sua própria versão em
+lattice_positions e initial_state, para que simulando_particulas/src não
+dependa deste diretório; tests/test_estado_inicial.py verifica que as
+duas dão os mesmos resultados):
+    - posições em uma grade quadrada (2D) ou cúbica (3D), criadas com
+      np.meshgrid diretamente em vetores (sem listas de tuplas);
+    - velocidades com módulo fixo e direção aleatória, ou sorteadas da
+      distribuição de Maxwell-Boltzmann com momento linear total nulo.
+
+Os números aleatórios vêm de um numpy.random.Generator (ou de uma
+semente), e não do estado global de np.random, então as execuções podem
+ser reproduzidas.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import numpy as np
+
+
+def tamanho_grade(n_particulas, dim=2):
+    """
+    Menor número de pontos por direção com tam**dim >= n_particulas.
+
+    Parameters
+    ----------
+    n_particulas : int
+        Número de partículas.
+    dim : int, opcional
+        Dimensão. Padrão é 2.
+
+    Returns
+    -------
+    int
+        Pontos da grade em cada direção.
+
+    """
+    tam = max(1, int(np.ceil(n_particulas ** (1 / dim))))
+    # corrige o arredondamento da raiz (por exemplo, 27**(1/3) > 3)
+    while tam > 1 and (tam - 1) ** dim >= n_particulas:
+        tam -= 1
+    while tam ** dim < n_particulas:
+        tam += 1
+    return tam
+
+
+def posicoes_grade(n_particulas, largura, raio=0.0, dim=2):
+    """
+    Posições em uma grade, na mesma ordem de itertools.product(x, x).
+
+    Parameters
+    ----------
+    n_particulas : int
+        Número de partículas.
+    largura : float
+        Largura da caixa.
+    raio : float, opcional
+        Raio das partículas (distância mínima das paredes). Padrão é 0.
+    dim : int, opcional
+        Dimensão. Padrão é 2.
+
+    Returns
+    -------
+    numpy.ndarray
+        Posições (n_particulas, dim).
+
+    """
+    tam = tamanho_grade(n_particulas, dim)
+    espaco = largura / tam
+    x = np.linspace(raio + espaco / 2, largura - raio - espaco / 2, tam)
+    eixos = np.meshgrid(*[x] * dim, indexing="ij")
+    return np.stack([eixo.ravel()[:n_particulas] for eixo in eixos], axis=1)
+
+
+def velocidades_fixas(n_particulas, v_inicial, rng, dim=2):
+    """
+    Velocidades com módulo v_inicial e direção aleatória (uniforme).
+
+    Parameters
+    ----------
+    n_particulas : int
+        Número de partículas.
+    v_inicial : float
+        Módulo das velocidades.
+    rng : numpy.random.Generator
+        Gerador de números aleatórios.
+    dim : int, opcional
+        Dimensão. Padrão é 2.
+
+    Returns
+    -------
+    numpy.ndarray
+        Velocidades (n_particulas, dim).
+
+    """
+    if dim == 2:
+        theta = rng.uniform(0, 2*np.pi, size=n_particulas)
+        return v_inicial * np.stack((np.cos(theta), np.sin(theta)), axis=1)
+
+    direcoes = rng.standard_normal((n_particulas, dim))
+    direcoes /= np.linalg.norm(direcoes, axis=1)[:, None]
+    return v_inicial * direcoes
+
+
+def velocidades_maxwell_boltzmann(n_particulas, kT, massa, rng, dim=2):
+    """
+    Velocidades da distribuição de Maxwell-Boltzmann, com momento total nulo.
+
+    Cada componente é normal com variância kT/massa; a velocidade média
+    (do centro de massa, massas iguais) é subtraída.
+
+    Parameters
+    ----------
+    n_particulas : int
+        Número de partículas.
+    kT : float
+        Energia térmica (k_B T), nas unidades de massa e velocidade usadas.
+    massa : float
+        Massa das partículas.
+    rng : numpy.random.Generator
+        Gerador de números aleatórios.
+    dim : int, opcional
+        Dimensão. Padrão é 2.
+
+    Returns
+    -------
+    numpy.ndarray
+        Velocidades (n_particulas, dim).
+
+    """
+    velocidades = rng.standard_normal((n_particulas, dim))
+    velocidades *= np.sqrt(kT / massa)
+    velocidades -= velocidades.mean(axis=0)
+    return velocidades
+
+
+def estado_inicial(n_particulas, largura, raio=0.0, v_inicial=None, kT=None, massa=1.0,
+                   dim=2, semente=None):
+    """
+    Posições em grade e velocidades iniciais.
+
+    Parameters
+    ----------
+    n_particulas : int
+        Número de partículas.
+    largura : float
+        Largura da caixa.
+    raio : float, opcional
+        Raio das partículas. Padrão é 0.
+    v_inicial : float, opcional
+        Módulo das velocidades (direções aleatórias). Usado quando kT é
+        None.
+    kT : float, opcional
+        Energia térmica para sortear as velocidades de Maxwell-Boltzmann.
+        Padrão é None.
+    massa : float, opcional
+        Massa das partículas (apenas com kT). Padrão é 1.
+    dim : int, opcional
+        Dimensão. Padrão é 2.
+    semente : int, numpy.random.SeedSequence ou numpy.random.Generator, opcional
+        Semente ou gerador. Padrão é None (execuções diferentes).
+
+    Returns
+    -------
+    posicoes, velocidades : numpy.ndarray
+        Matrizes (n_particulas, dim).
+
+    """
+    if kT is None and v_inicial is None:
+        raise ValueError("Informe v_inicial ou kT para as velocidades iniciais.")
+
+    rng = np.random.default_rng(semente)
+    posicoes = posicoes_grade(n_particulas, largura, raio, dim)
+    if kT is None:
+        velocidades = velocidades_fixas(n_particulas, v_inicial, rng, dim)
+    else:
+        velocidades = velocidades_maxwell_boltzmann(n_particulas, kT, massa, rng, dim)
+    return posicoes, velocidades
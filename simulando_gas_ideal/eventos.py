@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Dinâmica molecular dirigida por eventos para discos rígidos (gás ideal 2D).
+
+Em vez de avançar com passo fixo e procurar sobreposições, o motor calcula
+o instante exato de cada evento e avança diretamente até ele:
+    1) colisão entre duas partículas (|r_ij + v_ij t| = 2*raio);
+    2) colisão de uma partícula com uma parede;
+    3) passagem de uma partícula para outra célula da grade.
+
+Os eventos ficam em uma fila de prioridade (heapq). Cada partícula guarda o
+número de colisões já sofridas; um evento previsto antes da última colisão
+de uma das partículas é descartado ao sair da fila. Com a grade de células
+(largura >= 2*raio), as colisões só são previstas entre partículas de
+células vizinhas, e cada evento custa O(log N) em vez de O(N).
+
+As posições de cada partícula são guardadas no instante da sua última
+atualização; nos tempos de saída (os mesmos do motor de passo fixo) todas
+as posições são calculadas de uma vez (NumPy), r(t) = r(t_i) + v(t - t_i).
+Cada evento envolve poucas partículas, então o estado fica em listas do
+Python (floats), mais rápidas que vetores NumPy pequenos.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import heapq
+import math
+from itertools import count
+
+import numpy as np
+
+# Tipos de evento
+PAR = 0
+PAREDE = 1
+CELULA = 2
+
+
+class MotorEventos:
+    """Discos rígidos em uma caixa quadrada, com colisões elásticas exatas."""
+
+    def __init__(self, posicoes, velocidades, raio, largura):
+        """
+        Inicializa o motor no instante t = 0.
+
+        Parameters
+        ----------
+        posicoes : numpy.ndarray
+            Posições iniciais (N, 2).
+        velocidades : numpy.ndarray
+            Velocidades iniciais (N, 2).
+        raio : float
+            Raio das partículas.
+        largura : float
+            Largura da caixa.
+
+        """
+        self.r = np.asarray(posicoes, dtype=np.float64).tolist()  # [x, y] em t_local
+        self.v = np.asarray(velocidades, dtype=np.float64).tolist()  # [vx, vy]
+        self.raio = float(raio)
+        self.largura = float(largura)
+        self.n_particulas = len(self.r)
+        self.sigma2 = (2 * self.raio) ** 2  # distância de contato ao quadrado
+
+        self.tempo = 0.0  # instante atual
+        self.t_local = [0.0] * self.n_particulas  # instante de cada posição guardada
+        self.colisoes = [0] * self.n_particulas  # colisões (mudanças de velocidade)
+        self.qtde_colisoes = 0  # colisões entre partículas
+        self.qtde_eventos = 0  # eventos válidos processados
+
+        # Grade de células (largura >= 2*raio, no máximo ~N células)
+        self.n_celulas = int(max(1, min(np.floor(self.largura / (2 * self.raio)),
+                                        np.ceil(np.sqrt(self.n_particulas)))))
+        self.tam_celula = self.largura / self.n_celulas
+        self.celula = np.clip(np.floor(np.asarray(posicoes) / self.tam_celula).astype(np.int64),
+                              0, self.n_celulas - 1).tolist()
+        self.membros = {}
+        for i, (cx, cy) in enumerate(self.celula):
+            self.membros.setdefault((cx, cy), set()).add(i)
+
+        self.fila = []
+        self._sequencia = count()
+        self.t_fim = math.inf
+
+    def _atualizar(self, i):
+        """Leva a posição guardada da partícula i ao instante atual."""
+        dt = self.tempo - self.t_local[i]
+        r_i, v_i = self.r[i], self.v[i]
+        r_i[0] += v_i[0] * dt
+        r_i[1] += v_i[1] * dt
+        self.t_local[i] = self.tempo
+
+    def _agendar(self, tempo, tipo, i, j=-1):
+        """Coloca um evento na fila (apenas até o fim da simulação)."""
+        if tempo <= self.t_fim:
+            cont_j = self.colisoes[j] if tipo == PAR else 0
+            heapq.heappush(self.fila, (tempo, next(self._sequencia), tipo, i, j,
+                                       self.colisoes[i], cont_j))
+
+    def _vizinhos(self, i):
+        """Partículas nas 9 células em volta da célula de i (exceto i)."""
+        cx, cy = self.celula[i]
+        vizinhos = []
+        for vx in range(max(cx - 1, 0), min(cx + 2, self.n_celulas)):
+            for vy in range(max(cy - 1, 0), min(cy + 2, self.n_celulas)):
+                vizinhos.extend(self.membros.get((vx, vy), ()))
+        vizinhos.remove(i)
+        return vizinhos
+
+    def _prever_pares(self, i, vizinhos=None):
+        """Agenda as colisões de i com as partículas das células vizinhas."""
+        if vizinhos is None:
+            vizinhos = self._vizinhos(i)
+
+        self._atualizar(i)
+        (x_i, y_i), (vx_i, vy_i) = self.r[i], self.v[i]
+        for j in vizinhos:
+            (x_j, y_j), (vx_j, vy_j) = self.r[j], self.v[j]
+            dt_j = self.tempo - self.t_local[j]
+            dx = x_j + vx_j * dt_j - x_i
+            dy = y_j + vy_j * dt_j - y_i
+            dvx = vx_j - vx_i
+            dvy = vy_j - vy_i
+
+            # aproximando (b < 0) e com solução real de vv t² + 2 b t + c = 0
+            b = dx * dvx + dy * dvy
+            if b >= 0:
+                continue
+            c = dx * dx + dy * dy - self.sigma2
+            delta = b * b - (dvx * dvx + dvy * dvy) * c
+            if delta < 0:
+                continue
+
+            # menor raiz, na forma estável
+            self._agendar(self.tempo + max(c / (-b + math.sqrt(delta)), 0.0), PAR, i, j)
+
+    def _prever_parede(self, i):
+        """Agenda a próxima colisão de i com uma parede."""
+        melhor = None
+        for eixo in range(2):
+            vel = self.v[i][eixo]
+            if vel > 0:
+                dt = (self.largura - self.raio - self.r[i][eixo]) / vel
+            elif vel < 0:
+                dt = (self.raio - self.r[i][eixo]) / vel
+            else:
+                continue
+            if melhor is None or dt < melhor[0]:
+                melhor = (dt, eixo)
+        if melhor is not None:
+            self._agendar(self.tempo + max(melhor[0], 0.0), PAREDE, i, melhor[1])
+
+    def _prever_celula(self, i):
+        """Agenda a próxima passagem de i para outra célula."""
+        melhor = None
+        for eixo in range(2):
+            vel = self.v[i][eixo]
+            cel = self.celula[i][eixo]
+            if vel > 0 and cel < self.n_celulas - 1:
+                dt = ((cel + 1) * self.tam_celula - self.r[i][eixo]) / vel
+            elif vel < 0 and cel > 0:
+                dt = (cel * self.tam_celula - self.r[i][eixo]) / vel
+            else:
+                continue
+            if melhor is None or dt < melhor[0]:
+                melhor = (dt, eixo)
+        if melhor is not None:
+            self._agendar(self.tempo + max(melhor[0], 0.0), CELULA, i, melhor[1])
+
+    def _prever(self, i):
+        """Agenda todos os eventos da partícula i (após mudar de velocidade)."""
+        self._prever_parede(i)
+        self._prever_celula(i)
+        self._prever_pares(i)
+
+    def iniciar(self, t_fim):
+        """
+        Agenda os primeiros eventos de todas as partículas.
+
+        Parameters
+        ----------
+        t_fim : float
+            Instante final (eventos posteriores não são agendados).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.t_fim = t_fim
+        self.fila = []
+        for i in range(self.n_particulas):
+            self._prever_parede(i)
+            self._prever_celula(i)
+
+            # pares (i, j > i) das células vizinhas
+            self._prever_pares(i, [j for j in self._vizinhos(i) if j > i])
+
+    def avancar(self, tempo):
+        """
+        Processa os eventos até o instante tempo.
+
+        Parameters
+        ----------
+        tempo : float
+            Instante final.
+
+        Returns
+        -------
+        None.
+
+        """
+        while self.fila and self.fila[0][0] <= tempo:
+            t_evento, _, tipo, i, j, cont_i, cont_j = heapq.heappop(self.fila)
+
+            # evento previsto antes da última colisão de alguma das partículas
+            if cont_i != self.colisoes[i] or (tipo == PAR and cont_j != self.colisoes[j]):
+                continue
+
+            self.tempo = t_evento
+            self.qtde_eventos += 1
+            self._atualizar(i)
+
+            if tipo == PAR:
+                # mesma fórmula do motor de passo fixo (r_ij no contato)
+                self._atualizar(j)
+                (x_i, y_i), (x_j, y_j) = self.r[i], self.r[j]
+                v_i, v_j = self.v[i], self.v[j]
+                dx, dy = x_i - x_j, y_i - y_j
+                fator = (dx * (v_i[0] - v_j[0]) + dy * (v_i[1] - v_j[1])) / (dx * dx + dy * dy)
+                v_i[0] -= fator * dx
+                v_i[1] -= fator * dy
+                v_j[0] += fator * dx
+                v_j[1] += fator * dy
+
+                self.colisoes[i] += 1
+                self.colisoes[j] += 1
+                self.qtde_colisoes += 1
+                self._prever(i)
+                self._prever(j)
+
+            elif tipo == PAREDE:
+                self.v[i][j] *= -1
+                self.colisoes[i] += 1
+                self._prever(i)
+
+            else:
+                # muda de célula (a velocidade não muda)
+                self.membros[tuple(self.celula[i])].discard(i)
+                self.celula[i][j] += 1 if self.v[i][j] > 0 else -1
+                self.membros.setdefault(tuple(self.celula[i]), set()).add(i)
+                self._prever_celula(i)
+                self._prever_pares(i)
+
+        self.tempo = tempo
+
+    def estado(self):
+        """
+        Posições e velocidades de todas as partículas no instante atual.
+
+        Returns
+        -------
+        posicoes, velocidades : numpy.ndarray
+            Matrizes (N, 2).
+
+        """
+        velocidades = np.array(self.v, dtype=np.float64).reshape(-1, 2)
+        atraso = self.tempo - np.array(self.t_local)
+        posicoes = np.array(self.r, dtype=np.float64).reshape(-1, 2) + velocidades * atraso[:, None]
+        return posicoes, velocidades
+
+    def iterar(self, tempos, t_fim=None):
+        """
+        Simula e gera o estado das partículas nos tempos de saída.
+
+        Parameters
+        ----------
+        tempos : numpy.ndarray
+            Tempos de saída, em ordem crescente.
+        t_fim : float, opcional
+            Instante final da simulação (alcançado depois do último frame).
+            Padrão é None (último tempo).
+
+        Yields
+        ------
+        n : int
+            Número do frame.
+        posicoes, velocidades : numpy.ndarray
+            Matrizes (N, 2) no tempo tempos[n].
+
+        """
+        t_fim = tempos[-1] if t_fim is None else t_fim
+        self.iniciar(t_fim)
+
+        for n, tempo in enumerate(tempos):
+            self.avancar(tempo)
+            yield (n,) + self.estado()
+
+        self.avancar(t_fim)
+
+    def simular(self, tempos, t_fim=None):
+        """
+        Simula e amostra as partículas nos tempos de saída.
+
+        Parameters
+        ----------
+        tempos : numpy.ndarray
+            Tempos de saída, em ordem crescente.
+        t_fim : float, opcional
+            Instante final da simulação. Padrão é None (último tempo).
+
+        Returns
+        -------
+        pos_simul : numpy.ndarray
+            Posições (len(tempos), N, 2).
+        vel_simul : numpy.ndarray
+            Módulo das velocidades (len(tempos), N).
+
+        """
+        pos_simul = np.zeros((len(tempos), self.n_particulas, 2))
+        vel_simul = np.zeros((len(tempos), self.n_particulas))
+        for n, posicoes, velocidades in self.iterar(tempos, t_fim):
+            pos_simul[n] = posicoes
+            vel_simul[n] = np.linalg.norm(velocidades, axis=1)
+
+        return pos_simul, vel_simul
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação da trajetória em disco, frame a frame.
+
+Em vez de guardar todas as posições em uma matriz (n_passos, N, 2) na
+memória, os frames são acumulados em um buffer pequeno e copiados para
+arquivos '.npy' mapeados em memória (np.lib.format.open_memmap):
+    - '<nome>_posicoes.npy': posições (n_frames, N, 2), float32 por padrão;
+    - '<nome>_velocidades.npy': módulo das velocidades (n_frames, N),
+      float16 por padrão.
+A memória usada fica limitada a um frame mais o buffer, e os arquivos
+podem ser lidos depois com np.load(..., mmap_mode="r") sem carregar tudo.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import numpy as np
+
+# Tamanho máximo do buffer de escrita (bytes)
+MAX_BYTES_BUFFER = 32 * 1024 * 1024
+
+
+def nomes_arquivos(nome):
+    """
+    Nomes dos arquivos de posições e de velocidades.
+
+    Parameters
+    ----------
+    nome : string
+        Nome base (sem extensão).
+
+    Returns
+    -------
+    tuple
+        ('<nome>_posicoes.npy', '<nome>_velocidades.npy').
+
+    """
+    return f"{nome}_posicoes.npy", f"{nome}_velocidades.npy"
+
+
+def qtde_frames(n_passos, a_cada=1):
+    """Número de frames guardados ao gravar um a cada 'a_cada' passos."""
+    return -(-n_passos // a_cada)
+
+
+class GravadorTrajetoria:
+    """Grava frames de posições e velocidades em arquivos '.npy' (memmap)."""
+
+    def __init__(self, nome, n_frames, n_particulas, dim=2, precisao=np.float32,
+                 precisao_vel=np.float16):
+        """
+        Cria os arquivos (tamanho final) e o buffer de escrita.
+
+        Parameters
+        ----------
+        nome : string
+            Nome base dos arquivos (ver nomes_arquivos).
+        n_frames : int
+            Número de frames que serão gravados.
+        n_particulas : int
+            Número de partículas.
+        dim : int, opcional
+            Dimensão das posições. Padrão é 2.
+        precisao : numpy.dtype, opcional
+            Tipo das posições. Padrão é np.float32.
+        precisao_vel : numpy.dtype, opcional
+            Tipo do módulo das velocidades. Padrão é np.float16.
+
+        """
+        self.arquivo_pos, self.arquivo_vel = nomes_arquivos(nome)
+        self.n_frames = n_frames
+        self.posicoes = np.lib.format.open_memmap(self.arquivo_pos, mode="w+", dtype=precisao,
+                                                  shape=(n_frames, n_particulas, dim))
+        self.velocidades = np.lib.format.open_memmap(self.arquivo_vel, mode="w+",
+                                                     dtype=precisao_vel,
+                                                     shape=(n_frames, n_particulas))
+
+        # buffer com alguns frames (no máximo MAX_BYTES_BUFFER)
+        bytes_frame = self.posicoes[0].nbytes + self.velocidades[0].nbytes
+        tam_buffer = int(max(1, min(n_frames, MAX_BYTES_BUFFER // max(bytes_frame, 1))))
+        self.buffer_pos = np.empty((tam_buffer,) + self.posicoes.shape[1:], dtype=precisao)
+        self.buffer_vel = np.empty((tam_buffer,) + self.velocidades.shape[1:], dtype=precisao_vel)
+        self.no_buffer = 0  # frames no buffer
+        self.gravados = 0  # frames já copiados para os arquivos
+
+    def adicionar(self, posicoes, velocidades):
+        """
+        Adiciona um frame.
+
+        Parameters
+        ----------
+        posicoes : numpy.ndarray
+            Posições (N, dim).
+        velocidades : numpy.ndarray
+            Módulo das velocidades (N,).
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.gravados + self.no_buffer >= self.n_frames:
+            raise ValueError("Todos os frames do arquivo já foram gravados.")
+
+        self.buffer_pos[self.no_buffer] = posicoes
+        self.buffer_vel[self.no_buffer] = velocidades
+        self.no_buffer += 1
+        if self.no_buffer == len(self.buffer_pos):
+            self.descarregar()
+
+    def descarregar(self):
+        """Copia o buffer para os arquivos."""
+        if self.no_buffer == 0:
+            return
+
+        fatia = slice(self.gravados, self.gravados + self.no_buffer)
+        self.posicoes[fatia] = self.buffer_pos[:self.no_buffer]
+        self.velocidades[fatia] = self.buffer_vel[:self.no_buffer]
+        self.posicoes.flush()
+        self.velocidades.flush()
+        self.gravados += self.no_buffer
+        self.no_buffer = 0
+
+    def fechar(self):
+        """Grava o que restou no buffer e fecha os arquivos."""
+        if self.posicoes is None:
+            return
+
+        self.descarregar()
+        self.posicoes = None
+        self.velocidades = None
+
+    def __enter__(self):
+        """Usa o gravador em um bloco with."""
+        return self
+
+    def __exit__(self, *args):
+        """Fecha os arquivos ao sair do bloco with."""
+        self.fechar()
+
+
+def carregar_trajetoria(nome):
+    """
+    Abre os arquivos gravados sem carregá-los na memória (mmap).
+
+    Parameters
+    ----------
+    nome : string
+        Nome base dos arquivos (ver nomes_arquivos).
+
+    Returns
+    -------
+    pos_simul, vel_simul : numpy.memmap
+        Posições (n_frames, N, dim) e módulo das velocidades (n_frames, N).
+
+    """
+    arquivo_pos, arquivo_vel = nomes_arquivos(nome)
+    return np.load(arquivo_pos, mmap_mode="r"), np.load(arquivo_vel, mmap_mode="r")
@@ -5,11 +5,17 @@
 """
 
 import numpy as np
-from itertools import product
+
+# shared modules of simulando_gas_ideal/ (colisoes, estado_inicial, gravacao):
+# simulando_gas_ideal/ must be on PYTHONPATH (see README.md)
+from colisoes import verificar_colisoes
+from estado_inicial import estado_inicial
+from gravacao import GravadorTrajetoria, carregar_trajetoria, qtde_frames
+
 
 class IdealGas:
 
-    def __init__(self, N, mass, radius,L, v0, duration, nsteps):
+    def __init__(self, N, mass, radius,L, v0, duration, nsteps, collision_method=None, seed=None, T=None):
 
         self.N = N #number of particles 
         self.mass = mass #mass of particles (kg)
@@ -19,43 +25,22 @@ class IdealGas:
         self.nsteps = nsteps #number of steps
         self.dt = duration/nsteps #timestep (s)
         self.v0 = v0 #initial velocity (m/s)
+        self.collision_method = collision_method #'celulas' (cell list), 'blocos' (all pairs) or None (auto)
 
-        #intialise random positions and velocities
-        grid_size = int(np.ceil(np.sqrt(N))) # Create enough positions in grid for the particles
-        spacing = L/ grid_size 
-        x = np.linspace(radius + spacing/2, L - radius - spacing/2, grid_size) 
-        pos = list(product(x, x))
-        
-        self.r = np.array(pos[:N]) # Take the positions needed
+        self.rng = np.random.default_rng(seed) #random generator (int seed, SeedSequence or Generator) for reproducible runs
 
-        # Retrieve specified number of particle positions
-        theta = np.random.uniform(0, 2*np.pi, size=N)
-        vx,vy = self.v0*np.cos(theta), self.v0*np.sin(theta)
-        self.v = np.stack((vx,vy), axis=1)
+        #intialise positions in a grid and velocities: random directions with magnitude v0,
+        #or Maxwell-Boltzmann at temperature T (K) with zero net momentum (see estado_inicial.py)
+        kT = None if T is None else 1.38e-23*T
+        self.r, self.v = estado_inicial(N, L, radius, v0, kT, mass, semente=self.rng)
 
 
     def check_collisions(self):
         """Checks for particle-particle collisions and particle-wall collisions.
         If collisions are found, update the velocities of the particles that are colliding, accounting for 
         the conservation of energy and momentum."""
-        r_next = self.r + self.v*self.dt #positions at the next timestep
-        #check for collisions with the walls
-        self.v[r_next[:,0] < self.radius,0] *= -1 #collisions on the left wall
-        self.v[r_next[:,0] > self.L-self.radius,0] *= -1 #collisions on the right wall
-        self.v[r_next[:,1] < self.radius,1] *= -1 #collisions on the bottom wall
-        self.v[r_next[:,1] > self.L-self.radius,1] *= -1 #collisions on the top wall 
-
-
-        #check for collisions between particles
-        for i in range(self.N):
-            for j in range(i+1, self.N):
-
-                if np.linalg.norm(r_next[i] - r_next[j]) < 2*self.radius:
-
-                    rdiff = self.r[i] - self.r[j] #vector between particle 1 and particle 2
-                    vdiff = self.v[i] - self.v[j]
-                    self.v[i] = self.v[i] - rdiff.dot(vdiff)/rdiff.dot(rdiff)*rdiff #update velocity of particle i
-                    self.v[j] = self.v[j] + rdiff.dot(vdiff)/rdiff.dot(rdiff)*rdiff #update velocity of particle j
+        #all wall and pair collisions at once, same rules as before (see colisoes.verificar_colisoes)
+        verificar_colisoes(self.r, self.v, self.dt, self.radius, self.L, self.collision_method)
 
     def step(self):
         """Computes the positions at the next timestep."""
@@ -64,17 +49,36 @@ class IdealGas:
 
 
 
-    def animate(self):
-        """Evolves the ideal gas for the specified number of steps."""
-
-        positions = np.zeros((self.nsteps, self.N,2)) #empty array to store positions
-        speeds = np.zeros((self.nsteps, self.N)) #empty array to store velocity norms
+    def frames(self, every=1):
+        """Evolves the ideal gas and yields (frame, positions, velocities) every `every` steps,
+        without storing the trajectory. The yielded arrays are the live state: copy them to keep them."""
 
         for n in range(self.nsteps): #iterate through all timesteps
 
-            positions[n,:,:] = self.r #append to positions
-            speeds[n,:] = np.linalg.norm(self.v, axis=1) #append to velocities
-            self.step() #step 
+            if n % every == 0:
+                yield n // every, self.r, self.v
+            self.step() #step
+
+    def animate(self, filename=None, every=1, dtype=np.float32):
+        """Evolves the ideal gas for the specified number of steps.
+        If filename is given, frames are streamed to memory-mapped .npy files (positions in `dtype`,
+        speeds in float16, see gravacao.py) and read-only memmaps are returned."""
+
+        nframes = qtde_frames(self.nsteps, every)
+
+        if filename is not None:
+            with GravadorTrajetoria(filename, nframes, self.N, 2, dtype) as writer:
+                for _, r, v in self.frames(every):
+                    writer.adicionar(r, np.linalg.norm(v, axis=1))
+            return carregar_trajetoria(filename)
+
+        positions = np.zeros((nframes, self.N,2)) #empty array to store positions
+        speeds = np.zeros((nframes, self.N)) #empty array to store velocity norms
+
+        for n, r, v in self.frames(every):
+
+            positions[n,:,:] = r #append to positions
+            speeds[n,:] = np.linalg.norm(v, axis=1) #append to velocities
 
         return positions,speeds
     
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Renderização rápida das partículas para animações e vídeos.
+
+A animação original limpa o eixo (ax.clear()) e cria um plt.Circle para
+cada partícula em todos os frames. Aqui os círculos são uma única
+EllipseCollection, criada uma vez; a cada frame só mudam as posições
+(offsets) e, se houver, as cores. O eixo (limites, rótulos, título) é
+configurado uma única vez.
+
+Também é possível enviar os frames (RGBA do canvas Agg) direto para o
+ffmpeg por um pipe, sem o FuncAnimation. Para vídeos longos, os frames
+podem ser divididos em intervalos renderizados em paralelo (um processo e
+um canvas Agg por intervalo); os segmentos são unidos sem recodificação
+pelo demuxer concat do ffmpeg.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import EllipseCollection
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+
+
+class RenderizadorParticulas:
+    """Desenha N partículas (círculos) reaproveitando os mesmos artistas."""
+
+    def __init__(self, ax, posicoes, raio, largura, cor="C0", cmap=None, vmin=0.0,
+                 vmax=1.0, periodico=False):
+        """
+        Cria a coleção de círculos no eixo.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            Eixo onde as partículas são desenhadas.
+        posicoes : numpy.ndarray
+            Posições (N, 2) do primeiro frame.
+        raio : float
+            Raio das partículas (unidades dos dados).
+        largura : float
+            Largura da caixa.
+        cor : string, opcional
+            Cor fixa das partículas (quando cmap é None). Padrão é "C0".
+        cmap : string ou Colormap, opcional
+            Mapa de cores para os valores de cada frame (por exemplo, a
+            velocidade). Padrão é None.
+        vmin, vmax : float, opcional
+            Faixa dos valores mapeados nas cores (fora dela, as cores das
+            pontas). Padrão é 0 e 1.
+        periodico : bool, opcional
+            Desenha as posições módulo a largura da caixa. Padrão é False.
+
+        """
+        self.ax = ax
+        self.largura = largura
+        self.periodico = periodico
+
+        qtde = len(posicoes)
+        self.colecao = EllipseCollection(np.full(qtde, 2 * raio), np.full(qtde, 2 * raio),
+                                         np.zeros(qtde), units="xy",
+                                         offsets=self._offsets(posicoes),
+                                         offset_transform=ax.transData)
+        if cmap is None:
+            self.colecao.set_facecolor(cor)
+        else:
+            self.colecao.set_cmap(cmap)
+            self.colecao.set_norm(Normalize(vmin, vmax, clip=True))
+            self.colecao.set_array(np.zeros(qtde))
+        self.colecao.set_edgecolor("none")
+        ax.add_collection(self.colecao)
+
+        ax.set_xlim(0, largura)
+        ax.set_ylim(0, largura)
+        ax.set_aspect("equal")
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+    def _offsets(self, posicoes):
+        """Posições desenhadas (módulo a caixa, se periódico)."""
+        posicoes = np.asarray(posicoes, dtype=np.float64)
+        return np.mod(posicoes, self.largura) if self.periodico else posicoes
+
+    def atualizar(self, posicoes, valores=None):
+        """
+        Atualiza posições e cores da coleção.
+
+        Parameters
+        ----------
+        posicoes : numpy.ndarray
+            Posições (N, 2).
+        valores : numpy.ndarray, opcional
+            Valores de cada partícula para o mapa de cores. Padrão é None.
+
+        Returns
+        -------
+        tuple
+            Artistas alterados (para o blit do FuncAnimation).
+
+        """
+        self.colecao.set_offsets(self._offsets(posicoes))
+        if valores is not None and self.colecao.get_cmap() is not None:
+            self.colecao.set_array(np.asarray(valores, dtype=np.float64))
+        return (self.colecao,)
+
+
+def animar(fig, renderizador, pos_simul, valores=None, interval=None, blit=True):
+    """
+    Cria o FuncAnimation que apenas atualiza o renderizador.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figura.
+    renderizador : RenderizadorParticulas
+        Renderizador já criado no eixo da figura.
+    pos_simul : numpy.ndarray
+        Posições (n_frames, N, 2) (pode ser um numpy.memmap).
+    valores : numpy.ndarray, opcional
+        Valores (n_frames, N) para as cores. Padrão é None.
+    interval : float, opcional
+        Intervalo entre frames (ms). Padrão é None (200 ms).
+    blit : bool, opcional
+        Redesenha apenas a coleção (backends interativos). Padrão é True.
+
+    Returns
+    -------
+    matplotlib.animation.FuncAnimation
+        Animação.
+
+    """
+    def quadro(frame):
+        return renderizador.atualizar(pos_simul[frame],
+                                      None if valores is None else valores[frame])
+
+    return FuncAnimation(fig, quadro, frames=len(pos_simul), init_func=lambda: quadro(0),
+                         interval=200 if interval is None else interval, blit=blit)
+
+
+def comando_ffmpeg(arquivo, largura_px, altura_px, fps=30):
+    """
+    Monta o comando do ffmpeg que lê frames RGBA crus da entrada padrão.
+
+    Parameters
+    ----------
+    arquivo : string
+        Vídeo de saída (.mp4).
+    largura_px, altura_px : int
+        Tamanho dos frames (pixels).
+    fps : int, opcional
+        Frames por segundo. Padrão é 30.
+
+    Returns
+    -------
+    list
+        Argumentos do subprocess.
+
+    """
+    return ["ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{largura_px}x{altura_px}",
+            "-r", str(fps), "-i", "-",
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",  # libx264/yuv420p pede lados pares
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", arquivo]
+
+
+def exportar_ffmpeg(fig, renderizador, pos_simul, arquivo, valores=None, fps=30,
+                    frames=None):
+    """
+    Renderiza os frames no canvas Agg e envia os pixels direto ao ffmpeg.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figura (com canvas Agg, por exemplo criada com matplotlib.use("Agg")
+        ou plt.subplots em modo não interativo).
+    renderizador : RenderizadorParticulas
+        Renderizador já criado no eixo da figura.
+    pos_simul : numpy.ndarray
+        Posições (n_frames, N, 2).
+    arquivo : string
+        Vídeo de saída (.mp4).
+    valores : numpy.ndarray, opcional
+        Valores (n_frames, N) para as cores. Padrão é None.
+    fps : int, opcional
+        Frames por segundo. Padrão é 30.
+    frames : iterable, opcional
+        Frames exportados. Padrão é None (todos).
+
+    Returns
+    -------
+    None.
+
+    """
+    # fundo (eixos, rótulos, título) desenhado uma vez; a cada frame só a
+    # coleção é desenhada sobre ele (blit no canvas Agg)
+    renderizador.colecao.set_animated(True)
+    fig.canvas.draw()
+    fundo = fig.canvas.copy_from_bbox(fig.bbox)
+    altura_px, largura_px = np.asarray(fig.canvas.buffer_rgba()).shape[:2]
+    frames = range(len(pos_simul)) if frames is None else frames
+
+    try:
+        processo = subprocess.Popen(comando_ffmpeg(arquivo, largura_px, altura_px, fps),
+                                    stdin=subprocess.PIPE)
+    except FileNotFoundError as erro:
+        raise ValueError("ffmpeg não encontrado (necessário para gravar o vídeo).") from erro
+
+    with processo:
+        for frame in frames:
+            renderizador.atualizar(pos_simul[frame],
+                                   None if valores is None else valores[frame])
+            fig.canvas.restore_region(fundo)
+            renderizador.ax.draw_artist(renderizador.colecao)
+            processo.stdin.write(fig.canvas.buffer_rgba())
+        processo.stdin.close()
+    renderizador.colecao.set_animated(False)
+
+    if processo.returncode:
+        raise ValueError(f"ffmpeg terminou com erro ({processo.returncode}).")
+
+
+def criar_figura(posicoes, raio, largura, figsize=(12, 6), dpi=None, fundo=None,
+                 cor_texto=None, titulo=None, rotulos=("$x$", "$y$"), **opcoes):
+    """
+    Cria uma figura com canvas Agg (sem pyplot) e o renderizador.
+
+    Parameters
+    ----------
+    posicoes : numpy.ndarray
+        Posições (N, 2) do primeiro frame.
+    raio : float
+        Raio das partículas.
+    largura : float
+        Largura da caixa.
+    figsize : tuple, opcional
+        Tamanho da figura (polegadas). Padrão é (12, 6).
+    dpi : float, opcional
+        Resolução. Padrão é None (rcParams['figure.dpi']).
+    fundo : string, opcional
+        Cor de fundo da figura e do eixo. Padrão é None.
+    cor_texto : string, opcional
+        Cor dos rótulos e do título. Padrão é None.
+    titulo : string, opcional
+        Título do eixo. Padrão é None.
+    rotulos : tuple, opcional
+        Rótulos dos eixos x e y. Padrão é ("$x$", "$y$").
+    **opcoes
+        Demais argumentos de RenderizadorParticulas (cor, cmap, vmin, vmax,
+        periodico).
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+        Figura.
+    renderizador : RenderizadorParticulas
+        Renderizador no eixo da figura.
+
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if fundo is not None:
+        fig.patch.set_facecolor(fundo)
+        ax.set_facecolor(fundo)
+
+    renderizador = RenderizadorParticulas(ax, posicoes, raio, largura, **opcoes)
+    texto = {"fontsize": 15} if cor_texto is None else {"fontsize": 15, "color": cor_texto}
+    ax.set_xlabel(rotulos[0], **texto)
+    ax.set_ylabel(rotulos[1], **texto)
+    if titulo is not None:
+        ax.set_title(titulo, **texto)
+    fig.tight_layout()
+    return fig, renderizador
+
+
+def _renderizar_segmento(opcoes_figura, posicoes, valores, arquivo, fps):
+    """Renderiza um intervalo de frames em um segmento de vídeo (processo)."""
+    fig, renderizador = criar_figura(posicoes[0], **opcoes_figura)
+    exportar_ffmpeg(fig, renderizador, posicoes, arquivo, valores, fps)
+    return arquivo
+
+
+def concatenar_videos(segmentos, arquivo):
+    """
+    Une os segmentos (mesmo codec e tamanho) sem recodificar.
+
+    Parameters
+    ----------
+    segmentos : list
+        Arquivos dos segmentos, em ordem.
+    arquivo : string
+        Vídeo de saída.
+
+    Returns
+    -------
+    None.
+
+    """
+    lista = f"{arquivo}.segmentos.txt"
+    with open(lista, "w", encoding="utf-8") as arq:
+        for segmento in segmentos:
+            caminho = os.path.abspath(segmento).replace("'", "'\\''")
+            arq.write(f"file '{caminho}'\n")
+
+    try:
+        resultado = subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat",
+                                    "-safe", "0", "-i", lista, "-c", "copy", arquivo],
+                                   check=False)
+    except FileNotFoundError as erro:
+        raise ValueError("ffmpeg não encontrado (necessário para gravar o vídeo).") from erro
+    finally:
+        os.remove(lista)
+
+    if resultado.returncode:
+        raise ValueError(f"ffmpeg terminou com erro ({resultado.returncode}).")
+
+
+def exportar_em_paralelo(opcoes_figura, pos_simul, arquivo, valores=None, fps=30,
+                         trabalhadores=None, segmentos=None):
+    """
+    Exporta o vídeo renderizando intervalos de frames em paralelo.
+
+    Cada processo cria a sua figura (criar_figura(**opcoes_figura)) e grava
+    um segmento com exportar_ffmpeg; no fim os segmentos são unidos com
+    concatenar_videos (sem recodificação).
+
+    Parameters
+    ----------
+    opcoes_figura : dict
+        Argumentos de criar_figura (exceto as posições), por exemplo
+        {"raio": 0.5, "largura": 100, "titulo": "Animação do Gás Ideal"}.
+    pos_simul : numpy.ndarray
+        Posições (n_frames, N, 2) (pode ser um numpy.memmap).
+    arquivo : string
+        Vídeo de saída (.mp4).
+    valores : numpy.ndarray, opcional
+        Valores (n_frames, N) para as cores. Padrão é None.
+    fps : int, opcional
+        Frames por segundo. Padrão é 30.
+    trabalhadores : int, opcional
+        Número de processos. Padrão é None (os.cpu_count()).
+    segmentos : int, opcional
+        Número de intervalos de frames. Padrão é None (um por processo).
+
+    Returns
+    -------
+    None.
+
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    n_frames = len(pos_simul)
+    segmentos = int(max(1, min(segmentos or trabalhadores, n_frames)))
+
+    # mesma resolução nos processos (rcParams pode ter sido alterado aqui)
+    opcoes_figura = dict(opcoes_figura)
+    opcoes_figura.setdefault("dpi", matplotlib.rcParams["figure.dpi"])
+
+    if segmentos == 1:
+        fig, renderizador = criar_figura(pos_simul[0], **opcoes_figura)
+        exportar_ffmpeg(fig, renderizador, pos_simul, arquivo, valores, fps)
+        return
+
+    diretorio = tempfile.mkdtemp(prefix="segmentos_",
+                                 dir=os.path.dirname(os.path.abspath(arquivo)))
+    try:
+        limites = np.linspace(0, n_frames, segmentos + 1).astype(np.int64)
+        with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+            futuros = []
+            for n, (inicio, fim) in enumerate(zip(limites[:-1], limites[1:])):
+                futuros.append(executor.submit(
+                    _renderizar_segmento, opcoes_figura, np.asarray(pos_simul[inicio:fim]),
+                    None if valores is None else np.asarray(valores[inicio:fim]),
+                    os.path.join(diretorio, f"segmento_{n:04d}.mp4"), fps))
+            arquivos = [futuro.result() for futuro in futuros]
+
+        concatenar_videos(arquivos, arquivo)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
@@ -18,7 +18,12 @@ O programa segue algumas ideias:
             - r(t + dt) = r(t) + v(t)dT
 
 Sobre as colisões entre as partículas:
-    1)
+    1) Os pares são encontrados de uma vez, pela lista de células (apenas partículas em
+       células vizinhas são testadas) ou pela matriz de distâncias em blocos (poucas
+       partículas); ver o módulo colisoes.
+    2) Partículas com mais de uma colisão no mesmo passo são resolvidas na ordem (i, j).
+    3) Alternativa (motor='eventos'): dinâmica dirigida por eventos, com o instante exato
+       de cada colisão (fila de prioridade); ver o módulo eventos.
 
 Sobre a colisão da partículas com a parede:
     1) O componente da velocidade que for perpendicular à parede é invertido.
@@ -32,14 +37,17 @@ Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
 try:
     import sys
     import numpy as np
-    from itertools import product
+    from colisoes import verificar_colisoes
+    from eventos import MotorEventos
+    from gravacao import GravadorTrajetoria, carregar_trajetoria, qtde_frames
+    from estado_inicial import estado_inicial
+    from renderizacao import exportar_em_paralelo
 
     # Matplotlib
     import warnings
     warnings.filterwarnings("ignore")
     import matplotlib.pyplot as plt
     plt.rcParams['figure.dpi'] = 300
-    from matplotlib.animation import FuncAnimation
 except ImportError as e:
     print('[!] The required Python libraries could not be imported:', file=sys.stderr)
     print(f'\t{e}')
@@ -53,8 +61,18 @@ k_b = 1.38*(10**(-23))
 class GasIdeal:
     """Classe que descreve o gás ideal e a funções necessárias para extra."""
 
-    def __init__(self, n_particulas, massa, raio, largura, v_inicial, duracao, n_passos):
-        """Inicializa propriedades."""
+    def __init__(self, n_particulas, massa, raio, largura, v_inicial, duracao, n_passos,
+                 metodo_colisao=None, motor="passos", semente=None, temperatura=None):
+        """
+        Inicializa propriedades.
+
+        O parâmetro semente (int, numpy.random.SeedSequence ou
+        numpy.random.Generator) define o gerador das velocidades iniciais;
+        com None (padrão), cada execução é diferente. Com temperatura (K),
+        as velocidades iniciais são sorteadas da distribuição de
+        Maxwell-Boltzmann (momento total nulo) em vez de terem módulo
+        v_inicial.
+        """
         self.n_particulas = n_particulas  # número de partículas
         self.massa = massa  # massa da partícula (kg)
         self.raio = raio  # raio da partícula (m)
@@ -63,29 +81,15 @@ class GasIdeal:
         self.n_passos = n_passos  # número de passos
         self.dt = duracao / n_passos  # timestep (s)
         self.v_inicial = v_inicial  # velocidade inicial da partícula (m/s)
+        self.metodo_colisao = metodo_colisao  # 'celulas', 'blocos' ou None (automático)
+        self.motor = motor  # 'passos' (passo fixo) ou 'eventos' (instante exato das colisões)
+        self.rng = np.random.default_rng(semente)  # gerador de números aleatórios
 
-        #
-        # Posição das particulas
-        #
-
-        # Cria as posições das partículas em uma grade
-        tam_grade = int(np.ceil(np.sqrt(n_particulas)))
-
-        # Espaço entre as partículas
-        espaco = largura / tam_grade
-
-        # O valor x do centro da partícula
-        x = np.linspace(raio + espaco / 2, largura - raio - espaco/2, tam_grade)
-
-        # Gera um vetor com formato x, y
-        pos = list(product(x, x))
-
-        # Inicializa as posiçoes das particulas
-        self.posicoes = np.array(pos[:n_particulas])
-
-        theta = np.random.uniform(0, 2*np.pi, size=n_particulas)
-        vx, vy = self.v_inicial * np.cos(theta), self.v_inicial * np.sin(theta)
-        self.velocidades = np.stack((vx, vy), axis=1)
+        # Posições em grade e velocidades com direção aleatória (ou de
+        # Maxwell-Boltzmann na temperatura dada); ver estado_inicial
+        kT = None if temperatura is None else k_b * temperatura
+        self.posicoes, self.velocidades = estado_inicial(n_particulas, largura, raio, v_inicial,
+                                                         kT, massa, semente=self.rng)
 
     def verifica_colisao(self):
         """
@@ -94,50 +98,99 @@ class GasIdeal:
         Ao se verificar uma colisão, atualiza as velocidades considerando conservação
         de energia e momento linear.
         """
-        # Nova posicao das partículas
-        pos_nova = self.posicoes + self.velocidades * self.dt
-
-        # Avalia as colições com as paredes
-        # Eixo X
-        self.velocidades[pos_nova[:, 0] < self.raio, 0] *= -1  # colisão contra a parede da esquerda (x)
-        self.velocidades[pos_nova[:, 0] > self.largura-self.raio, 0] *= -1  # colisão com a parede da direita (x)
-        # Exio Y
-        self.velocidades[pos_nova[:, 1] < self.raio, 1] *= -1  # colisão com a parede inferior (y)
-        self.velocidades[pos_nova[:, 1] > self.largura-self.raio, 1] *= -1  # colisão com a parede superior (y)
-
-        # Avaliando a colisões entre as partículas
-        for i in range(self.n_particulas):
-            for j in range(i+1, self.n_particulas):
-                # Calcula a norma ou módulo do vetor para saber se ouve colisão
-                if np.linalg.norm(pos_nova[i] - pos_nova[j]) < 2*self.raio:
-                    rdiff = self.posicoes[i] - self.posicoes[j]
-                    vdiff = self.velocidades[i] - self.velocidades[j]
-
-                    # atualiza velocidade da partícula i
-                    self.velocidades[i] = self.velocidades[i] - rdiff.dot(vdiff)/rdiff.dot(rdiff)*rdiff
-
-                    # atualiza velocidade da partícula j
-                    self.velocidades[j] = self.velocidades[j] + rdiff.dot(vdiff)/rdiff.dot(rdiff)*rdiff
+        # Colisões com as paredes e entre as partículas, avaliadas na nova
+        # posição, r(t) + v(t)dt (motor comum com IdealGas; ver colisoes)
+        verificar_colisoes(self.posicoes, self.velocidades, self.dt, self.raio,
+                           self.largura, self.metodo_colisao)
 
     def passo(self):
         """Calculando as posições."""
         self.verifica_colisao()
         self.posicoes += self.velocidades * self.dt
 
-    def simular(self):
-        """Simulando a movimentação de um gás ideal."""
-        # Matriz de posições e velocidades (inicializando) para todos os passos
-        #
-        pos_simul = np.zeros((self.n_passos, self.n_particulas, 2))
-        vel_simul = np.zeros((self.n_passos, self.n_particulas))
+    def iterar(self, a_cada=1):
+        """
+        Simula e gera os frames, um de cada vez (sem guardar a trajetória).
+
+        Os vetores gerados são o próprio estado do gás e mudam no passo
+        seguinte: copie-os se precisar guardá-los.
+
+        Parameters
+        ----------
+        a_cada : int, opcional
+            Gera um frame a cada 'a_cada' passos. Padrão é 1.
+
+        Yields
+        ------
+        frame : int
+            Número do frame (passo // a_cada).
+        posicoes : numpy.ndarray
+            Posições (n_particulas, 2) no início do passo.
+        velocidades : numpy.ndarray
+            Velocidades (n_particulas, 2) no início do passo.
+
+        """
+        if self.motor == "eventos":
+            # colisões no instante exato (ver o módulo eventos); o estado final
+            # é o do instante n_passos*dt, como no passo fixo
+            motor = MotorEventos(self.posicoes, self.velocidades, self.raio, self.largura)
+            yield from motor.iterar(np.arange(0, self.n_passos, a_cada) * self.dt,
+                                    self.n_passos * self.dt)
+            self.posicoes, self.velocidades = motor.estado()
+            return
 
         for n in range(self.n_passos):
-            pos_simul[n, :, :] = self.posicoes
-            vel_simul[n, :] = np.linalg.norm(self.velocidades, axis=1)
+            if n % a_cada == 0:
+                yield n // a_cada, self.posicoes, self.velocidades
 
             # Passo
             self.passo()
 
+    def simular(self, arquivo=None, a_cada=1, precisao=np.float32):
+        """
+        Simulando a movimentação de um gás ideal.
+
+        Parameters
+        ----------
+        arquivo : string, opcional
+            Nome base dos arquivos da trajetória (ver gravacao). Se informado,
+            os frames são gravados em disco durante a simulação e a memória
+            usada não depende do número de passos. Padrão é None (matrizes
+            na memória, float64).
+        a_cada : int, opcional
+            Guarda um frame a cada 'a_cada' passos. Padrão é 1.
+        precisao : numpy.dtype, opcional
+            Tipo das posições gravadas em arquivo (as velocidades são
+            gravadas em float16). Padrão é np.float32.
+
+        Returns
+        -------
+        pos_simul : numpy.ndarray
+            Posições (n_frames, n_particulas, 2); numpy.memmap se arquivo
+            for informado.
+        vel_simul : numpy.ndarray
+            Módulo das velocidades (n_frames, n_particulas).
+
+        """
+        n_frames = qtde_frames(self.n_passos, a_cada)
+
+        if arquivo is not None:
+            with GravadorTrajetoria(arquivo, n_frames, self.n_particulas, 2,
+                                    precisao) as gravador:
+                for _, posicoes, velocidades in self.iterar(a_cada):
+                    gravador.adicionar(posicoes, np.linalg.norm(velocidades, axis=1))
+
+            return carregar_trajetoria(arquivo)
+
+        # Matriz de posições e velocidades (inicializando) para todos os passos
+        #
+        pos_simul = np.zeros((n_frames, self.n_particulas, 2))
+        vel_simul = np.zeros((n_frames, self.n_particulas))
+
+        for n, posicoes, velocidades in self.iterar(a_cada):
+            pos_simul[n, :, :] = posicoes
+            vel_simul[n, :] = np.linalg.norm(velocidades, axis=1)
+
         return pos_simul, vel_simul
 
     def energia_cinetica_media(self, v: float) -> float:
@@ -157,7 +210,9 @@ class GasIdeal:
             Valor da energia cinética média.
 
         """
-        media_quad_vel = np.sum(v**2) / self.n_particulas
+        # soma em float64, por blocos (v pode ser float16 ou um memmap)
+        v = np.ravel(v)
+        media_quad_vel = np.einsum("i,i->", v, v, dtype=np.float64) / self.n_particulas
         return 0.5*self.massa*media_quad_vel
 
     def MaxwellBoltzmann(self, v):
@@ -269,25 +324,29 @@ def gerar_img_inicial(gas: GasIdeal):
     plt.close()
 
 
-def animate_positions(frame, ax1, plt, positions, gas, speeds, v):
-    """Função para animação."""
-    ax1.clear()
+def resumo_resultados(gas: GasIdeal, vel_simul: np.ndarray) -> dict:
+    """
+    Resultados da simulação (os mesmos exibidos em exibe_resultados).
 
-    for i in range(gas.n_particulas):
-        x, y = positions[frame, i, 0], positions[frame, i, 1]
-        circle = plt.Circle((x, y), gas.raio, fill=True)
-        ax1.add_artist(circle)
+    Parameters
+    ----------
+    gas : GasIdeal
+        Objeto da classe.
+    vel_simul : numpy.ndarray
+        Array contendo as velocidades das partículas.
 
-    ax1.set_xlabel('$x$', fontsize=15)
-    ax1.set_ylabel('$y$', fontsize=15)
-    ax1.set_title('Animação do Gás Ideal', fontsize=15)
-    ax1.set_xlim(0, gas.largura)
-    ax1.set_ylim(0, gas.largura)
-    ax1.set_aspect('equal')
-    ax1.set_xticks([])
-    ax1.set_yticks([])
+    Returns
+    -------
+    dict
+        'ek_total_inicial' e 'ek_total_final' (soma de v² no primeiro e no
+        último frame), 'ek_media' (J) e 'temperatura' (K).
 
-    plt.tight_layout()
+    """
+    ek_media = gas.energia_cinetica_media(vel_simul)
+    return {"ek_total_inicial": float(np.sum(np.square(vel_simul[0], dtype=np.float64))),
+            "ek_total_final": float(np.sum(np.square(vel_simul[-1], dtype=np.float64))),
+            "ek_media": float(ek_media),
+            "temperatura": float((ek_media/k_b)*(3/2))}
 
 
 def exibe_resultados(gas: GasIdeal, vel_simul: np.ndarray) -> None:
@@ -307,19 +366,28 @@ def exibe_resultados(gas: GasIdeal, vel_simul: np.ndarray) -> None:
         Nada.
 
     """
+    resumo = resumo_resultados(gas, vel_simul)
+
     # Verifica se a energia cinética total é conservada
-    print(f' - Energia cinética total conversada: {np.sum(vel_simul[0]**2):.3f}, {np.sum(vel_simul[-1]**2):.3f}')
+    print(f' - Energia cinética total conversada: {resumo["ek_total_inicial"]:.3f}, '
+          f'{resumo["ek_total_final"]:.3f}')
 
-    Ek_media = gas.energia_cinetica_media(vel_simul)
-    print(f" - Energia cinética média: {Ek_media:12.4E}")
-    temp = (Ek_media/k_b)*(3/2)
-    print(f" - Temperatura: {temp:8.2f} K")
+    print(f" - Energia cinética média: {resumo['ek_media']:12.4E}")
+    print(f" - Temperatura: {resumo['temperatura']:8.2f} K")
 
 
-def main():
+def main(arquivo_trajetoria=None, a_cada=1):
     """
     Principal function.
 
+    Parameters
+    ----------
+    arquivo_trajetoria : string, opcional
+        Grava a trajetória em disco com este nome base (ver GasIdeal.simular;
+        na linha de comando, --trajetoria NOME). Padrão é None (memória).
+    a_cada : int, opcional
+        Guarda um frame a cada 'a_cada' passos (--a-cada N). Padrão é 1.
+
     Returns
     -------
     None.
@@ -418,21 +486,14 @@ def main():
         gerar_img_inicial(gas)
 
         print(" - Simulando...")
-        pos_simul, vel_simul = gas.simular()
+        pos_simul, vel_simul = gas.simular(arquivo_trajetoria, a_cada)
 
-        # Animando
+        # Animando (a coleção de círculos é criada uma vez; intervalos de
+        # frames são renderizados em paralelo e unidos pelo ffmpeg)
         print(" - Gerando animação")
-        v = np.linspace(0, 35, 500)
-        fig, ax1 = plt.subplots(1, 1, figsize=(12, 6))
-
-        # # Intervalo para animação
-        interval = duracao*1e3 / n_passos
-        animation = FuncAnimation(fig,
-                                  animate_positions,
-                                  frames=n_passos,
-                                  interval=interval,
-                                  fargs=[ax1, plt, pos_simul, gas, vel_simul, v])
-        animation.save('gas_ideal.mp4', writer='ffmpeg', fps=30)
+        exportar_em_paralelo({"raio": gas.raio, "largura": gas.largura,
+                              "titulo": "Animação do Gás Ideal"},
+                             pos_simul, 'gas_ideal.mp4', fps=30)
 
         #
         # Resultados
@@ -448,8 +509,23 @@ def main():
 
 
 if __name__ == "__main__":
+    # uso: python simulando_2D_gas_ideal_v2.py [--trajetoria NOME] [--a-cada PASSOS]
+    argumentos = sys.argv[1:]
+    opcoes = {"--trajetoria": None, "--a-cada": "1"}
+    for opcao in opcoes:
+        if opcao in argumentos:
+            posicao = argumentos.index(opcao)
+            opcoes[opcao] = argumentos[posicao + 1] if posicao + 1 < len(argumentos) else ""
+            del argumentos[posicao:posicao + 2]
+
+    if argumentos or opcoes["--trajetoria"] == "" or not opcoes["--a-cada"].isdigit() or \
+            int(opcoes["--a-cada"]) < 1:
+        print(" - Uso: python simulando_2D_gas_ideal_v2.py [--trajetoria NOME] "
+              "[--a-cada PASSOS]")
+        sys.exit()
+
     # Show header message.
     head_msg()
 
     # Main
-    main()
+    main(opcoes["--trajetoria"], int(opcoes["--a-cada"]))
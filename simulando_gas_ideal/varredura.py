@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura de parâmetros do gás ideal, sem perguntas (input).
+
+A grade é um arquivo JSON; cada parâmetro da varredura pode ser um valor
+ou uma lista de valores, e todas as combinações são simuladas 'replicas'
+vezes. Exemplo:
+
+    {"n_particulas": [100, 200], "l_caixa": [20.0, 40.0],
+     "v_inicial": [1.0, 2.0], "raio": 0.3, "replicas": 3,
+     "massa": 5.31e-26, "duracao": 10, "n_passos": 500, "semente": 1234}
+
+Cada ponto (combinação e réplica) roda em um processo (ProcessPoolExecutor)
+com o seu próprio gerador de números aleatórios: a semente de cada ponto
+vem de numpy.random.SeedSequence(semente), com o nome do ponto como
+spawn_key, então os pontos são independentes e reprodutíveis (mesmo se as
+listas da grade forem editadas). Os resultados (os mesmos de
+exibe_resultados) são acrescentados a uma tabela CSV assim que cada ponto
+termina. Cada linha guarda uma assinatura dos parâmetros fixos (e da
+semente, quando informada na grade); ao rodar de novo, os pontos que já
+estão na tabela com a mesma assinatura são pulados. Sem semente na grade,
+a semente da varredura é sorteada na primeira execução e lida da tabela
+nas seguintes, então a varredura também continua de onde parou.
+
+Author.............: Rogério Ribeiro Macêdo.
+Curriculum Lattes..: http://lattes.cnpq.br/8806221981552346
+"""
+# pylint: disable=import-error
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+
+from renderizacao import criar_figura, exportar_ffmpeg
+from simulando_2D_gas_ideal_v2 import GasIdeal, n_ljust, resumo_resultados
+
+# Parâmetros da varredura (na ordem do produto) e valores padrão dos demais
+PARAMETROS_VARREDURA = ("n_particulas", "l_caixa", "v_inicial", "raio")
+PADROES = {"n_particulas": 100, "l_caixa": 20.0, "v_inicial": 2.0, "raio": 0.3,
+           "massa": 5.31e-26, "duracao": 10, "n_passos": 500, "replicas": 1,
+           "motor": "passos", "metodo_colisao": None, "semente": None}
+
+# Parâmetros que não mudam os resultados de um ponto (fora da assinatura)
+PARAMETROS_SEM_EFEITO = ("replicas",)
+
+# Colunas da tabela de resultados
+COLUNAS = ("ponto", "assinatura", "indice", "semente", "spawn_key", "replica") + \
+    PARAMETROS_VARREDURA + (
+    "densidade", "ek_total_inicial", "ek_total_final", "ek_media", "temperatura", "tempo")
+
+
+def ler_grade(arquivo):
+    """
+    Lê o arquivo da grade e completa os valores padrão.
+
+    Parameters
+    ----------
+    arquivo : string
+        Arquivo JSON da grade.
+
+    Returns
+    -------
+    dict
+        Grade (parâmetros da varredura sempre como listas).
+
+    """
+    with open(arquivo, encoding="utf-8") as arq:
+        grade = json.load(arq)
+
+    desconhecidos = set(grade) - set(PADROES)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros desconhecidos na grade: {sorted(desconhecidos)}.")
+
+    grade = {**PADROES, **grade}
+    for nome in PARAMETROS_VARREDURA:
+        if not isinstance(grade[nome], list):
+            grade[nome] = [grade[nome]]
+    return grade
+
+
+def pontos_grade(grade):
+    """
+    Pontos da grade (combinações e réplicas).
+
+    Parameters
+    ----------
+    grade : dict
+        Grade (ver ler_grade).
+
+    Returns
+    -------
+    pontos : list
+        Dicionários com 'ponto' (nome), 'indice', 'replica' e os
+        parâmetros da varredura.
+
+    """
+    pontos = []
+    for valores in product(*(grade[nome] for nome in PARAMETROS_VARREDURA)):
+        for replica in range(int(grade["replicas"])):
+            ponto = dict(zip(PARAMETROS_VARREDURA, valores), replica=replica)
+            ponto["ponto"] = "_".join(f"{nome}={valor}" for nome, valor in ponto.items())
+            ponto["indice"] = len(pontos)
+            pontos.append(ponto)
+
+    return pontos
+
+
+def semente_ponto(raiz, ponto):
+    """
+    Semente de um ponto, derivada do seu nome (não da posição na grade).
+
+    Parameters
+    ----------
+    raiz : numpy.random.SeedSequence
+        Semente da varredura.
+    ponto : dict
+        Ponto (ver pontos_grade).
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        Semente do ponto.
+
+    """
+    chave = int.from_bytes(hashlib.sha256(ponto["ponto"].encode("utf-8")).digest()[:16],
+                           "little")
+    return np.random.SeedSequence(raiz.entropy, spawn_key=(chave,))
+
+
+def assinatura_grade(grade):
+    """
+    Assinatura dos parâmetros fixos da grade.
+
+    Linhas da tabela com outra assinatura (por exemplo, outra duração ou
+    outra semente) não contam como pontos concluídos. A semente só entra
+    na assinatura quando foi informada na grade (ver semente_varredura).
+
+    Parameters
+    ----------
+    grade : dict
+        Grade (ver ler_grade).
+
+    Returns
+    -------
+    string
+        Assinatura (hash curto).
+
+    """
+    fixos = {nome: valor for nome, valor in grade.items()
+             if nome not in PARAMETROS_VARREDURA + PARAMETROS_SEM_EFEITO}
+    if fixos["semente"] is None:
+        del fixos["semente"]
+    texto = json.dumps(fixos, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def semente_varredura(grade, concluidos):
+    """
+    Semente da varredura.
+
+    É a semente da grade; sem ela, a semente das linhas já concluídas (de
+    uma execução interrompida) ou, na primeira execução, uma nova semente
+    sorteada por numpy.random.SeedSequence.
+
+    Parameters
+    ----------
+    grade : dict
+        Grade (ver ler_grade).
+    concluidos : dict
+        Linhas já concluídas (ver pontos_concluidos).
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        Semente de onde vêm as sementes dos pontos (ver semente_ponto).
+
+    """
+    if grade["semente"] is not None:
+        return np.random.SeedSequence(grade["semente"])
+
+    sementes = {int(linha["semente"]) for linha in concluidos.values()}
+    if len(sementes) > 1:
+        raise ValueError("A tabela tem linhas com sementes diferentes; informe a semente na "
+                         "grade ou use outro arquivo (-o).")
+    return np.random.SeedSequence(sementes.pop() if sementes else None)
+
+
+def pontos_concluidos(arquivo, assinatura):
+    """
+    Linhas da tabela de resultados com a assinatura da grade atual.
+
+    Parameters
+    ----------
+    arquivo : string
+        Tabela CSV.
+    assinatura : string
+        Assinatura da grade (ver assinatura_grade).
+
+    Returns
+    -------
+    dict
+        Nome do ponto -> linha da tabela.
+
+    """
+    if not os.path.isfile(arquivo):
+        return {}
+
+    with open(arquivo, newline="", encoding="utf-8") as arq:
+        leitor = csv.DictReader(arq)
+        if leitor.fieldnames is not None and tuple(leitor.fieldnames) != COLUNAS:
+            raise ValueError(f"A tabela {arquivo} tem outras colunas; use outro arquivo (-o).")
+
+        # linhas incompletas (interrupção durante a escrita) são ignoradas
+        return {linha["ponto"]: linha for linha in leitor
+                if linha.get("assinatura") == assinatura
+                and linha.get("tempo") not in (None, "")}
+
+
+def simular_ponto(ponto, grade, semente, animacao=False):
+    """
+    Simula um ponto da grade (executado em um processo).
+
+    Parameters
+    ----------
+    ponto : dict
+        Ponto (ver pontos_grade).
+    grade : dict
+        Grade (parâmetros fixos).
+    semente : numpy.random.SeedSequence
+        Semente do ponto (ver semente_ponto).
+    animacao : bool, opcional
+        Grava o vídeo 'gas_ideal_<ponto>.mp4'. Padrão é False.
+
+    Returns
+    -------
+    dict
+        Linha da tabela de resultados.
+
+    """
+    inicio = time.perf_counter()
+    gas = GasIdeal(int(ponto["n_particulas"]), grade["massa"], ponto["raio"], ponto["l_caixa"],
+                   ponto["v_inicial"], grade["duracao"], int(grade["n_passos"]),
+                   grade["metodo_colisao"], grade["motor"], semente=semente)
+    pos_simul, vel_simul = gas.simular()
+
+    if animacao:
+        fig, renderizador = criar_figura(pos_simul[0], gas.raio, gas.largura,
+                                         titulo="Animação do Gás Ideal")
+        exportar_ffmpeg(fig, renderizador, pos_simul, f"gas_ideal_{ponto['ponto']}.mp4",
+                        fps=30)
+
+    # a semente da varredura e o spawn_key identificam o gerador do ponto
+    linha = {**ponto, "semente": semente.entropy, "spawn_key": semente.spawn_key[0],
+             "densidade": ponto["n_particulas"] / ponto["l_caixa"]**2}
+    linha.update(resumo_resultados(gas, vel_simul))
+    linha["tempo"] = time.perf_counter() - inicio
+    return linha
+
+
+def varrer(arquivo_grade, arquivo_resultados="varredura.csv", trabalhadores=None,
+           animacao=True):
+    """
+    Executa todos os pontos da grade que ainda não estão na tabela.
+
+    Parameters
+    ----------
+    arquivo_grade : string
+        Arquivo JSON da grade (ver ler_grade).
+    arquivo_resultados : string, opcional
+        Tabela CSV (criada ou completada). Padrão é "varredura.csv".
+    trabalhadores : int, opcional
+        Número de processos. Padrão é None (os.cpu_count()).
+    animacao : bool, opcional
+        Grava um vídeo por ponto. Padrão é True.
+
+    Returns
+    -------
+    list
+        Linhas da tabela (pontos da grade atual já concluídos), na ordem da
+        grade.
+
+    """
+    grade = ler_grade(arquivo_grade)
+    pontos = pontos_grade(grade)
+    assinatura = assinatura_grade(grade)
+    concluidos = pontos_concluidos(arquivo_resultados, assinatura)
+    raiz = semente_varredura(grade, concluidos)
+    pendentes = [ponto for ponto in pontos if ponto["ponto"] not in concluidos]
+
+    print(f" - Pontos na grade: {len(pontos)} (já concluídos: {len(pontos) - len(pendentes)})")
+    if grade["semente"] is None:
+        print(f" - Semente: {raiz.entropy}")
+
+    novo = not os.path.isfile(arquivo_resultados)
+    with open(arquivo_resultados, "a", newline="", encoding="utf-8") as arq:
+        escritor = csv.DictWriter(arq, fieldnames=COLUNAS, extrasaction="ignore")
+        if novo:
+            escritor.writeheader()
+
+        with ProcessPoolExecutor(max_workers=trabalhadores or os.cpu_count() or 1) as executor:
+            futuros = {executor.submit(simular_ponto, ponto, grade, semente_ponto(raiz, ponto),
+                                       animacao): ponto for ponto in pendentes}
+            for n, futuro in enumerate(as_completed(futuros), start=1):
+                linha = futuro.result()
+                linha["assinatura"] = assinatura
+                escritor.writerow(linha)
+                arq.flush()
+                print(f" - [{n}/{len(pendentes)}] {linha['ponto']}: "
+                      f"{linha['temperatura']:8.2f} K ({linha['tempo']:.1f} s)")
+
+    concluidos = pontos_concluidos(arquivo_resultados, assinatura)
+    return [concluidos[ponto["ponto"]] for ponto in pontos if ponto["ponto"] in concluidos]
+
+
+def exibe_tabela(linhas):
+    """Imprime a tabela de resultados da varredura."""
+    print("")
+    print("-".center(100, "-"))
+    print(f"{'N':>6} {'L (m)':>8} {'v0 (m/s)':>9} {'raio (m)':>9} {'rép.':>5} "
+          f"{'Ek total (início, fim)':>25} {'Ek média (J)':>13} {'T (K)':>10}")
+    print("-".center(100, "-"))
+    for linha in linhas:
+        print(f"{int(linha['n_particulas']):>6} {float(linha['l_caixa']):>8.2f} "
+              f"{float(linha['v_inicial']):>9.3f} {float(linha['raio']):>9.3f} "
+              f"{int(linha['replica']):>5} "
+              f"{float(linha['ek_total_inicial']):>12.3f} {float(linha['ek_total_final']):>12.3f} "
+              f"{float(linha['ek_media']):>13.4E} {float(linha['temperatura']):>10.2f}")
+    print("-".center(100, "-"))
+
+
+def main(arquivo_grade, arquivo_resultados="varredura.csv", trabalhadores=None,
+         animacao=True):
+    """
+    Procedimento principal.
+
+    Parameters
+    ----------
+    arquivo_grade : string
+        Arquivo JSON da grade.
+    arquivo_resultados : string, opcional
+        Tabela CSV. Padrão é "varredura.csv".
+    trabalhadores : int, opcional
+        Número de processos. Padrão é None (os.cpu_count()).
+    animacao : bool, opcional
+        Grava um vídeo por ponto. Padrão é True.
+
+    Returns
+    -------
+    None.
+
+    """
+    try:
+        linhas = varrer(arquivo_grade, arquivo_resultados, trabalhadores, animacao)
+    except ValueError as erro:
+        print(f" - Erro: {erro}")
+        sys.exit(-1)
+
+    exibe_tabela(linhas)
+    print(" - Resultados salvos em".ljust(n_ljust, ".") + f": {arquivo_resultados}")
+
+
+if __name__ == "__main__":
+    # uso: python varredura.py grade.json [-j PROCESSOS] [-o resultados.csv] [--sem-animacao]
+    argumentos = sys.argv[1:]
+    processos = None
+    resultados = "varredura.csv"
+    com_animacao = "--sem-animacao" not in argumentos
+    argumentos = [argumento for argumento in argumentos if argumento != "--sem-animacao"]
+    for opcao in ("-j", "-o"):
+        if opcao in argumentos:
+            posicao = argumentos.index(opcao)
+            valor = argumentos[posicao + 1]
+            del argumentos[posicao:posicao + 2]
+            if opcao == "-j":
+                processos = int(valor)
+            else:
+                resultados = valor
+
+    if len(argumentos) != 1 or not os.path.isfile(argumentos[0]):
+        print(" - Uso: python varredura.py grade.json [-j PROCESSOS] [-o resultados.csv] "
+              "[--sem-animacao]")
+        sys.exit()
+
+    main(argumentos[0], resultados, processos, com_animacao)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered writer of GROMACS (.gro) trajectories.
+
+Every line of a frame has the same prefix (residue number and name, atom
+name and number), so the text of a whole frame is produced at once: a
+template with the prefixes and the numeric fields ("%8.3f" for positions,
+"%8.4f" for velocities) is built only once, and each frame is a single
+'template % values' operation instead of one formatting and one
+f.write() call per atom. Frames are kept in memory and written to the
+file in large blocks.
+
+2D systems are written with z = 0 (the box keeps three lengths).
+
+Author...........: Rogério Ribeiro Macêdo.
+Curriculum Lattes: http://lattes.cnpq.br/8806221981552346
+"""
+import numpy as np
+
+# Maximum size of the text kept in memory before writing (characters)
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+
+def box_lengths(box, dimension):
+    """
+    The three box lengths of the gro file.
+
+    Parameters
+    ----------
+    box : float or numpy.ndarray
+        Box length (the same in every direction) or lengths (d,).
+    dimension : int
+        Dimension of the system (2 or 3).
+
+    Returns
+    -------
+    numpy.ndarray
+        Lengths (3,); a 2D box repeats its last length in z.
+
+    """
+    box = np.broadcast_to(np.asarray(box, dtype=np.float64), (dimension,))
+    return np.concatenate((box, np.full(3 - dimension, box[-1])))
+
+
+class GroWriter:
+    """Write frames (positions and velocities) in a gro file."""
+
+    def __init__(self, filename, box, n_particles, dimension=2, velocities=True,
+                 residue="PAR", atom="H", max_buffer=MAX_BUFFER_SIZE):
+        """
+        Open the file and build the frame template.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the gro file.
+        box : float or numpy.ndarray
+            Box length or lengths (d,).
+        n_particles : int
+            Number of particles.
+        dimension : int, optional
+            Dimension of the system (2 or 3). The default is 2.
+        velocities : bool, optional
+            Write the velocities. The default is True.
+        residue : str, optional
+            Residue name. The default is "PAR".
+        atom : str, optional
+            Atom name. The default is "H".
+        max_buffer : int, optional
+            Characters kept in memory before writing. The default is
+            MAX_BUFFER_SIZE.
+
+        """
+        if dimension not in (2, 3):
+            raise ValueError("The gro format needs a dimension of 2 or 3.")
+
+        self.n_particles = n_particles
+        self.dimension = dimension
+        self.velocities = velocities
+        self.max_buffer = max_buffer
+        self.box_line = "{:>10.5f}{:>10.5f}{:>10.5f}\n".format(*box_lengths(box, dimension))
+
+        # Same prefix in every frame (numbers wrap at 100000, as in GROMACS)
+        fields = "%8.3f%8.3f%8.3f" + ("%8.4f%8.4f%8.4f" if velocities else "") + "\n"
+        self.template = "".join("{:>5d}{:<5}{:>5}{:>5d}".format(number, residue, atom, number)
+                                + fields
+                                for number in (np.arange(n_particles) + 1) % 100000)
+        self.values = np.zeros((n_particles, 6 if velocities else 3))
+
+        self.f_gro = open(filename, "w")
+        self.buffer = []
+        self.buffer_size = 0
+        self.frames = 0
+
+    def format_frame(self, positions, velocities=None, title=""):
+        """
+        Text of one frame.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            Positions (N, d).
+        velocities : numpy.ndarray, optional
+            Velocities (N, d). The default is None (zeros, if the file has
+            velocities).
+        title : str, optional
+            Title line. The default is "".
+
+        Returns
+        -------
+        str
+            Frame in the gro format.
+
+        """
+        self.values[:, :self.dimension] = positions
+        if self.velocities:
+            self.values[:, 3:3 + self.dimension] = 0.0 if velocities is None else velocities
+
+        return (f"{title}\n{self.n_particles:>5d}\n"
+                + self.template % tuple(self.values.ravel().tolist())
+                + self.box_line)
+
+    def write(self, positions, velocities=None, title=""):
+        """
+        Add one frame (written to the file when the buffer is full).
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            Positions (N, d).
+        velocities : numpy.ndarray, optional
+            Velocities (N, d). The default is None.
+        title : str, optional
+            Title line. The default is "".
+
+        Returns
+        -------
+        None.
+
+        """
+        frame = self.format_frame(positions, velocities, title)
+        self.buffer.append(frame)
+        self.buffer_size += len(frame)
+        self.frames += 1
+        if self.buffer_size >= self.max_buffer:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered frames to the file."""
+        if self.buffer:
+            self.f_gro.write("".join(self.buffer))
+            self.buffer = []
+            self.buffer_size = 0
+        self.f_gro.flush()
+
+    def close(self):
+        """Write the remaining frames and close the file."""
+        if self.f_gro.closed:
+            return
+
+        self.flush()
+        self.f_gro.close()
+
+    def __enter__(self):
+        """Use the writer in a with block."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the file at the end of the with block."""
+        self.close()
+
+
+def write_gro(filename, positions, box, velocities=None, title=""):
+    """
+    Write a single frame in a gro file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the gro file.
+    positions : numpy.ndarray
+        Positions (N, d).
+    box : float or numpy.ndarray
+        Box length or lengths (d,).
+    velocities : numpy.ndarray, optional
+        Velocities (N, d). The default is None (not written).
+    title : str, optional
+        Title line. The default is "".
+
+    Returns
+    -------
+    None.
+
+    """
+    positions = np.asarray(positions)
+    with GroWriter(filename, box, len(positions), positions.shape[1],
+                   velocities is not None) as writer:
+        writer.write(positions, velocities, title)
@@ -27,12 +27,19 @@ Last update......: July 12th, 2024.
 import sys
 import numpy as np
 
+from lennard_jones import lj_forces
+from neighbour_list import NeighbourList, default_skin
+from gro import GroWriter, write_gro
+
 # Length of text string
 n_ljust = 50
 
 # Radius for particle
 radius_particle = 0.3
 
+# Cutoff distance of the Lennard-Jones potential
+cutoff = 2.5
+
 
 def head_msg():
     """
@@ -213,7 +220,62 @@ def read_initial_velocity():
     return initial_velocity
 
 
-def make_initial_structure(number_particles, lenght_box):
+def read_dimension():
+    try:
+        dimension = input("Dimension (2 or 3) "
+                          "[2]".ljust(n_ljust, ".") + ": ").strip()
+        if dimension == "exit":
+            tchau()
+        else:
+            if len(dimension) > 0:
+                dimension = int(dimension)
+            else:
+                # Default value
+                dimension = 2
+    except ValueError:
+        print(" - The value must be an integer value.")
+        return 0
+
+    if dimension not in (2, 3):
+        print(" - The dimension must be 2 or 3.")
+        return 0
+
+    return dimension
+
+
+def lattice_positions(number_particles, lenght_box, dimension=2):
+    """
+    Positions in a square (2D) or cubic (3D) lattice.
+
+    Parameters
+    ----------
+    number_particles : int
+        Number of particle in a box.
+    lenght_box : float
+        Lenght of a box.
+    dimension : int, optional
+        Dimension of the system. The default is 2.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array (N, dimension).
+
+    """
+    # Create enough positions in grid for the particles
+    grid_size = max(1, int(np.ceil(number_particles ** (1 / dimension))))
+    while grid_size > 1 and (grid_size - 1) ** dimension >= number_particles:
+        grid_size -= 1
+    while grid_size ** dimension < number_particles:
+        grid_size += 1
+    spacing = lenght_box / grid_size
+    x = np.linspace(radius_particle + spacing / 2, lenght_box - radius_particle - spacing / 2,
+                    grid_size)
+    grid = np.meshgrid(*[x] * dimension, indexing="ij")
+    return np.stack([axis.ravel()[:number_particles] for axis in grid], axis=1)
+
+
+def make_initial_structure(number_particles, lenght_box, dimension=2):
     """
     Construct a gro file with the initial structure.
 
@@ -223,77 +285,237 @@ def make_initial_structure(number_particles, lenght_box):
         Number of particle in a box.
     lenght_box : float
         Lenght of a box.
+    dimension : int, optional
+        Dimension of the system. The default is 2.
 
     Returns
     -------
     None.
 
     """
-    # Create enough positions in grid for the particles
-    grid_size = int(np.ceil(np.sqrt(number_particles)))
-    print(grid_size)
-    with open("initial_structure.gro", "w") as f_gro:
-        f_gro.write("Simulating particles that interact with Lennard-Jones potential.\n")
-        f_gro.write("{:>5d}\n".format(number_particles))
-        f_gro.write("{:>5d}{:<5}{:>5}{:>5}{:>8.3f}{:>8.3f}{:>8.3f}\n".format(1, "PAR", "H", 1, 1.260, 1.251, 1.290))
-        f_gro.write("{:>10.5f}{:>10.5f}{:>10.5f}\n".format(lenght_box, lenght_box, lenght_box))
+    write_gro("initial_structure.gro", lattice_positions(number_particles, lenght_box, dimension),
+              lenght_box, title="Simulating particles that interact with Lennard-Jones potential.")
 
-    f_gro.close()
 
+def initial_state(number_particles, lenght_box, initial_velocity, seed=None, dimension=2,
+                  temperature=None):
+    """
+    Positions in a lattice and velocities with random directions.
+
+    With a temperature, the velocities come from the Maxwell-Boltzmann
+    distribution (k_B T = temperature, m = 1) with zero net momentum.
+    Same algorithm (and output, for the same seed) as estado_inicial of
+    simulando_gas_ideal/estado_inicial.py (see tests/test_estado_inicial.py).
+
+    Parameters
+    ----------
+    number_particles : int
+        Number of particle in a box.
+    lenght_box : float
+        Lenght of a box.
+    initial_velocity : float
+        Magnitude of the initial velocities.
+    seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Seed of the random generator. The default is None.
+    dimension : int, optional
+        Dimension of the system. The default is 2.
+    temperature : float, optional
+        Initial temperature (reduced units). The default is None (fixed
+        magnitude initial_velocity).
+
+    Returns
+    -------
+    positions, velocities : numpy.ndarray
+        Arrays (N, dimension).
 
-def simulation(number_particles, lenght_box, duration_simul, number_steps, initial_velocity):
     """
-    Make simulation.
+    positions = lattice_positions(number_particles, lenght_box, dimension)
+    rng = np.random.default_rng(seed)
+
+    if temperature is not None:
+        # Maxwell-Boltzmann, without the velocity of the centre of mass
+        velocities = np.sqrt(temperature) * rng.standard_normal((number_particles, dimension))
+        velocities -= velocities.mean(axis=0)
+        return positions, velocities
+
+    # Random directions, fixed magnitude
+    if dimension == 2:
+        theta = rng.uniform(0, 2 * np.pi, size=number_particles)
+        directions = np.stack((np.cos(theta), np.sin(theta)), axis=1)
+    else:
+        directions = rng.standard_normal((number_particles, dimension))
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+    velocities = initial_velocity * directions
+
+    return positions, velocities
+
+
+def simulation(number_particles, lenght_box, duration_simul, number_steps, initial_velocity,
+               rc=cutoff, output_every=1, energy_file="energies.dat",
+               trajectory_file="trajectory.gro", seed=None, skin=default_skin, dimension=2,
+               temperature=None):
+    """
+    Make simulation (velocity Verlet with periodic boundary conditions, 2D or 3D).
+
+    The forces at the end of a step are the forces at the beginning of the
+    next one, so there is only one force evaluation per step. The forces
+    use a Verlet neighbour list (rebuilt only when some particle moved more
+    than skin/2). Energies (every step) and frames (every output_every
+    steps) are written to the files while the simulation runs. The
+    potential energy and the virial come from the force evaluation, so the
+    temperature (k_B T = 2 K / (d N)) and the pressure
+    (P = (2 K + W) / (d V)) cost nothing extra (m = k_B = 1).
 
     Parameters
     ----------
-    number_particles : TYPE
-        DESCRIPTION.
-    lenght_box : TYPE
-        DESCRIPTION.
-    duration_simul : TYPE
-        DESCRIPTION.
-    number_steps : TYPE
-        DESCRIPTION.
-    initial_velocity : TYPE
-        DESCRIPTION.
+    number_particles : int
+        Number of particle in a box.
+    lenght_box : float
+        Lenght of a box.
+    duration_simul : float
+        Duration of simulation.
+    number_steps : int
+        Number of steps.
+    initial_velocity : float
+        Magnitude of the initial velocities.
+    rc : float, optional
+        Cutoff distance. The default is cutoff (2.5).
+    output_every : int, optional
+        Write a frame every output_every steps. The default is 1.
+    energy_file : str, optional
+        Energy file (step, time, kinetic, potential, total, temperature,
+        pressure). The default is "energies.dat".
+    trajectory_file : str, optional
+        Trajectory file (gro). The default is "trajectory.gro".
+    seed : int, optional
+        Seed of the random generator. The default is None.
+    skin : float, optional
+        Skin of the neighbour list. The default is default_skin; None
+        evaluates all pairs every step.
+    dimension : int, optional
+        Dimension of the system (2 or 3). The default is 2.
+    temperature : float, optional
+        Draw the initial velocities from the Maxwell-Boltzmann distribution
+        at this temperature (see initial_state). The default is None.
 
     Returns
     -------
-    None.
+    energies : numpy.ndarray
+        Array (number_steps + 1, 7): step, time, kinetic, potential and
+        total energy, temperature and pressure.
 
     """
-    pass
+    dt = duration_simul / number_steps
+    positions, velocities = initial_state(number_particles, lenght_box, initial_velocity, seed,
+                                          dimension, temperature)
+    neighbours = None if skin is None else NeighbourList(lenght_box, rc, skin)
+    pairs = None if neighbours is None else neighbours.update(positions)
+    forces, potential, virial = lj_forces(positions, lenght_box, rc, pairs=pairs)
+    energies = np.zeros((number_steps + 1, 7))
+    volume = lenght_box**dimension
+    title = "Simulating particles that interact with Lennard-Jones potential. t= {:.5f} step= {}"
+
+    print(" - Simulating...")
+    with open(energy_file, "w") as f_energy, \
+            GroWriter(trajectory_file, lenght_box, number_particles, dimension) as writer:
+        f_energy.write(f"# {'step':>8} {'time':>14} {'kinetic':>14} {'potential':>14} "
+                       f"{'total':>14} {'temperature':>14} {'pressure':>14}\n")
+
+        for step in range(number_steps + 1):
+            if step > 0:
+                positions += velocities * dt + 0.5 * forces * dt**2
+                positions %= lenght_box
+                pairs = None if neighbours is None else neighbours.update(positions)
+                new_forces, potential, virial = lj_forces(positions, lenght_box, rc,
+                                                          pairs=pairs)
+                velocities += 0.5 * (forces + new_forces) * dt
+                forces = new_forces
+
+            kinetic = 0.5 * np.einsum("ij,ij->", velocities, velocities)
+            instant_temperature = 2 * kinetic / (dimension * number_particles)
+            pressure = (2 * kinetic + virial) / (dimension * volume)
+            energies[step] = (step, step * dt, kinetic, potential, kinetic + potential,
+                              instant_temperature, pressure)
+            f_energy.write(("{:>10d}" + " {:>14.6f}" * 6 + "\n")
+                           .format(step, *energies[step, 1:]))
+
+            if step % output_every == 0:
+                writer.write(positions, velocities, title.format(step * dt, step))
+
+    if neighbours is not None:
+        print(f" - Neighbour list: {neighbours.rebuilds} builds in {number_steps} steps, "
+              f"{neighbours.average_neighbours:.1f} neighbours per particle.")
+    print(f" - Energies saved in {energy_file} and frames in {trajectory_file}.")
+    return energies
+
+
+def read_arguments(arguments):
+    """
+    Read the parameters from the command line (non-interactive run).
+
+    python kiti.py [particles] [lenght_box] [duration] [steps] [velocity] [dimension]
+
+    Parameters
+    ----------
+    arguments : list
+        Command line arguments (missing values use the defaults).
 
+    Returns
+    -------
+    tuple
+        number_particles, lenght_box, duration_simul, number_steps,
+        initial_velocity and dimension (0 for an invalid value).
 
-def main():
+    """
+    arguments = list(arguments) + [""] * (6 - len(arguments))
+    dimension = valid_number(arguments[5], 2)
+    if dimension not in (2, 3):
+        print(" - The dimension must be 2 or 3.")
+        dimension = 0
+
+    return (valid_number(arguments[0], 100),
+            valid_number(arguments[1], 10.0, "float"),
+            valid_number(arguments[2], 10),
+            valid_number(arguments[3], 10),
+            valid_number(arguments[4], 1.5, "float"),
+            dimension)
+
+
+def main(arguments=None):
     """
     Principal function.
 
+    Parameters
+    ----------
+    arguments : list, optional
+        Command line arguments (see read_arguments). The default is None
+        (the parameters are read interactively).
+
     Returns
     -------
     None.
 
     """
-    number_particles = read_number_particles()
-    if number_particles:
-        lenght_box = read_lenght_box()
-        if lenght_box:
-            duration_simul = read_duration_simul()
-            if duration_simul:
-                number_steps = read_number_steps()
-                if number_steps:
-                    initial_velocity = read_initial_velocity()
-                    if initial_velocity:
-                        # Initial structure
-                        make_initial_structure(int(number_particles), lenght_box)
-
-                        # Simulation
-                        simulation(int(number_particles), int(lenght_box),
-                                   int(duration_simul), int(number_steps),
-                                   float(initial_velocity))
-
-                        # print(number_particles, lenght_box, duration_simul, number_steps, initial_velocity)
+    if arguments:
+        parameters = read_arguments(arguments)
+    else:
+        parameters = []
+        for read in (read_number_particles, read_lenght_box, read_duration_simul,
+                     read_number_steps, read_initial_velocity, read_dimension):
+            parameters.append(read())
+            if not parameters[-1]:
+                return
+
+    (number_particles, lenght_box, duration_simul, number_steps, initial_velocity,
+     dimension) = parameters
+    if all(parameters):
+        # Initial structure
+        make_initial_structure(int(number_particles), lenght_box, dimension)
+
+        # Simulation
+        simulation(int(number_particles), float(lenght_box),
+                   int(duration_simul), int(number_steps),
+                   float(initial_velocity), dimension=dimension)
 
 
 if __name__ == "__main__":
@@ -301,4 +523,4 @@ if __name__ == "__main__":
     head_msg()
 
     # Main
-    main()
+    main(sys.argv[1:])
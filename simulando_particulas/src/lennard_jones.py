@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Lennard-Jones forces and potential energy with periodic boundary conditions.
+
+    U (r) = (4 x epsilon) x [ (sigma/r)**12 - (sigma/r)**6 ],  for r < rc
+
+Every pair (i < j) is evaluated only once: the force on j is minus the
+force on i (Newton's third law). The pair vector r_ij = r_j - r_i follows
+the minimum image convention and, as in the notebook, the potential is
+truncated (not shifted) at the cutoff rc. The potential energy and the
+virial W = sum_{i<j} r_ij . F_ij (used for the pressure) come from the
+same pass over the pairs.
+
+There are two kernels that give the same result:
+  - NumPy: the upper triangle of the pair matrix is computed in square
+    blocks (bounded memory), or only the given pairs (neighbour list);
+  - Numba: a compiled loop over the pairs, used when numba is installed.
+
+Author...........: Rogério Ribeiro Macêdo.
+Curriculum Lattes: http://lattes.cnpq.br/8806221981552346
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Maximum number of elements of each block of the pair matrix
+MAX_BLOCK_ELEMENTS = 1_000_000
+
+# Kernels
+METHODS = ("numpy", "numba")
+
+
+def minimum_image(vectors, box):
+    """
+    Apply the minimum image convention to pair vectors.
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        Pair vectors (..., d).
+    box : numpy.ndarray
+        Box lengths (d,).
+
+    Returns
+    -------
+    numpy.ndarray
+        Vectors with every component in [-box/2, box/2].
+
+    """
+    return vectors - box * np.rint(vectors / box)
+
+
+def _pair_terms(r2, rc2, epsilon, sigma2):
+    """
+    Force coefficient of each pair, total energy and virial.
+
+    The force on i is coef * r_ij (r_ij = r_j - r_i); pairs beyond the
+    cutoff have coef = 0, no energy and no virial.
+    """
+    inside = r2 < rc2
+    r2 = np.where(inside, r2, 1.0)
+    s6 = np.where(inside, (sigma2 / r2) ** 3, 0.0)
+    virial = 24.0 * epsilon * (2.0 * s6 * s6 - s6)
+    coef = -virial / r2
+    return coef, 4.0 * epsilon * np.sum(s6 * s6 - s6), np.sum(virial)
+
+
+def _forces_blocks(positions, box, rc2, epsilon, sigma2, max_elements=MAX_BLOCK_ELEMENTS):
+    """All pairs (NumPy), in square blocks of the upper triangle."""
+    n_particles = len(positions)
+    side = max(1, min(n_particles, int(np.sqrt(max_elements))))
+    forces = np.zeros_like(positions)
+    energy = 0.0
+    virial = 0.0
+
+    for start_i in range(0, n_particles, side):
+        block_i = positions[start_i:start_i + side]
+        for start_j in range(start_i, n_particles, side):
+            block_j = positions[start_j:start_j + side]
+            diff = minimum_image(block_j[None, :, :] - block_i[:, None, :], box)
+            r2 = np.einsum("ijk,ijk->ij", diff, diff)
+            if start_j == start_i:
+                # only i < j in the diagonal blocks
+                r2[np.tril_indices(len(block_i))] = np.inf
+
+            coef, energy_block, virial_block = _pair_terms(r2, rc2, epsilon, sigma2)
+            forces[start_i:start_i + side] += np.einsum("ij,ijk->ik", coef, diff)
+            forces[start_j:start_j + side] -= np.einsum("ij,ijk->jk", coef, diff)
+            energy += energy_block
+            virial += virial_block
+
+    return forces, energy, virial
+
+
+def _forces_pairs(positions, box, ind_i, ind_j, rc2, epsilon, sigma2):
+    """Only the given pairs (NumPy)."""
+    diff = minimum_image(positions[ind_j] - positions[ind_i], box)
+    r2 = np.einsum("ij,ij->i", diff, diff)
+    coef, energy, virial = _pair_terms(r2, rc2, epsilon, sigma2)
+
+    force_ij = coef[:, None] * diff
+    n_particles = len(positions)
+    forces = np.empty_like(positions)
+    for k in range(positions.shape[1]):
+        forces[:, k] = (np.bincount(ind_i, force_ij[:, k], minlength=n_particles)
+                        - np.bincount(ind_j, force_ij[:, k], minlength=n_particles))
+    return forces, energy, virial
+
+
+def _loop_pairs(positions, box, ind_i, ind_j, rc2, epsilon, sigma2):
+    """Loop over the given pairs (compiled by numba)."""
+    n_particles, dim = positions.shape
+    forces = np.zeros((n_particles, dim))
+    diff = np.empty(dim)
+    energy = 0.0
+    virial = 0.0
+
+    for p in range(len(ind_i)):
+        i, j = ind_i[p], ind_j[p]
+        r2 = 0.0
+        for k in range(dim):
+            dx = positions[j, k] - positions[i, k]
+            dx -= box[k] * np.rint(dx / box[k])
+            diff[k] = dx
+            r2 += dx * dx
+        if r2 < rc2:
+            s6 = (sigma2 / r2) ** 3
+            energy += 4.0 * epsilon * (s6 * s6 - s6)
+            virial_ij = 24.0 * epsilon * (2.0 * s6 * s6 - s6)
+            virial += virial_ij
+            coef = -virial_ij / r2
+            for k in range(dim):
+                forces[i, k] += coef * diff[k]
+                forces[j, k] -= coef * diff[k]
+
+    return forces, energy, virial
+
+
+def _loop_all_pairs(positions, box, rc2, epsilon, sigma2):
+    """Loop over all pairs i < j (compiled by numba)."""
+    n_particles, dim = positions.shape
+    forces = np.zeros((n_particles, dim))
+    diff = np.empty(dim)
+    energy = 0.0
+    virial = 0.0
+
+    for i in range(n_particles - 1):
+        for j in range(i + 1, n_particles):
+            r2 = 0.0
+            for k in range(dim):
+                dx = positions[j, k] - positions[i, k]
+                dx -= box[k] * np.rint(dx / box[k])
+                diff[k] = dx
+                r2 += dx * dx
+            if r2 < rc2:
+                s6 = (sigma2 / r2) ** 3
+                energy += 4.0 * epsilon * (s6 * s6 - s6)
+                virial_ij = 24.0 * epsilon * (2.0 * s6 * s6 - s6)
+                virial += virial_ij
+                coef = -virial_ij / r2
+                for k in range(dim):
+                    forces[i, k] += coef * diff[k]
+                    forces[j, k] -= coef * diff[k]
+
+    return forces, energy, virial
+
+
+if njit is not None:
+    _numba_pairs = njit(cache=True)(_loop_pairs)
+    _numba_all_pairs = njit(cache=True)(_loop_all_pairs)
+
+
+def lj_forces(positions, box, rc=2.5, epsilon=1.0, sigma=1.0, pairs=None, method=None):
+    """
+    Lennard-Jones forces, total potential energy and virial.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray
+        Positions (N, d).
+    box : float or numpy.ndarray
+        Box length (the same in every direction) or lengths (d,).
+    rc : float, optional
+        Cutoff distance. The default is 2.5.
+    epsilon : float, optional
+        Depth of the potential well. The default is 1.0.
+    sigma : float, optional
+        Distance where the potential is zero. The default is 1.0.
+    pairs : tuple, optional
+        Arrays (ind_i, ind_j) with the pairs to evaluate (for example, a
+        neighbour list). The default is None (all pairs).
+    method : str, optional
+        "numpy" or "numba" (see METHODS). The default is None (numba when
+        it is installed, otherwise numpy); without numba, "numba" also
+        falls back to numpy.
+
+    Returns
+    -------
+    forces : numpy.ndarray
+        Forces (N, d).
+    potential_energy : float
+        Total potential energy.
+    virial : float
+        Virial W = sum_{i<j} r_ij . F_ij; the pressure is
+        P = (2 K + W) / (d V), with K the kinetic energy.
+
+    """
+    if method is None:
+        method = "numba" if njit is not None else "numpy"
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (use one of {METHODS}).")
+
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    box = np.ascontiguousarray(np.broadcast_to(np.asarray(box, dtype=np.float64),
+                                               positions.shape[1:]))
+    rc2, sigma2 = float(rc) ** 2, float(sigma) ** 2
+    epsilon = float(epsilon)
+
+    if pairs is not None:
+        ind_i = np.asarray(pairs[0], dtype=np.int64)
+        ind_j = np.asarray(pairs[1], dtype=np.int64)
+
+    if method == "numba" and njit is not None:
+        if pairs is None:
+            forces, energy, virial = _numba_all_pairs(positions, box, rc2, epsilon, sigma2)
+        else:
+            forces, energy, virial = _numba_pairs(positions, box, ind_i, ind_j, rc2, epsilon,
+                                                  sigma2)
+    elif pairs is None:
+        forces, energy, virial = _forces_blocks(positions, box, rc2, epsilon, sigma2)
+    else:
+        forces, energy, virial = _forces_pairs(positions, box, ind_i, ind_j, rc2, epsilon,
+                                               sigma2)
+
+    return forces, float(energy), float(virial)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Verlet neighbour list for the Lennard-Jones simulation.
+
+The list keeps every pair (i < j) closer than rc + skin. It is built from
+a cell list: the box is divided in cells with side >= rc + skin, and only
+particles of the same or of the 3**d - 1 neighbouring cells (periodic)
+are compared, so building the list costs O(N). While no particle has
+moved more than skin/2 since the last build, no pair can have entered the
+cutoff sphere, and the same list is reused by the force evaluation.
+
+Author...........: Rogério Ribeiro Macêdo.
+Curriculum Lattes: http://lattes.cnpq.br/8806221981552346
+"""
+from itertools import product
+
+import numpy as np
+
+from lennard_jones import minimum_image
+
+# Default skin distance
+default_skin = 0.3
+
+
+def pairs_all(positions, box, distance):
+    """
+    Pairs (i < j) closer than distance, comparing all pairs.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray
+        Positions (N, d).
+    box : numpy.ndarray
+        Box lengths (d,).
+    distance : float
+        Maximum distance.
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pairs.
+
+    """
+    ind_i, ind_j = np.triu_indices(len(positions), k=1)
+    diff = minimum_image(positions[ind_j] - positions[ind_i], box)
+    close = np.einsum("ij,ij->i", diff, diff) < distance**2
+    return ind_i[close], ind_j[close]
+
+
+def pairs_cells(positions, box, distance):
+    """
+    Pairs (i < j) closer than distance, using a periodic cell list.
+
+    Every direction must have at least 3 cells of side >= distance, so
+    the 3**d neighbouring cells are all different.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray
+        Positions (N, d).
+    box : numpy.ndarray
+        Box lengths (d,).
+    distance : float
+        Maximum distance.
+
+    Returns
+    -------
+    ind_i, ind_j : numpy.ndarray
+        Pairs.
+
+    """
+    n_particles, dim = positions.shape
+    n_cells = np.floor(box / distance).astype(np.int64)
+    cell = np.floor(np.mod(positions, box) / (box / n_cells)).astype(np.int64) % n_cells
+
+    # particles sorted by cell (linear index)
+    linear = np.ravel_multi_index(cell.T, n_cells)
+    order = np.argsort(linear, kind="stable")
+    counts = np.bincount(linear, minlength=np.prod(n_cells))
+    starts = np.cumsum(counts) - counts
+
+    list_i, list_j = [], []
+    particles = np.arange(n_particles)
+    for offset in product((-1, 0, 1), repeat=dim):
+        neighbour = np.ravel_multi_index(((cell + offset) % n_cells).T, n_cells)
+        size = counts[neighbour]
+        ind_i = np.repeat(particles, size)
+        first = np.repeat(starts[neighbour], size)
+        within = np.arange(len(ind_i)) - np.repeat(np.cumsum(size) - size, size)
+        ind_j = order[first + within]
+
+        keep = ind_i < ind_j
+        ind_i, ind_j = ind_i[keep], ind_j[keep]
+        diff = minimum_image(positions[ind_j] - positions[ind_i], box)
+        close = np.einsum("ij,ij->i", diff, diff) < distance**2
+        list_i.append(ind_i[close])
+        list_j.append(ind_j[close])
+
+    return np.concatenate(list_i), np.concatenate(list_j)
+
+
+class NeighbourList:
+    """Verlet neighbour list with skin, rebuilt only when needed."""
+
+    def __init__(self, box, rc, skin=default_skin):
+        """
+        Neighbour list for the cutoff rc.
+
+        Parameters
+        ----------
+        box : float or numpy.ndarray
+            Box length (the same in every direction) or lengths (d,).
+        rc : float
+            Cutoff distance of the potential.
+        skin : float, optional
+            Extra distance kept in the list. The default is default_skin.
+
+        """
+        self.box = np.asarray(box, dtype=np.float64)
+        self.rc = float(rc)
+        self.skin = float(skin)
+        self.pairs = None
+        self.reference = None  # positions at the last build
+        self.rebuilds = 0  # number of builds
+        self.total_neighbours = 0.0  # sum of neighbours per particle of every build
+
+    def build(self, positions):
+        """
+        Build the list for the given positions.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            Positions (N, d).
+
+        Returns
+        -------
+        tuple
+            Pairs (ind_i, ind_j).
+
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        box = np.broadcast_to(self.box, positions.shape[1:])
+        distance = self.rc + self.skin
+
+        if np.all(np.floor(box / distance) >= 3):
+            self.pairs = pairs_cells(positions, box, distance)
+        else:
+            self.pairs = pairs_all(positions, box, distance)
+
+        self.reference = positions.copy()
+        self.rebuilds += 1
+        self.total_neighbours += self.neighbours_per_particle
+        return self.pairs
+
+    def update(self, positions):
+        """
+        Pairs for the given positions, rebuilding the list if needed.
+
+        The list is rebuilt when some particle moved more than skin/2
+        since the last build (minimum image of the displacement, so it also
+        works with positions wrapped into the box).
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            Positions (N, d).
+
+        Returns
+        -------
+        tuple
+            Pairs (ind_i, ind_j).
+
+        """
+        if self.pairs is None or len(positions) != len(self.reference):
+            return self.build(positions)
+
+        displacement = minimum_image(positions - self.reference, self.box)
+        if np.max(np.einsum("ij,ij->i", displacement, displacement)) > (self.skin / 2) ** 2:
+            return self.build(positions)
+
+        return self.pairs
+
+    @property
+    def neighbours_per_particle(self):
+        """Neighbours of each particle (on average) in the current list."""
+        if self.pairs is None or len(self.reference) == 0:
+            return 0.0
+        return 2 * len(self.pairs[0]) / len(self.reference)
+
+    @property
+    def average_neighbours(self):
+        """Neighbours per particle averaged over all builds."""
+        return self.total_neighbours / self.rebuilds if self.rebuilds else 0.0
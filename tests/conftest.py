@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração dos testes (pytest).
+
+Os programas do repositório são scripts em diretórios próprios, sem
+pacote; os diretórios são colocados no caminho de importação apenas
+durante os testes (o mesmo que PYTHONPATH=simulando_gas_ideal:...).
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for diretorio in ("distancia_e_angulo", "simulando_gas_ideal",
+                  os.path.join("simulando_gas_ideal", "ideal_gas-main"),
+                  os.path.join("simulando_particulas", "src")):
+    caminho = os.path.join(RAIZ, diretorio)
+    if caminho not in sys.path:
+        sys.path.append(caminho)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de colisões (colisoes.py) comparado com o laço duplo sequencial
+original de GasIdeal.verifica_colisao.
+"""
+import numpy as np
+import pytest
+
+from colisoes import pares_em_colisao, rodadas, verificar_colisoes
+from simulando_2D_gas_ideal_v2 import GasIdeal
+
+
+def laco_original(posicoes, velocidades, dt, raio, largura):
+    """Colisões do passo, como no laço duplo original (altera velocidades)."""
+    pos_nova = posicoes + velocidades * dt
+    velocidades[pos_nova < raio] *= -1
+    velocidades[pos_nova > largura - raio] *= -1
+
+    for i in range(len(posicoes)):
+        for j in range(i + 1, len(posicoes)):
+            if np.linalg.norm(pos_nova[i] - pos_nova[j]) < 2 * raio:
+                rdiff = posicoes[i] - posicoes[j]
+                vdiff = velocidades[i] - velocidades[j]
+                velocidades[i] = velocidades[i] - rdiff.dot(vdiff) / rdiff.dot(rdiff) * rdiff
+                velocidades[j] = velocidades[j] + rdiff.dot(vdiff) / rdiff.dot(rdiff) * rdiff
+
+
+def configuracao_densa(semente, n_particulas=80, largura=5.0):
+    """Posições aleatórias (muitos pares e cadeias de contatos) e velocidades."""
+    rng = np.random.default_rng(semente)
+    return rng.uniform(0, largura, (n_particulas, 2)), rng.normal(size=(n_particulas, 2)), largura
+
+
+@pytest.mark.parametrize("semente", range(5))
+@pytest.mark.parametrize("metodo", ["blocos", "celulas"])
+def test_igual_ao_laco_original(semente, metodo):
+    posicoes, velocidades, largura = configuracao_densa(semente)
+    esperado = velocidades.copy()
+    laco_original(posicoes, esperado, 0.01, 0.3, largura)
+
+    ind_i, _ = verificar_colisoes(posicoes, velocidades, 0.01, 0.3, largura, metodo)
+    assert len(ind_i) > 20  # pares com partículas em comum
+    np.testing.assert_allclose(velocidades, esperado, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_rodadas_sem_particulas_repetidas(semente):
+    posicoes, _, largura = configuracao_densa(semente)
+    ind_i, ind_j = pares_em_colisao(posicoes, 0.3, largura)
+    rodada = rodadas(ind_i, ind_j, len(posicoes))
+
+    for numero in range(rodada.max() + 1):
+        particulas = np.concatenate((ind_i[rodada == numero], ind_j[rodada == numero]))
+        assert len(np.unique(particulas)) == len(particulas)
+
+    # os pares de cada partícula são resolvidos na ordem original
+    for particula in range(len(posicoes)):
+        assert np.all(np.diff(rodada[(ind_i == particula) | (ind_j == particula)]) > 0)
+
+
+def test_simulacao_igual_ao_laco_original():
+    gas = GasIdeal(64, 1.0, 0.3, 6.0, 2.0, 1.0, 40, semente=3)
+    posicoes, velocidades = gas.posicoes.copy(), gas.velocidades.copy()
+    pos_simul, _ = gas.simular()
+
+    for n in range(len(pos_simul)):
+        np.testing.assert_allclose(pos_simul[n], posicoes, rtol=1e-9, atol=1e-9)
+        laco_original(posicoes, velocidades, gas.dt, gas.raio, gas.largura)
+        posicoes = posicoes + velocidades * gas.dt
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+O estado inicial de kiti (simulando_particulas) é uma cópia do algoritmo de
+simulando_gas_ideal/estado_inicial.py; os dois devem dar o mesmo resultado.
+"""
+import numpy as np
+import pytest
+
+import kiti
+from estado_inicial import estado_inicial, posicoes_grade
+
+
+@pytest.mark.parametrize("n_particulas", [1, 7, 25, 27, 30, 101])
+@pytest.mark.parametrize("dim", [2, 3])
+def test_grade_igual_a_kiti(n_particulas, dim):
+    np.testing.assert_array_equal(
+        kiti.lattice_positions(n_particulas, 6.0, dim),
+        posicoes_grade(n_particulas, 6.0, kiti.radius_particle, dim))
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+@pytest.mark.parametrize("v_inicial, kT", [(1.5, None), (None, 0.8)])
+def test_estado_inicial_igual_a_kiti(dim, v_inicial, kT):
+    posicoes, velocidades = kiti.initial_state(40, 6.0, v_inicial, seed=123, dimension=dim,
+                                               temperature=kT)
+    posicoes_gas, velocidades_gas = estado_inicial(40, 6.0, kiti.radius_particle, v_inicial, kT,
+                                                   dim=dim, semente=123)
+    np.testing.assert_array_equal(posicoes, posicoes_gas)
+    np.testing.assert_array_equal(velocidades, velocidades_gas)
+
+
+def test_semente_reprodutivel():
+    _, velocidades_1 = estado_inicial(50, 10.0, v_inicial=2.0, semente=7)
+    _, velocidades_2 = estado_inicial(50, 10.0, v_inicial=2.0, semente=np.random.default_rng(7))
+    np.testing.assert_array_equal(velocidades_1, velocidades_2)
+    np.testing.assert_allclose(np.linalg.norm(velocidades_1, axis=1), 2.0)
+
+
+def test_maxwell_boltzmann_sem_momento():
+    _, velocidades = estado_inicial(2000, 10.0, kT=1.5, dim=3, semente=1)
+    np.testing.assert_allclose(velocidades.sum(axis=0), 0.0, atol=1e-10)
+    assert abs(np.mean(velocidades**2) - 1.5) < 0.1
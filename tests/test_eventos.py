@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Motor dirigido por eventos (eventos.py) comparado com o motor de passo fixo:
+conservação de energia e de momento linear e ausência de sobreposições nos
+tempos de saída.
+"""
+import numpy as np
+import pytest
+
+from estado_inicial import estado_inicial
+from eventos import MotorEventos
+from simulando_2D_gas_ideal_v2 import GasIdeal
+
+
+def energia(velocidades):
+    """Energia cinética (massa 1)."""
+    return 0.5 * np.sum(velocidades**2)
+
+
+def menor_distancia(posicoes):
+    """Menor distância entre duas partículas."""
+    diff = posicoes[:, None, :] - posicoes[None, :, :]
+    dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+    return dist[np.triu_indices(len(posicoes), k=1)].min()
+
+
+def gas_aglomerado(motor, semente=11):
+    """Partículas juntas no centro de uma caixa grande (não chegam às paredes)."""
+    gas = GasIdeal(100, 1.0, 0.3, 100.0, None, 5.0, 200, motor=motor, semente=semente,
+                   temperatura=1 / 1.38e-23)
+    gas.posicoes = gas.posicoes * 0.08 + 46.0  # grade de 10 x 10, 0.8 entre os centros
+    return gas
+
+
+@pytest.mark.parametrize("motor", ["passos", "eventos"])
+def test_conserva_energia_e_momento_sem_paredes(motor):
+    gas = gas_aglomerado(motor)
+    energia_inicial = energia(gas.velocidades)
+    momento_inicial = gas.velocidades.sum(axis=0)
+
+    for _, posicoes, velocidades in gas.iterar():
+        assert posicoes.min() > gas.raio and posicoes.max() < gas.largura - gas.raio
+        assert energia(velocidades) == pytest.approx(energia_inicial, rel=1e-10)
+        np.testing.assert_allclose(velocidades.sum(axis=0), momento_inicial, atol=1e-9)
+
+
+def test_eventos_com_colisoes_sem_sobreposicao():
+    posicoes, velocidades = estado_inicial(100, 20.0, 0.3, 2.0, semente=5)
+    motor = MotorEventos(posicoes, velocidades, 0.3, 20.0)
+    energia_inicial = energia(velocidades)
+
+    for _, posicoes, velocidades in motor.iterar(np.linspace(0.0, 20.0, 201)):
+        assert menor_distancia(posicoes) > 2 * 0.3 - 1e-9
+        assert posicoes.min() >= 0.3 - 1e-9 and posicoes.max() <= 20.0 - 0.3 + 1e-9
+        assert energia(velocidades) == pytest.approx(energia_inicial, rel=1e-10)
+
+    assert motor.qtde_colisoes > 100
+
+
+def test_mesma_energia_que_passo_fixo():
+    gas_passos = GasIdeal(100, 1.0, 0.3, 20.0, 2.0, 10.0, 500, motor="passos", semente=2)
+    gas_eventos = GasIdeal(100, 1.0, 0.3, 20.0, 2.0, 10.0, 500, motor="eventos", semente=2)
+    _, vel_passos = gas_passos.simular()
+    _, vel_eventos = gas_eventos.simular()
+
+    energia_passos = 0.5 * np.sum(vel_passos**2, axis=1)
+    energia_eventos = 0.5 * np.sum(vel_eventos**2, axis=1)
+    np.testing.assert_allclose(energia_passos, energia_passos[0], rtol=1e-10)
+    np.testing.assert_allclose(energia_eventos, energia_passos[0], rtol=1e-10)